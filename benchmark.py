@@ -0,0 +1,479 @@
+#!/usr/bin/env python3
+"""
+Benchmarks de Radio CLI - caminos críticos medidos sin terminal, red ni mpv
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import socket
+import sys
+import tempfile
+import threading
+import time
+import types
+from typing import Callable, Dict, List, Optional
+
+import radio
+
+
+CASES = ('render', 'search', 'sort', 'load', 'ipc')
+SIZES = (1000, 10000, 100000, 500000)
+QUICK_SIZES = (1000, 10000)
+KEYSTROKE_TARGET_MS = 5.0  # p99 máximo por tecla en la búsqueda
+
+
+# ---------------------------------------------------------------------------
+# Medición
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    """Percentil por rango más cercano sobre una lista ordenada"""
+    # ceil(fraction · n), sin que el error de coma flotante sume un rango (0.9 · 100 = 90.00000000000001)
+    index = min(len(ordered) - 1, max(0, math.ceil(round(fraction * len(ordered), 9)) - 1))
+    return ordered[index]
+
+
+def summarize(samples: List[float]) -> Dict:
+    """Estadísticas en milisegundos de una lista de duraciones en segundos"""
+    ordered = sorted(sample * 1000 for sample in samples)
+    return {
+        'n': len(ordered),
+        'mean': sum(ordered) / len(ordered),
+        'p50': percentile(ordered, 0.50),
+        'p90': percentile(ordered, 0.90),
+        'p99': percentile(ordered, 0.99),
+        'max': ordered[-1],
+    }
+
+
+def measure(operation: Callable[[], None], repeat: int, setup: Optional[Callable[[], None]] = None) -> List[float]:
+    """Cronometrar `repeat` ejecuciones (setup, si hay, queda fuera de la medición)"""
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        operation()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+class Report:
+    """Resultados por caso, con salida en tabla y comparación contra una línea base"""
+
+    def __init__(self):
+        self.results = {}
+        self.missed = []  # Casos cuyo p99 superó su objetivo
+
+    def add(self, name: str, samples: List[float], target: Optional[float] = None, **extra):
+        self.results[name] = dict(summarize(samples), **extra)
+        if target is not None:
+            self.results[name]['objetivo'] = target
+            if self.results[name]['p99'] > target:
+                self.missed.append(name)
+        self.print_row(name, self.results[name])
+
+    @staticmethod
+    def print_header():
+        print(f"{'caso':<36} {'n':>6} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9}  extra")
+
+    @staticmethod
+    def print_row(name: str, result: Dict):
+        extra = '  '.join(f"{key}={value}" for key, value in result.items()
+                          if key not in ('n', 'mean', 'p50', 'p90', 'p99', 'max'))
+        missed = '  ✗' if result.get('objetivo') is not None and result['p99'] > result['objetivo'] else ''
+        print(f"{name:<36} {result['n']:>6} {result['p50']:>8.3f}ms {result['p90']:>8.3f}ms "
+              f"{result['p99']:>8.3f}ms {result['max']:>8.3f}ms  {extra}{missed}", flush=True)
+
+    def save(self, path: str, args):
+        data = {
+            'meta': {
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'sizes': list(args.sizes),
+            },
+            'results': self.results,
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+        print(f"\nLínea base guardada en {path}")
+
+    def compare(self, path: str, threshold: float) -> int:
+        """Comparar p50 y p99 con la línea base; devuelve la cantidad de regresiones"""
+        with open(path, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+
+        print(f"\nComparación con {path} (regresión: más de {threshold:.0f}% peor)")
+        print(f"{'caso':<36} {'p50 base':>10} {'p50':>10} {'Δ':>8} {'p99 base':>10} {'p99':>10} {'Δ':>8}")
+        regressions = 0
+        for name, result in self.results.items():
+            base = baseline.get(name)
+            if base is None:
+                continue
+            deltas = []
+            for key in ('p50', 'p99'):
+                deltas.append((result[key] - base[key]) / base[key] * 100 if base[key] else 0.0)
+            worse = deltas[0] > threshold
+            regressions += worse
+            print(f"{name:<36} {base['p50']:>8.3f}ms {result['p50']:>8.3f}ms {deltas[0]:>+7.1f}% "
+                  f"{base['p99']:>8.3f}ms {result['p99']:>8.3f}ms {deltas[1]:>+7.1f}%{'  ▲' if worse else ''}")
+        return regressions
+
+
+# ---------------------------------------------------------------------------
+# Catálogos sintéticos
+
+PREFIXES = ['Radio', 'FM', 'La', 'Rock', 'Cadena', 'Onda', 'Estación', 'Net', 'Clásica', 'Súper']
+WORDS = ['Mitre', 'Continental', 'Nacional', 'Pop', 'Metro', 'Jazz', 'Tango', 'Folclore', 'Noticias',
+         'Córdoba', 'Rosario', 'Mendoza', 'Salta', 'Atlántica', 'Sur', 'Norte', 'Latina', 'Urbana',
+         'Blues', 'Cumbia', 'Oldies', 'Ñandú', 'Electrónica', 'Deportes', 'Cultura', 'Música']
+GENRES = ['rock', 'pop', 'jazz', 'news', 'talk', 'tango', 'folk', 'sports', 'classical', 'latin']
+
+
+def synthetic_records(count: int, seed: int = 42) -> List[Dict]:
+    """Estaciones con títulos y URLs realistas, siempre las mismas para una semilla"""
+    rng = random.Random(seed)
+    records = []
+    for number in range(count):
+        title = f"{rng.choice(PREFIXES)} {rng.choice(WORDS)} {rng.choice(WORDS)} {number:x}"
+        records.append({
+            'title': title,
+            'url': f"http://stream{number % 97}.example.net:{8000 + number % 100}/{number:x}.mp3",
+            'tags': rng.sample(GENRES, 2),
+        })
+    return records
+
+
+_stores = {}
+
+
+def synthetic_store(count: int) -> radio.StationStore:
+    """Catálogo en memoria (mismo formato que la caché en disco)"""
+    if count not in _stores:
+        _stores[count] = radio.StationStore(radio.StationStore.build(synthetic_records(count)))
+    return _stores[count]
+
+
+def make_cli(store: radio.StationStore) -> radio.RadioCLI:
+    cli = radio.RadioCLI()
+    cli.install_catalog(store)
+    return cli
+
+
+# ---------------------------------------------------------------------------
+# curses simulado
+
+class DrawCounter:
+    """Llamadas a curses y bytes escritos en las ventanas"""
+
+    def __init__(self):
+        self.calls = 0
+        self.bytes = 0
+        self.flushes = 0
+
+    def reset(self):
+        self.calls = self.bytes = self.flushes = 0
+
+
+class FakeWindow:
+    """Ventana curses que solo cuenta: cualquier método no listado es un no-op contado"""
+
+    def __init__(self, counter: DrawCounter, height: int, width: int):
+        self.counter = counter
+        self.height = height
+        self.width = width
+
+    def getmaxyx(self):
+        return self.height, self.width
+
+    def addstr(self, *args):
+        text = args[2] if isinstance(args[0], int) else args[0]
+        self.counter.calls += 1
+        self.counter.bytes += len(str(text).encode('utf-8'))
+
+    def addch(self, *args):
+        self.counter.calls += 1
+        self.counter.bytes += 1
+
+    insch = addch
+
+    def hline(self, y, x, char, length):
+        self.counter.calls += 1
+        self.counter.bytes += length
+
+    vline = hline
+
+    def __getattr__(self, name):
+        def call(*args, **kwargs):
+            self.counter.calls += 1
+            return 0
+        return call
+
+
+def fake_curses(counter: DrawCounter) -> types.SimpleNamespace:
+    """Sustituto del módulo curses: constantes reales, dibujo contado"""
+    import curses
+    module = types.SimpleNamespace(**{name: getattr(curses, name) for name in dir(curses)
+                                      if name.isupper() and not name.startswith('ACS_')})
+    for name in ('ULCORNER', 'URCORNER', 'LLCORNER', 'LRCORNER', 'HLINE', 'VLINE'):
+        setattr(module, 'ACS_' + name, ord('+'))
+    module.error = curses.error
+
+    def doupdate():
+        counter.flushes += 1
+
+    module.color_pair = lambda pair: pair << 8
+    module.newwin = lambda height, width, y, x: FakeWindow(counter, height, width)
+    module.doupdate = doupdate
+    return module
+
+
+# ---------------------------------------------------------------------------
+# Casos
+
+def bench_render(report: Report, args):
+    """Cuadros completos y diferenciales de show_interface, draw_box y draw_progress_bar"""
+    counter = DrawCounter()
+    real_curses = radio.curses
+    radio.curses = fake_curses(counter)
+    try:
+        cli = make_cli(synthetic_store(10000))
+        cli.screen = FakeWindow(counter, args.rows, args.cols)
+        repeat = args.repeat * 10
+
+        def per_frame(samples, name):
+            report.add(name, samples, calls=counter.calls // len(samples),
+                       bytes=counter.bytes // len(samples), doupdate=counter.flushes // len(samples))
+            counter.reset()
+
+        counter.reset()
+        per_frame(measure(lambda: (cli.invalidate(), cli.show_interface()), repeat // 10 or 1),
+                  'render/cuadro completo')
+
+        def move():
+            cli.move_selection(1)
+            cli.show_interface()
+        per_frame(measure(move, repeat), 'render/mover selección')
+
+        def page():
+            cli.move_selection(cli.max_visible())
+            cli.show_interface()
+        per_frame(measure(page, repeat), 'render/avanzar página')
+
+        steps = iter(range(1 << 30))
+
+        def volume():
+            cli.adjust_volume(10 if next(steps) % 20 < 10 else -10)
+            cli.show_interface()
+        per_frame(measure(volume, repeat), 'render/volumen')
+
+        per_frame(measure(cli.show_interface, repeat), 'render/sin cambios')
+
+        window = FakeWindow(counter, args.rows, args.cols)
+        per_frame(measure(lambda: cli.draw_box(0, 0, args.rows - 4, 70, "📻 ESTACIONES", win=window), repeat),
+                  'render/draw_box')
+        per_frame(measure(lambda: cli.draw_progress_bar(0, 12, 30, 60, "", win=window), repeat),
+                  'render/draw_progress_bar')
+    finally:
+        radio.curses = real_curses
+
+
+def bench_search(report: Report, args):
+    """Latencia por tecla de search_stations (más la primera página visible, como render_list)"""
+    queries = ['radio', 'rock', 'mitre nac', 'zzq']
+    for size in args.sizes:
+        cli = make_cli(synthetic_store(size))
+        cli.index.wait()
+        page = 20
+
+        samples = []
+        for _ in range(args.repeat):
+            for query in queries:
+                cli.search_stations("")
+                for length in range(1, len(query) + 1):
+                    started = time.perf_counter()
+                    cli.search_stations(query[:length])
+                    cli.filtered_radios.ensure(page, cli.SEARCH_BUDGET)
+                    samples.append(time.perf_counter() - started)
+        report.add(f'search/tecla/{size}', samples, target=KEYSTROKE_TARGET_MS)
+
+        def full():
+            cli.search_stations("")
+            cli.search_stations("ra")
+            cli.filtered_radios.finish()
+        report.add(f'search/completa/{size}', measure(full, args.repeat), resultados=len(cli.filtered_radios))
+
+
+def bench_sort(report: Report, args):
+    """sort_stations alfabético (vista de la caché) y por latencia"""
+    for size in args.sizes:
+        store = synthetic_store(size)
+        cli = make_cli(store)
+        report.add(f'sort/alfabético/{size}', measure(cli.sort_stations, args.repeat * 5))
+
+        # Mitad de las estaciones sondeadas, con latencias variadas
+        rng = random.Random(7)
+        cli.health = radio.HealthCache(path=os.path.join(args.workdir, 'health.json'))
+        cli.health.load()
+        for index in range(0, size, 2):
+            result = radio.ProbeResult(store.url(index))
+            result.ok = rng.random() > 0.1
+            result.ttfb_ms = rng.uniform(20, 3000)
+            result.checked = time.time()
+            cli.health.put(result)
+        cli.sort_by_latency = True
+        report.add(f'sort/latencia/{size}', measure(cli.sort_stations, max(1, args.repeat // 2)))
+
+
+def bench_load(report: Report, args):
+    """load_radios en frío (reconstruye la caché) y en caliente (la mapea)"""
+    for size in args.sizes:
+        source = os.path.join(args.workdir, f'radios-{size}.json')
+        with open(source, 'w', encoding='utf-8') as f:
+            json.dump(synthetic_records(size), f)
+        cache = radio.StationStore.cache_path(source)
+
+        def remove_cache():
+            try:
+                os.remove(cache)
+            except OSError:
+                pass
+
+        def load():
+            cli = radio.RadioCLI()
+            if not cli.load_radios(source):
+                raise RuntimeError(f'no se pudo cargar {source}')
+            cli.radios.close()
+
+        cold_repeat = max(1, args.repeat // (5 if size >= 100000 else 1))
+        report.add(f'load/frío/{size}', measure(load, cold_repeat, setup=remove_cache))
+        report.add(f'load/caliente/{size}', measure(load, args.repeat * 5))
+
+
+class FakeMpvServer:
+    """Servidor IPC mínimo con el protocolo de mpv: responde éxito a todo"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(path)
+        self.server.listen(8)
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self.server.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn: socket.socket):
+        buffer = b''
+        while True:
+            try:
+                data = conn.recv(65536)
+            except OSError:
+                data = b''
+            if not data:
+                conn.close()
+                return
+            lines = (buffer + data).split(b'\n')
+            buffer = lines.pop()
+            out = []
+            for line in lines:
+                message = json.loads(line)
+                if message['command'][0] == 'loadfile':
+                    out.append(b'{"event":"start-file"}\n')
+                out.append(json.dumps({'request_id': message.get('request_id'), 'error': 'success',
+                                       'data': None}).encode('utf-8') + b'\n')
+            conn.sendall(b''.join(out))
+
+    def close(self):
+        self.server.close()
+
+
+def bench_ipc(report: Report, args):
+    """Ida y vuelta de comandos de volumen y reproducción contra un mpv simulado"""
+    path = os.path.join(args.workdir, 'fake-mpv.sock')
+    server = FakeMpvServer(path)
+    ipc = radio.MpvIPC(path, on_event=lambda event: None)
+    try:
+        if not ipc.wait_connected(2.0):
+            raise RuntimeError('no se pudo conectar al mpv simulado')
+        repeat = args.repeat * 200
+        volumes = iter(range(1 << 30))
+        report.add('ipc/volumen', measure(lambda: ipc.command('set_property', 'volume', next(volumes) % 101), repeat))
+        report.add('ipc/loadfile', measure(lambda: ipc.command('loadfile', 'http://example.net/live.mp3', 'replace'), repeat))
+
+        # Sin esperar respuesta (como set_volume): muchos comandos y una sola espera final
+        def burst():
+            for volume in range(100):
+                ipc.set_property('volume', volume)
+            ipc.command('get_property', 'volume')
+        samples = measure(burst, args.repeat * 5)
+        report.add('ipc/ráfaga de 100 volúmenes', samples,
+                   comandos_por_s=int(101 * len(samples) / sum(samples)))
+    finally:
+        ipc.close()
+        server.close()
+
+
+# ---------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de Radio CLI (sin terminal, red ni mpv)")
+    parser.add_argument('cases', nargs='*', metavar='CASO',
+                        help=f"casos a ejecutar: {', '.join(CASES)} (por defecto todos)")
+    parser.add_argument('--sizes', default=None,
+                        help="tamaños de catálogo separados por comas (por defecto 1000,10000,100000,500000)")
+    parser.add_argument('--quick', action='store_true', help="catálogos chicos y menos repeticiones")
+    parser.add_argument('--repeat', type=int, default=None, help="factor de repeticiones (por defecto 10; 3 con --quick)")
+    parser.add_argument('--rows', type=int, default=24, help="alto de la pantalla simulada")
+    parser.add_argument('--cols', type=int, default=80, help="ancho de la pantalla simulada")
+    parser.add_argument('--save', metavar='ARCHIVO', help="guardar los resultados como línea base")
+    parser.add_argument('--compare', metavar='ARCHIVO', help="comparar contra una línea base guardada")
+    parser.add_argument('--threshold', type=float, default=15.0,
+                        help="porcentaje de empeoramiento del p50 que cuenta como regresión (por defecto 15)")
+    args = parser.parse_args()
+
+    unknown = set(args.cases) - set(CASES)
+    if unknown:
+        parser.error(f"casos desconocidos: {', '.join(sorted(unknown))}")
+    if args.sizes:
+        args.sizes = tuple(int(size) for size in args.sizes.split(','))
+    else:
+        args.sizes = QUICK_SIZES if args.quick else SIZES
+    if args.repeat is None:
+        args.repeat = 3 if args.quick else 10
+
+    with tempfile.TemporaryDirectory(prefix='radio-bench-') as workdir:
+        # Cachés y sockets en un directorio propio: nada del usuario influye
+        os.environ['XDG_CACHE_HOME'] = os.path.join(workdir, 'cache')
+        os.environ['XDG_RUNTIME_DIR'] = os.path.join(workdir, 'run')
+        args.workdir = workdir
+
+        report = Report()
+        report.print_header()
+        benches = {'render': bench_render, 'search': bench_search, 'sort': bench_sort,
+                   'load': bench_load, 'ipc': bench_ipc}
+        for case in args.cases or CASES:
+            benches[case](report, args)
+
+        if args.save:
+            report.save(args.save, args)
+        if report.missed:
+            print(f"\nObjetivo no alcanzado: {', '.join(report.missed)}")
+        if args.compare:
+            if report.compare(args.compare, args.threshold):
+                sys.exit(1)
+        if report.missed:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,19 +3,3873 @@
 Radio CLI - Reproductor de radio en línea de comandos con interfaz curses
 """
 
+import argparse
+import array
+import bisect
 import curses
+import errno
+import hashlib
+import heapq
+import io
+import itertools
 import json
+import math
+import mmap
+import queue
+import re
+import selectors
+import shutil
 import subprocess
 import os
 import signal
+import socket
+import struct
 import sys
-from typing import List, Dict, Optional
+import tempfile
+import threading
+import time
+import unicodedata
+import urllib.parse
+from collections import OrderedDict, deque
+from typing import Any, Callable, List, Dict, Optional, Tuple
+
+
+class MpvIPCError(Exception):
+    """Error de comunicación con mpv por IPC"""
+
+
+class _PendingReply:
+    """Respuesta pendiente de un comando IPC identificado por request_id"""
+    __slots__ = ('request_id', 'event', 'reply', 'callback')
+
+    def __init__(self, request_id: int, callback: Optional[Callable[[Dict], None]] = None):
+        self.request_id = request_id
+        self.event = threading.Event()
+        self.reply = None
+        self.callback = callback  # Recibe la respuesta al llegar, sin que nadie espere
+
+
+class MpvIPC:
+    """Cliente JSON-IPC persistente para un proceso mpv
+
+    Mantiene una única conexión al socket Unix de mpv. Cada comando lleva un
+    request_id, así que pueden haber varios en vuelo a la vez: un hilo lector
+    (o el selector de un bucle, si se adopta el socket con attach) empareja
+    las respuestas con sus peticiones y reparte los eventos. Con selector el
+    socket no bloquea: lo que no entra de una vez se envía en EVENT_WRITE.
+    """
+
+    BACKOFF_MIN = 0.05
+    BACKOFF_MAX = 2.0
+
+    def __init__(self, socket_path: str, on_event: Optional[Callable[[Dict], None]] = None):
+        self.socket_path = socket_path
+        self.on_event = on_event
+        self._sock = None
+        self._reader = None
+        self._selector = None  # Selector que lee el socket en lugar del hilo
+        self._buffer = b''
+        self._outbox = bytearray()  # Pendiente de enviar (solo con selector)
+        self._writing = False  # Registrado también para escritura
+        self._send_lock = threading.Lock()
+        self._pending = {}  # request_id -> _PendingReply
+        self._pending_lock = threading.Lock()
+        self._next_id = 0
+        self._backoff = self.BACKOFF_MIN
+        self._next_attempt = 0.0
+        self._closed = False
+
+    @property
+    def connected(self) -> bool:
+        return self._sock is not None
+
+    def connect(self) -> bool:
+        """Conectar al socket de mpv respetando el backoff entre reintentos"""
+        if self._sock is not None:
+            return True
+        if self._closed or time.monotonic() < self._next_attempt:
+            return False
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            # Reintentar más tarde con espera exponencial
+            self._next_attempt = time.monotonic() + self._backoff
+            self._backoff = min(self._backoff * 2, self.BACKOFF_MAX)
+            return False
+
+        self.attach(sock)
+        return True
+
+    def attach(self, sock: socket.socket, selector: Optional[selectors.BaseSelector] = None):
+        """Usar un socket ya conectado; con `selector`, leerlo desde ese bucle y no en un hilo"""
+        self._backoff = self.BACKOFF_MIN
+        self._next_attempt = 0.0
+        self._sock = sock
+        self._buffer = b''
+        self._outbox = bytearray()
+        self._writing = False
+        if selector is None:
+            self._reader = threading.Thread(target=self._read_loop, args=(sock,), daemon=True)
+            self._reader.start()
+        else:
+            sock.setblocking(False)
+            self._selector = selector
+            selector.register(sock, selectors.EVENT_READ, lambda mask: self._ready(sock, mask))
+
+    def wait_connected(self, timeout: float) -> bool:
+        """Esperar a que el socket exista (p.ej. justo después de lanzar mpv)"""
+        deadline = time.monotonic() + timeout
+        while not self.connect():
+            if self._closed or time.monotonic() >= deadline:
+                return False
+            self._next_attempt = 0.0
+            time.sleep(0.01)
+        return True
+
+    def close(self):
+        """Cerrar la conexión y liberar las peticiones pendientes"""
+        self._closed = True
+        self._disconnect()
+
+    def reset(self):
+        """Permitir reconectar después de close() (nuevo proceso mpv)"""
+        self._closed = False
+        self._backoff = self.BACKOFF_MIN
+        self._next_attempt = 0.0
+
+    def _disconnect(self):
+        sock, self._sock = self._sock, None
+        selector, self._selector = self._selector, None
+        self._outbox = bytearray()
+        self._writing = False
+        if sock is not None:
+            if selector is not None:
+                try:
+                    selector.unregister(sock)
+                except (KeyError, ValueError):
+                    pass
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            sock.close()
+
+        # Despertar a quien espera respuesta: ya no llegará
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+        for waiter in pending.values():
+            waiter.reply = {'error': 'disconnected'}
+            waiter.event.set()
+            self._answer(waiter)
+
+    def _read_loop(self, sock: socket.socket):
+        """Leer mensajes JSON (uno por línea) y repartirlos"""
+        buffer = b''
+        while True:
+            try:
+                data = sock.recv(65536)
+            except OSError:
+                data = b''
+            if not data:
+                break
+            buffer = self._split(buffer + data)
+        self._lost(sock)
+
+    def _ready(self, sock: socket.socket, mask: int):
+        """Aviso del selector: enviar lo pendiente y leer lo que llegó"""
+        if self._sock is not sock:
+            return
+        if mask & selectors.EVENT_WRITE:
+            try:
+                with self._send_lock:
+                    self._flush(sock)
+            except OSError:
+                self._lost(sock)
+                return
+        if mask & selectors.EVENT_READ and self._sock is sock:
+            self._readable(sock)
+
+    def _flush(self, sock: socket.socket):
+        """Enviar lo pendiente sin bloquear; esperar a EVENT_WRITE si no entra todo"""
+        if self._outbox:
+            try:
+                sent = sock.send(self._outbox)
+                del self._outbox[:sent]
+            except (BlockingIOError, InterruptedError):
+                pass
+        writing = bool(self._outbox)
+        if writing != self._writing:
+            self._writing = writing
+            events = selectors.EVENT_READ | (selectors.EVENT_WRITE if writing else 0)
+            self._selector.modify(sock, events, self._selector.get_key(sock).data)
+
+    def _readable(self, sock: socket.socket):
+        """Lo mismo que _read_loop, una lectura por aviso del selector"""
+        try:
+            data = sock.recv(65536)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b''
+        if data:
+            self._buffer = self._split(self._buffer + data)
+        else:
+            self._lost(sock)
+
+    def _split(self, buffer: bytes) -> bytes:
+        """Repartir las líneas completas; devuelve lo que queda de la última"""
+        while b'\n' in buffer:
+            line, buffer = buffer.split(b'\n', 1)
+            if line:
+                self._dispatch(line)
+        return buffer
+
+    def _lost(self, sock: socket.socket):
+        if self._sock is sock:
+            self._disconnect()
+            # Cierre inesperado (mpv terminó o se cayó): avisar como un evento más
+            if not self._closed and self.on_event:
+                try:
+                    self.on_event({'event': 'shutdown'})
+                except Exception:
+                    pass
+
+    def _dispatch(self, line: bytes):
+        try:
+            message = json.loads(line)
+        except ValueError:
+            return
+
+        request_id = message.get('request_id')
+        if request_id is not None and 'event' not in message:
+            with self._pending_lock:
+                waiter = self._pending.pop(request_id, None)
+            if waiter is not None:
+                waiter.reply = message
+                waiter.event.set()
+                self._answer(waiter)
+        elif 'event' in message and self.on_event:
+            try:
+                self.on_event(message)
+            except Exception:
+                pass
+
+    @staticmethod
+    def _answer(waiter: _PendingReply):
+        if waiter.callback is not None:
+            try:
+                waiter.callback(waiter.reply)
+            except Exception:
+                pass
+
+    def send(self, *args, wait: bool = False,
+             callback: Optional[Callable[[Dict], None]] = None) -> Optional[_PendingReply]:
+        """Enviar un comando; con wait=True devuelve el objeto de respuesta pendiente"""
+        if not self.connect():
+            raise MpvIPCError('mpv no está disponible')
+
+        with self._send_lock:
+            self._next_id += 1
+            request_id = self._next_id
+            waiter = None
+            if wait or callback is not None:
+                waiter = _PendingReply(request_id, callback)
+                with self._pending_lock:
+                    self._pending[request_id] = waiter
+
+            payload = json.dumps({'command': list(args), 'request_id': request_id}).encode('utf-8') + b'\n'
+            try:
+                if self._selector is not None:
+                    self._outbox += payload
+                    self._flush(self._sock)
+                else:
+                    self._sock.sendall(payload)
+            except (OSError, AttributeError) as e:
+                self._disconnect()
+                raise MpvIPCError(str(e))
+        return waiter
+
+    def command(self, *args, timeout: float = 1.0) -> Any:
+        """Enviar un comando y esperar su respuesta"""
+        waiter = self.send(*args, wait=True)
+        if not waiter.event.wait(timeout):
+            with self._pending_lock:
+                self._pending.pop(waiter.request_id, None)
+            raise MpvIPCError('sin respuesta de mpv')
+
+        reply = waiter.reply
+        if reply.get('error') != 'success':
+            raise MpvIPCError(reply.get('error', 'error desconocido'))
+        return reply.get('data')
+
+    def set_property(self, name: str, value: Any):
+        """Cambiar una propiedad sin esperar respuesta"""
+        self.send('set_property', name, value)
+
+    def get_property(self, name: str, timeout: float = 1.0) -> Any:
+        """Leer una propiedad de mpv"""
+        return self.command('get_property', name, timeout=timeout)
+
+    def set_pause(self, paused: bool):
+        """Pausar o reanudar la reproducción"""
+        self.set_property('pause', paused)
+
+
+def runtime_dir() -> str:
+    """Directorio privado para sockets y archivos efímeros de esta sesión"""
+    base = os.environ.get('XDG_RUNTIME_DIR') or tempfile.gettempdir()
+    path = os.path.join(base, 'radio-cli')
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    return path
+
+
+def find_mpv() -> Optional[str]:
+    """Ruta de un mpv que funciona, o None
+
+    Ejecutar `mpv --version` cuesta decenas de milisegundos, así que el
+    resultado se guarda en la caché junto con la ruta, el mtime y el tamaño
+    del binario, y solo se repite cuando mpv cambia.
+    """
+    path = shutil.which('mpv')
+    if path is None:
+        return None
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    key = [path, stat.st_mtime_ns, stat.st_size]
+
+    try:
+        cache = os.path.join(cache_dir(), 'mpv.json')
+    except OSError:
+        cache = None
+    try:
+        with open(cache, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('key') == key:
+            return path if data.get('ok') else None
+    except (OSError, TypeError, ValueError, AttributeError):
+        pass
+
+    try:
+        ok = subprocess.run([path, '--version'], capture_output=True, timeout=10).returncode == 0
+    except (OSError, subprocess.TimeoutExpired):
+        ok = False
+    if cache is not None:
+        try:
+            with open(cache, 'w', encoding='utf-8') as f:
+                json.dump({'key': key, 'ok': ok}, f)
+        except OSError:
+            pass
+    return path if ok else None
+
+
+class MpvEngine:
+    """Proceso mpv único en modo idle, controlado por IPC
+
+    Se lanza una sola vez y cambia de estación con `loadfile ... replace`, así
+    no se paga el arranque del proceso ni la apertura del dispositivo de audio
+    en cada cambio. El socket es único por instancia para que dos radio-cli no
+    compitan por el mismo.
+    """
+
+    START_TIMEOUT = 3.0
+    # Propiedades que reflejan el tema y el estado del buffer
+    PLAYBACK_PROPERTIES = ['media-title', 'metadata/by-key/icy-title', 'paused-for-cache', 'core-idle']
+
+    def __init__(self, volume: int = 50, name: str = 'main', extra_args: Optional[List[str]] = None,
+                 muted: bool = False, binary: Optional[str] = None):
+        self.volume = volume
+        self.binary = binary  # Ruta de mpv (None: la de find_mpv(), al lanzarlo)
+        self.extra_args = extra_args or []  # Perfil del rol (reserva: caché chica); se usa al relanzar
+        self.muted = muted  # También se aplica al relanzar
+        self.socket_path = os.path.join(runtime_dir(), f'mpv-{os.getpid()}-{name}.sock')
+        self.process = None
+        self.ipc = MpvIPC(self.socket_path, on_event=self._on_event)
+        self.current_url = None
+        self.listener = None  # Función (motor, evento) para los eventos de mpv
+        self.observed = []  # Propiedades observadas (se renuevan al relanzar)
+
+    def _on_event(self, event: Dict):
+        listener = self.listener
+        if listener is not None:
+            listener(self, event)
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self.process.pid if self.process else None
+
+    def alive(self) -> bool:
+        """Indica si el proceso mpv sigue vivo (y recoge su estado si murió)"""
+        return self.process is not None and self.process.poll() is None
+
+    def start(self):
+        """Lanzar mpv en modo idle y conectar el IPC"""
+        if self.binary is None:
+            self.binary = find_mpv()
+            if self.binary is None:
+                raise FileNotFoundError(errno.ENOENT, 'mpv no está instalado', 'mpv')
+        self._remove_socket()
+        self.process = subprocess.Popen([
+            self.binary, '--idle=yes', '--no-video', '--no-terminal',
+            '--volume=' + str(self.volume),
+            '--mute=' + ('yes' if self.muted else 'no'),
+            '--input-ipc-server=' + self.socket_path,
+        ] + self.extra_args, stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        self.ipc.reset()
+        if not self.ipc.wait_connected(self.START_TIMEOUT):
+            self.shutdown()
+            raise MpvIPCError('mpv no abrió el socket IPC')
+        self._send_observe()
+
+    def observe(self, names: List[str]):
+        """Recibir eventos property-change de estas propiedades"""
+        self.observed = list(names)
+        if self.alive():
+            self._send_observe()
+
+    def unobserve(self):
+        """Dejar de recibir cambios de propiedades"""
+        observed, self.observed = self.observed, []
+        if self.alive():
+            for observe_id in range(1, len(observed) + 1):
+                self.ipc.send('unobserve_property', observe_id)
+
+    def _send_observe(self):
+        for observe_id, name in enumerate(self.observed, 1):
+            self.ipc.send('observe_property', observe_id, name)
+
+    def ensure_running(self):
+        """Relanzar mpv si el proceso terminó inesperadamente"""
+        if not self.alive():
+            self.ipc.close()
+            self.current_url = None
+            self.start()
+
+    def play(self, url: str, options: Optional[Dict] = None):
+        """Cambiar a otra estación sin reiniciar el proceso (options: propiedades a fijar antes)"""
+        self.ensure_running()
+        for name, value in (options or {}).items():
+            self.ipc.set_property(name, value)
+        self.ipc.send('loadfile', url, 'replace')
+        self.current_url = url
+
+    def stop(self):
+        """Detener la reproducción dejando mpv en espera"""
+        self.current_url = None
+        if self.alive():
+            self.ipc.send('stop')
+
+    def set_volume(self, volume: int):
+        self.volume = volume
+        if self.alive():
+            self.ipc.set_property('volume', volume)
+
+    def set_mute(self, muted: bool):
+        self.muted = muted
+        if self.alive():
+            self.ipc.set_property('mute', muted)
+
+    def set_pause(self, paused: bool):
+        if self.alive():
+            self.ipc.set_pause(paused)
+
+    def shutdown(self):
+        """Cerrar mpv ordenadamente y recoger el proceso"""
+        process, self.process = self.process, None
+        if process is not None and process.poll() is None:
+            try:
+                self.ipc.send('quit')
+            except MpvIPCError:
+                pass
+            try:
+                process.wait(timeout=1)
+            except subprocess.TimeoutExpired:
+                process.terminate()
+                try:
+                    process.wait(timeout=1)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+                    process.wait()
+        self.ipc.close()
+        self.current_url = None
+        self._remove_socket()
+
+    def _remove_socket(self):
+        try:
+            os.remove(self.socket_path)
+        except OSError:
+            pass
+
+
+class StandbyPool:
+    """Reserva acotada de mpv silenciados que precargan estaciones
+
+    Cuando el cursor se detiene sobre una estación, un mpv en espera empieza a
+    conectar y llenar su buffer sin sonido. Al pulsar Enter ese proceso pasa a
+    ser el reproductor principal y el audio sale sin handshake ni buffering.
+    Los streams calientes se expulsan por LRU o tras MAX_IDLE segundos para no
+    consumir ancho de banda indefinidamente.
+    """
+
+    DWELL = 0.6        # Segundos sobre una estación antes de precargarla
+    MAX_IDLE = 90.0    # Segundos que un stream caliente puede seguir descargando
+    MAX_BYTES = 4 * 1024 * 1024  # Límite de memoria del demuxer por stream
+
+    def __init__(self, size: int = 2):
+        self.size = max(0, size)
+        self._warm = OrderedDict()  # url -> (motor, momento de precarga), orden LRU
+        self._spare = []            # Motores en espera sin stream cargado
+        self._count = 0             # Procesos que pertenecen a la reserva
+        self._serial = 0            # Para nombrar sockets únicos
+        self._lock = threading.Lock()
+        self._requests = queue.Queue()
+        self._worker = None
+
+    def _extra_args(self) -> List[str]:
+        return ['--cache=yes', '--demuxer-max-bytes=' + str(self.MAX_BYTES)]
+
+    def promote(self, engine: MpvEngine, previous: MpvEngine):
+        """El motor precargado pasa a principal y el principal vuelve a la reserva
+
+        Se intercambian también los argumentos de lanzamiento: si alguno de
+        los dos procesos muere, se relanza con el perfil de su nuevo rol.
+        """
+        engine.extra_args, previous.extra_args = previous.extra_args, engine.extra_args
+        engine.set_mute(False)
+        self.release(previous)
+
+    def is_warm(self, url: str) -> bool:
+        with self._lock:
+            return url in self._warm
+
+    def warm(self, url: str, options: Optional[Dict] = None):
+        """Pedir la precarga de una estación (no bloquea)"""
+        if self.size == 0:
+            return
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._work, daemon=True)
+            self._worker.start()
+        self._requests.put((url, options))
+
+    def take(self, url: str) -> Optional[MpvEngine]:
+        """Retirar el motor que tiene la estación ya cargada, si existe"""
+        with self._lock:
+            entry = self._warm.pop(url, None)
+            if entry is None:
+                return None
+            self._count -= 1
+
+        engine = entry[0]
+        if not engine.alive():
+            engine.shutdown()
+            return None
+        return engine
+
+    def release(self, engine: MpvEngine):
+        """Devolver un motor a la reserva, silenciado y detenido"""
+        engine.listener = None
+        try:
+            engine.set_mute(True)
+            engine.stop()
+        except MpvIPCError:
+            engine.shutdown()
+            return
+        with self._lock:
+            if self._count < self.size:
+                self._spare.append(engine)
+                self._count += 1
+                return
+        engine.shutdown()
+
+    def expire(self):
+        """Detener los streams calientes que llevan demasiado sin usarse"""
+        now = time.monotonic()
+        with self._lock:
+            stale = [url for url, (_, since) in self._warm.items() if now - since > self.MAX_IDLE]
+            engines = [self._warm.pop(url)[0] for url in stale]
+            self._spare.extend(engines)
+        for engine in engines:
+            try:
+                engine.stop()
+            except MpvIPCError:
+                pass
+
+    def _discard(self, engine: MpvEngine):
+        engine.shutdown()
+        with self._lock:
+            self._count -= 1
+
+    def _acquire(self) -> Optional[MpvEngine]:
+        """Conseguir un motor libre: en espera, nuevo o el menos usado"""
+        with self._lock:
+            if self._spare:
+                return self._spare.pop()
+            if self._count < self.size:
+                self._count += 1
+                self._serial += 1
+                engine = MpvEngine(name=f'standby-{self._serial}', extra_args=self._extra_args(), muted=True)
+                new = True
+            elif self._warm:
+                _, (engine, _) = self._warm.popitem(last=False)
+                new = False
+            else:
+                return None
+
+        if new:
+            try:
+                engine.start()
+            except (OSError, MpvIPCError):
+                with self._lock:
+                    self._count -= 1
+                return None
+        return engine
+
+    def _work(self):
+        while True:
+            request = self._requests.get()
+            if request is None:
+                return
+            url, options = request
+
+            with self._lock:
+                if url in self._warm:
+                    self._warm.move_to_end(url)
+                    continue
+
+            engine = self._acquire()
+            if engine is None:
+                continue
+            try:
+                engine.set_mute(True)  # Antes de cargar: si se relanza, también arranca en silencio
+                engine.play(url, options)
+            except (OSError, MpvIPCError):
+                self._discard(engine)
+                continue
+            with self._lock:
+                self._warm[url] = (engine, time.monotonic())
+
+    def shutdown(self):
+        """Cerrar todos los procesos de la reserva"""
+        if self._worker is not None:
+            self._requests.put(None)
+            self._worker.join(timeout=5)
+        with self._lock:
+            engines = self._spare + [engine for engine, _ in self._warm.values()]
+            self._spare, self._warm = [], OrderedDict()
+        for engine in engines:
+            engine.shutdown()
+
+
+class _Folding(dict):
+    """Tabla para str.translate: cada carácter sin acentos, calculado la primera vez que aparece"""
+
+    def __missing__(self, code: int) -> str:
+        decomposed = unicodedata.normalize('NFKD', chr(code))
+        folded = self[code] = ''.join(c for c in decomposed if not unicodedata.combining(c))
+        return folded
+
+
+_FOLDING = _Folding()
+
+
+def normalize_text(text: str) -> str:
+    """Normalizar texto para búsqueda: minúsculas y sin acentos"""
+    text = text.lower()
+    if text.isascii():
+        return text
+    # Carácter por carácter equivale a descomponer todo el texto: las marcas
+    # combinantes, las únicas que NFKD reordena, se descartan igual
+    return text.translate(_FOLDING)
+
+
+DEFAULT_PORTS = {'http': ':80', 'https': ':443', 'rtmp': ':1935', 'rtsp': ':554'}
+URL_PARTS = re.compile(r'([A-Za-z][A-Za-z0-9+.-]*)://([^/?#]*)([^#]*)')  # Esquema, host y ruta
+
+
+def normalize_url(url: str) -> str:
+    """URL canónica para detectar duplicados
+
+    Esquema y host en minúsculas, sin puerto por defecto, sin fragmento y sin
+    el '/;' (o '/') final que agregan muchos servidores Shoutcast.
+    """
+    url = url.strip()
+    match = URL_PARTS.match(url)
+    if match is None:
+        return url
+    scheme, host, path = match.groups()
+    scheme, host = scheme.lower(), host.lower()
+    port = DEFAULT_PORTS.get(scheme)
+    if port and host.endswith(port):
+        host = host[:-len(port)]
+    if '?' not in path:
+        path = path.rstrip(';').rstrip('/')
+    return f'{scheme}://{host}{path}'
+
+
+def url_hash(url: str) -> str:
+    """Hash de 64 bits (en hexadecimal) de la URL normalizada"""
+    return hashlib.blake2b(normalize_url(url).encode('utf-8'), digest_size=8).hexdigest()
+
+
+def cache_dir() -> str:
+    """Directorio de cachés persistentes ($XDG_CACHE_HOME/radio-cli)"""
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    path = os.path.join(base, 'radio-cli')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def data_dir() -> str:
+    """Directorio de datos del usuario ($XDG_DATA_HOME/radio-cli)"""
+    base = os.environ.get('XDG_DATA_HOME') or os.path.join(os.path.expanduser('~'), '.local', 'share')
+    path = os.path.join(base, 'radio-cli')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+class Station:
+    """Estación de radio con representación compacta"""
+    __slots__ = ('title', 'url')
+
+    def __init__(self, title: str, url: str):
+        self.title = title
+        self.url = url
+
+    def __repr__(self) -> str:
+        return f"Station({self.title!r}, {self.url!r})"
+
+
+class StationStore:
+    """Catálogo ordenado respaldado por una caché binaria mapeada en memoria
+
+    El archivo guarda tres columnas (título, URL y texto de búsqueda
+    normalizado), cada una como un arreglo de offsets seguido de los datos en
+    UTF-8. Las estaciones se decodifican solo al accederlas, así que abrir un
+    catálogo de cientos de miles de entradas no crea ningún objeto por
+    estación. La caché se invalida por mtime/tamaño y, si estos cambian, por
+    el hash del contenido del archivo fuente.
+    """
+
+    MAGIC = b'RCST'
+    VERSION = 1
+    HEADER = struct.Struct('<4sIqq20sI')  # magic, versión, mtime_ns, tamaño, sha1, cantidad
+
+    def __init__(self, buffer, source_info: Optional[tuple] = None):
+        self._buffer = buffer  # mmap o bytes; se conserva mientras vivan las vistas
+        view = memoryview(buffer)
+        magic, version, mtime_ns, size, digest, count = self.HEADER.unpack_from(view)
+        if magic != self.MAGIC or version != self.VERSION:
+            raise ValueError('caché de estaciones con formato desconocido')
+        self.source_info = (mtime_ns, size, digest)
+        self._count = count
+
+        position = self.HEADER.size
+        columns = []
+        for _ in range(3):
+            data_size, = struct.unpack_from('<I', view, position)
+            position += 4
+            offsets = view[position:position + 4 * (count + 1)].cast('I')
+            position += 4 * (count + 1)
+            columns.append((offsets, view[position:position + data_size]))
+            position += data_size + (-data_size % 4)
+        self._titles, self._urls, self._search = columns
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index: int) -> Station:
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError('estación fuera de rango')
+        return Station(self.title(index), self.url(index))
+
+    def __iter__(self):
+        for index in range(self._count):
+            yield self[index]
+
+    @staticmethod
+    def _field(column, index: int) -> str:
+        offsets, data = column
+        return str(data[offsets[index]:offsets[index + 1]], 'utf-8')
+
+    def title(self, index: int) -> str:
+        return self._field(self._titles, index)
+
+    def url(self, index: int) -> str:
+        return self._field(self._urls, index)
+
+    def find(self, title: str, url: str) -> Optional[int]:
+        """Posición de una estación por título y URL (búsqueda binaria, O(log n))"""
+        key = (normalize_text(title), title, url)
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            current = self.title(middle)
+            if (normalize_text(current), current, self.url(middle)) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self._count and self.title(low) == title and self.url(low) == url:
+            return low
+        return None
+
+    def search_text(self):
+        """Texto de búsqueda concatenado y el offset (en caracteres) de cada estación"""
+        offsets, data = self._search
+        return str(data, 'utf-8'), offsets
+
+    @classmethod
+    def build(cls, records, source_info: tuple = (0, 0, b'\0' * 20)) -> bytes:
+        """Serializar estaciones (dicts con title/url/tags) ordenadas por título"""
+        rows = []
+        for record in records:
+            title, url = record['title'], record['url']
+            extra = url + ' ' + ' '.join(record.get('tags', ()))
+            rows.append((normalize_text(title), title, url, normalize_text(extra)))
+        rows.sort()
+
+        out = io.BytesIO()
+        cls.write(rows, out, source_info, spool=io.BytesIO)
+        return out.getvalue()
+
+    @classmethod
+    def write(cls, rows, out, source_info: tuple = (0, 0, b'\0' * 20), spool=tempfile.TemporaryFile) -> int:
+        """Escribir filas ya ordenadas (búsqueda, título, URL, extra) en el formato de la caché
+
+        Las filas se recorren una sola vez: los datos de cada columna van a un
+        archivo temporal y en memoria quedan solo los offsets (12 bytes por
+        estación), así se puede escribir un catálogo de millones de entradas.
+        Devuelve la cantidad de estaciones.
+        """
+        # Título y URL con offsets en bytes; búsqueda con offsets en caracteres
+        # (uno por estación más el separador '\n') para usarlos sobre el texto decodificado
+        offsets = [array.array('I', [0]) for _ in range(3)]
+        spools = [spool() for _ in range(3)]
+        try:
+            title_offsets, url_offsets, search_offsets = offsets
+            titles, urls, search = spools
+            search_size = 0
+            for hay, title, url, extra in rows:
+                data = title.encode('utf-8')
+                titles.write(data)
+                title_offsets.append(title_offsets[-1] + len(data))
+                data = url.encode('utf-8')
+                urls.write(data)
+                url_offsets.append(url_offsets[-1] + len(data))
+                text = hay + '\x01' + extra
+                data = (text if search_size == 0 else '\n' + text).encode('utf-8')
+                search.write(data)
+                search_size += len(data)
+                search_offsets.append(search_offsets[-1] + len(text) + 1)
+            count = len(title_offsets) - 1
+
+            out.write(cls.HEADER.pack(cls.MAGIC, cls.VERSION, source_info[0], source_info[1],
+                                      source_info[2], count))
+            sizes = (title_offsets[-1], url_offsets[-1], search_size)
+            for column, data_size, column_spool in zip(offsets, sizes, spools):
+                out.write(struct.pack('<I', data_size))
+                out.write(column.tobytes())
+                column_spool.seek(0)
+                shutil.copyfileobj(column_spool, out)
+                out.write(b'\0' * (-data_size % 4))
+        finally:
+            for column_spool in spools:
+                column_spool.close()
+        return count
+
+    @classmethod
+    def cache_path(cls, source: str) -> str:
+        key = hashlib.sha1(os.path.abspath(source).encode('utf-8')).hexdigest()[:16]
+        return os.path.join(cache_dir(), f'stations-{key}.bin')
+
+    @classmethod
+    def is_store(cls, path: str) -> bool:
+        """Indica si el archivo ya es un catálogo compacto (p.ej. uno importado)"""
+        try:
+            with open(path, 'rb') as f:
+                return f.read(len(cls.MAGIC)) == cls.MAGIC
+        except OSError:
+            return False
+
+    @classmethod
+    def open_cached(cls, source: str) -> Optional['StationStore']:
+        """Abrir la caché solo si está al día (sin leer el origen); si no, None"""
+        if cls.is_store(source):
+            return cls._open_cache(source)
+        try:
+            stat = os.stat(source)
+            store = cls._open_cache(cls.cache_path(source))
+        except OSError:
+            return None
+        if store is not None and store.source_info[:2] != (stat.st_mtime_ns, stat.st_size):
+            store.close()
+            store = None
+        return store
+
+    @classmethod
+    def open(cls, source: str) -> 'StationStore':
+        """Abrir el catálogo desde la caché, reconstruyéndola si el origen cambió"""
+        if cls.is_store(source):
+            store = cls._open_cache(source)
+            if store is None:
+                raise ValueError('catálogo compacto dañado')
+            return store
+        stat = os.stat(source)
+        try:
+            path = cls.cache_path(source)
+        except OSError:
+            path = None
+
+        digest = None
+        if path is not None:
+            store = cls._open_cache(path)
+            if store is not None:
+                mtime_ns, size, cached_digest = store.source_info
+                if (mtime_ns, size) == (stat.st_mtime_ns, stat.st_size):
+                    return store
+                # Cambió el mtime: solo reconstruir si cambió el contenido
+                digest = cls._digest(source)
+                if digest == cached_digest:
+                    store.close()
+                    cls._touch_cache(path, stat)
+                    return cls._open_cache(path) or cls._rebuild(source, stat, digest, None)
+                store.close()
+
+        return cls._rebuild(source, stat, digest or cls._digest(source), path)
+
+    @classmethod
+    def _rebuild(cls, source: str, stat, digest: bytes, path: Optional[str]) -> 'StationStore':
+        with open(source, 'r', encoding='utf-8') as f:
+            records = json.load(f)
+        data = cls.build(records, (stat.st_mtime_ns, stat.st_size, digest))
+
+        if path is not None:
+            # Escritura atómica: nunca se lee una caché a medio escribir
+            try:
+                temp = f'{path}.{os.getpid()}.tmp'
+                with open(temp, 'wb') as f:
+                    f.write(data)
+                os.replace(temp, path)
+            except OSError:
+                pass
+        return cls(data)
+
+    @classmethod
+    def _open_cache(cls, path: str) -> Optional['StationStore']:
+        try:
+            with open(path, 'rb') as f:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        try:
+            return cls(buffer)
+        except (ValueError, TypeError, struct.error):
+            buffer.close()
+            return None
+
+    @classmethod
+    def _touch_cache(cls, path: str, stat):
+        """Actualizar mtime/tamaño del origen en la cabecera sin reescribir los datos"""
+        try:
+            with open(path, 'r+b') as f:
+                f.seek(8)
+                f.write(struct.pack('<qq', stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            pass
+
+    @staticmethod
+    def _digest(source: str) -> bytes:
+        digest = hashlib.sha1()
+        with open(source, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        return digest.digest()
+
+    def close(self):
+        """Liberar el mapeo (solo si no quedan vistas en uso)"""
+        self._titles = self._urls = self._search = None
+        if isinstance(self._buffer, mmap.mmap):
+            try:
+                self._buffer.close()
+            except BufferError:
+                pass
+
+
+class StationView:
+    """Subconjunto del catálogo por índices, sin copiar estaciones"""
+
+    def __init__(self, store: StationStore, ids):
+        self.store = store
+        self.ids = ids
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, position: int) -> Station:
+        return self.store[self.ids[position]]
+
+
+class RankedView(StationView):
+    """Catálogo con algunas estaciones adelante y el resto en su orden, sin copiarlo"""
+
+    def __init__(self, store: StationStore, head: List[int]):
+        super().__init__(store, head)
+        self._moved = sorted(head)
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    def __getitem__(self, position: int) -> Station:
+        if position < len(self.ids):
+            return self.store[self.ids[position]]
+        # Posición en el catálogo: saltar las estaciones que se movieron adelante
+        rest = position - len(self.ids)
+        entry = rest + bisect.bisect_right(self._moved, rest)
+        while entry != rest + bisect.bisect_right(self._moved, entry):
+            entry = rest + bisect.bisect_right(self._moved, entry)
+        return self.store[entry]
+
+
+class SearchResults(StationView):
+    """Resultados de una búsqueda, materializados a medida que se necesitan
+
+    Los primeros TOP_K resultados vienen ordenados por relevancia (el título
+    empieza por la consulta, luego alguna palabra empieza por ella). El resto
+    son coincidencias de subcadena en orden de catálogo que se buscan por
+    tramos: basta con encontrar la primera página para responder a la tecla y
+    el recuento se completa en los ratos libres del bucle principal. El texto
+    se recorre en tramos de CHUNK caracteres para poder cortar a tiempo aunque
+    la consulta no aparezca en ninguna parte.
+    """
+
+    CHUNK = 1 << 16  # Caracteres del texto del catálogo revisados entre consultas del reloj
+
+    def __init__(self, index: 'StationIndex', query: str, head: List[int], source: Optional[List[int]] = None):
+        super().__init__(index.store, list(head))
+        self.index = index
+        self.query = query
+        self._seen = set(head)
+        self._source = source  # Candidatos en orden de catálogo, o None para todo el catálogo
+        self._pos = 0
+        self.complete = False
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, position: int) -> Station:
+        if position >= len(self.ids) and not self.complete:
+            self.ensure(position + 1)
+        return self.store[self.ids[position]]
+
+    def ensure(self, count: int, budget: Optional[float] = None):
+        """Buscar coincidencias hasta tener al menos `count` (si existen), o durante `budget` segundos"""
+        if len(self.ids) < count and not self.complete:
+            self._scan(count, None if budget is None else time.perf_counter() + budget)
+
+    def extend(self, budget: float) -> bool:
+        """Seguir buscando durante `budget` segundos; indica si hubo cambios"""
+        if self.complete:
+            return False
+        before = len(self.ids)
+        self._scan(None, time.perf_counter() + budget)
+        return len(self.ids) != before or self.complete
+
+    def finish(self):
+        """Completar la búsqueda (p.ej. para saltar al último resultado)"""
+        if not self.complete:
+            self._scan(None, None)
+
+    def _scan(self, want: Optional[int], deadline: Optional[float]):
+        query = self.query
+        ids, seen = self.ids, self._seen
+        steps = 0
+
+        if self._source is None:
+            # Recorrer el texto concatenado del catálogo con str.find (en C)
+            blob, starts = self.index.blob, self.index.starts
+            find = blob.find
+            size, overlap = len(blob), len(query) - 1
+            pos = self._pos
+            while True:
+                # Un tramo por vez: las coincidencias que empiezan en él
+                end = min(size, pos + self.CHUNK)
+                found = find(query, pos, end + overlap)
+                if found == -1:
+                    pos = end
+                    if pos >= size:
+                        self.complete = True
+                        break
+                    if deadline is not None and time.perf_counter() >= deadline:
+                        break
+                    continue
+                entry = bisect.bisect_right(starts, found) - 1
+                if entry not in seen:
+                    ids.append(entry)
+                    seen.add(entry)
+                pos = starts[entry + 1]
+                steps += 1
+                if want is not None and len(ids) >= want:
+                    break
+                if deadline is not None and steps % 256 == 0 and time.perf_counter() >= deadline:
+                    break
+            self._pos = pos
+        else:
+            # Refinar una búsqueda anterior: solo se revisan sus resultados
+            source, hay = self._source, self.index.hay
+            pos = self._pos
+            while pos < len(source):
+                entry = source[pos]
+                pos += 1
+                if entry not in seen and query in hay(entry):
+                    ids.append(entry)
+                    seen.add(entry)
+                    if want is not None and len(ids) >= want:
+                        break
+                if deadline is not None and pos % 1024 == 0 and time.perf_counter() >= deadline:
+                    break
+            else:
+                self.complete = True
+            self._pos = pos
+
+
+class StationIndex:
+    """Índice de búsqueda sobre títulos normalizados (y URL/etiquetas)
+
+    Guarda el texto normalizado de todas las estaciones concatenado en una sola
+    cadena, de modo que las coincidencias se localizan con str.find, y una
+    tablas ordenadas de títulos y de palabras de título para calcular el top-k
+    por relevancia con búsqueda binaria. Todo se prepara recién al empezar a
+    buscar; las tablas se construyen en segundo plano y mientras tanto los
+    resultados salen en orden de catálogo.
+    """
+
+    TOP_K = 50          # Resultados ordenados por relevancia
+    RANK_SCAN = 2000    # Entradas de la tabla de palabras revisadas para el top-k
+    NARROW_MAX = 20000  # Tamaño máximo de un resultado anterior para refinarlo
+
+    def __init__(self, store: StationStore):
+        self.store = store
+        self.blob = None
+        self.starts = None
+        self._titles = None  # (títulos ordenados, estación de cada título)
+        self._words = None   # (palabras ordenadas, estación de cada palabra)
+        self._builder = None  # Hilo que construye las tablas
+
+    def prepare(self):
+        """Cargar el texto de búsqueda y construir las tablas de ranking"""
+        if self.blob is not None:
+            return
+        # El texto normalizado ya viene precalculado en la caché del catálogo
+        self.blob, self.starts = self.store.search_text()
+        self._builder = threading.Thread(target=self._build_tables, daemon=True)
+        self._builder.start()
+
+    def wait(self, timeout: Optional[float] = None):
+        """Esperar a que estén las tablas de ranking (para mediciones reproducibles)"""
+        self.prepare()
+        self._builder.join(timeout)
+
+    def _build_tables(self):
+        titles, words = [], []
+        for entry in range(len(self.store)):
+            hay = self.hay(entry)
+            title = hay[:hay.index('\x01')]
+            titles.append((title, entry))
+            for word in title.split()[1:]:
+                words.append((sys.intern(word), entry))
+        titles.sort()
+        words.sort()
+        self._words = ([word for word, _ in words], [entry for _, entry in words])
+        self._titles = ([title for title, _ in titles], [entry for _, entry in titles])
+
+    def hay(self, entry: int) -> str:
+        """Texto normalizado de una estación (título, '\\x01', URL y etiquetas)"""
+        return self.blob[self.starts[entry]:self.starts[entry + 1] - 1]
+
+    def _prefix_range(self, table, prefix: str, limit: int) -> List[int]:
+        """Estaciones cuya clave en la tabla ordenada empieza por `prefix`"""
+        keys, entries = table
+        found = []
+        position = bisect.bisect_left(keys, prefix)
+        while position < len(keys) and len(found) < limit and keys[position].startswith(prefix):
+            found.append(entries[position])
+            position += 1
+        return found
+
+    def _rank_head(self, query: str) -> List[int]:
+        """Mejores TOP_K coincidencias: prefijo del título, luego inicio de palabra"""
+        if self._titles is None or not query:
+            return []
+
+        # Títulos que empiezan por la consulta: un rango contiguo de la tabla
+        head = sorted(self._prefix_range(self._titles, query, self.TOP_K))
+        if len(head) >= self.TOP_K:
+            return head
+
+        # Palabras (no iniciales) que empiezan por la consulta
+        first_word = query.split()[0] if query.split() else query
+        candidates = self._prefix_range(self._words, first_word, self.RANK_SCAN)
+        ranked = set(head)
+        word_starts = []
+        for entry in candidates:
+            hay = self.hay(entry)
+            if entry not in ranked and query in hay[:hay.index('\x01')]:
+                ranked.add(entry)
+                word_starts.append(entry)
+        return head + heapq.nsmallest(self.TOP_K - len(head), word_starts)
+
+    def search(self, query: str, previous: Optional[SearchResults] = None,
+               preferred: Optional[List[int]] = None) -> SearchResults:
+        """Buscar estaciones; si la consulta amplía la anterior se refinan sus resultados
+
+        Las coincidencias entre `preferred` (favoritas y recientes) van primero.
+        """
+        self.prepare()
+        query = normalize_text(query.lstrip())
+        source = None
+        if (previous is not None and previous.complete and query.startswith(previous.query)
+                and len(previous) <= self.NARROW_MAX):
+            source = sorted(previous.ids)
+
+        head = self._rank_head(query)
+        if preferred:
+            first = [entry for entry in preferred if query in self.hay(entry)]
+            if first:
+                chosen = set(first)
+                head = first + [entry for entry in head if entry not in chosen]
+        results = SearchResults(self, query, head, source)
+        return results
+
+
+class CatalogImporter:
+    """Importación de varias fuentes a un único catálogo compacto y ordenado
+
+    Acepta archivos JSON (arreglos o una estación por línea, con title/name,
+    url/url_resolved y tags), CSV con cabecera, listas M3U y PLS, y
+    directorios con cualquiera de ellos. Cada archivo se lee en streaming y se
+    convierte en un segmento ordenado por título (tramos de RUN_SIZE filas
+    ordenados en memoria y luego mezclados) que queda guardado con el mtime y
+    el tamaño del origen: al reimportar solo se releen los archivos que
+    cambiaron. Al final se mezclan los segmentos descartando las URLs
+    repetidas (por hash de la URL normalizada; gana la primera fuente de la
+    lista) y se escribe el StationStore que abre la interfaz.
+    """
+
+    RUN_SIZE = 100000  # Filas ordenadas en memoria por tramo
+    CHUNK = 1 << 20  # Caracteres leídos por vez de un arreglo JSON
+    MAX_RECORD = 16 << 20  # Un objeto JSON más grande que esto se da por dañado
+    EXTENSIONS = ('.json', '.jsonl', '.ndjson', '.csv', '.m3u', '.m3u8', '.pls')
+    CONTROL = dict.fromkeys(range(32), ' ')  # Tabs, saltos de línea y demás caracteres de control
+
+    def __init__(self, output: str, work_dir: Optional[str] = None):
+        self.output = output
+        if work_dir is None:
+            key = hashlib.sha1(os.path.abspath(output).encode('utf-8')).hexdigest()[:16]
+            work_dir = os.path.join(cache_dir(), f'import-{key}')
+        self.work_dir = work_dir
+        self.state_path = os.path.join(work_dir, 'sources.json')
+
+    @classmethod
+    def expand(cls, sources: List[str]) -> List[str]:
+        """Archivos a importar en el orden dado (los directorios se recorren ordenados)"""
+        files = []
+        for source in sources:
+            if os.path.isdir(source):
+                for root, dirs, names in os.walk(source):
+                    dirs.sort()
+                    files.extend(os.path.join(root, name) for name in sorted(names)
+                                 if name.lower().endswith(cls.EXTENSIONS))
+            else:
+                files.append(source)
+        return list(dict.fromkeys(os.path.abspath(path) for path in files))
+
+    def run(self, sources: List[str], progress: Optional[Callable[[str], None]] = None) -> Dict:
+        """Importar las fuentes y devolver las estadísticas de lo hecho"""
+        start = time.perf_counter()
+        os.makedirs(self.work_dir, exist_ok=True)
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = {}
+        previous = state.get('files', {})
+
+        files = self.expand(sources)
+        stats = {'files': len(files), 'parsed': 0, 'read': 0}
+        entries = {}
+        for path in files:
+            stat = os.stat(path)
+            entry = previous.get(path)
+            if (entry is None or (entry['mtime_ns'], entry['size']) != (stat.st_mtime_ns, stat.st_size)
+                    or not os.path.exists(entry['segment'])):
+                if progress:
+                    progress(path)
+                name = hashlib.sha1(path.encode('utf-8')).hexdigest()[:16]
+                segment = os.path.join(self.work_dir, f'{name}.seg')
+                entry = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'segment': segment,
+                         'rows': self.build_segment(path, segment)}
+                stats['parsed'] += 1
+            stats['read'] += entry['rows']
+            entries[path] = entry
+
+        # Segmentos de fuentes que ya no se importan
+        for path, entry in previous.items():
+            if path not in entries:
+                try:
+                    os.remove(entry['segment'])
+                except OSError:
+                    pass
+
+        stats['rebuilt'] = not (stats['parsed'] == 0 and state.get('order') == files
+                                and 'stations' in state and os.path.exists(self.output))
+        if stats['rebuilt']:
+            stats['stations'] = self.merge([entries[path]['segment'] for path in files])
+        else:
+            stats['stations'] = state['stations']
+        stats['duplicates'] = stats['read'] - stats['stations']
+
+        state = {'files': entries, 'order': files, 'stations': stats['stations']}
+        temp = f'{self.state_path}.{os.getpid()}.tmp'
+        with open(temp, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(temp, self.state_path)
+        stats['seconds'] = time.perf_counter() - start
+        return stats
+
+    # Lectura de las fuentes
+
+    def records(self, path: str):
+        """(título, URL, etiquetas) de cada estación de un archivo"""
+        lower = path.lower()
+        if lower.endswith(('.m3u', '.m3u8')):
+            return self.read_m3u(path)
+        if lower.endswith('.pls'):
+            return self.read_pls(path)
+        if lower.endswith('.csv'):
+            return self.read_csv(path)
+        return self.read_json(path)
+
+    @staticmethod
+    def station(record) -> Optional[tuple]:
+        """Estación de un objeto JSON o fila CSV (formato de radios.json o de radio-browser)"""
+        if not isinstance(record, dict):
+            return None
+        url = record.get('url') or record.get('url_resolved')
+        if not isinstance(url, str) or not url.strip():
+            return None
+        title = record.get('title') or record.get('name') or url
+        tags = record.get('tags') or ()
+        if isinstance(tags, str):
+            tags = tags.split(',')
+        return str(title), url, [str(tag) for tag in tags]
+
+    def read_json(self, path: str):
+        """Arreglo JSON decodificado objeto por objeto, o JSON Lines"""
+        with open(path, 'r', encoding='utf-8-sig') as f:
+            first = f.read(1)
+            while first.isspace():
+                first = f.read(1)
+            if first == '[':
+                records = self._json_array(f)
+            elif first:
+                records = self._json_lines(itertools.chain([first + f.readline()], f))
+            else:
+                records = ()
+            for record in records:
+                station = self.station(record)
+                if station is not None:
+                    yield station
+
+    def _json_array(self, f):
+        decoder = json.JSONDecoder()
+        buffer, position = "", 0
+        while True:
+            # Saltar separadores pidiendo más texto cuando se acaba el búfer
+            while True:
+                while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                    position += 1
+                if position < len(buffer):
+                    break
+                buffer, position = f.read(self.CHUNK), 0
+                if not buffer:
+                    raise ValueError('arreglo JSON sin cerrar')
+            if buffer[position] == ']':
+                return
+            try:
+                record, end = decoder.raw_decode(buffer, position)
+            except ValueError:
+                # Objeto cortado al final del búfer: sumar el tramo siguiente
+                more = f.read(self.CHUNK)
+                if not more or len(buffer) - position > self.MAX_RECORD:
+                    raise
+                buffer, position = buffer[position:] + more, 0
+                continue
+            yield record
+            position = end
+
+    @staticmethod
+    def _json_lines(lines):
+        decode = json.JSONDecoder().decode
+        for line in lines:
+            line = line.strip()
+            if line:
+                try:
+                    yield decode(line)
+                except ValueError:
+                    continue  # Línea dañada: se saltea
+
+    def read_csv(self, path: str):
+        import csv  # Solo para importar
+        with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+            for row in csv.DictReader(f):
+                station = self.station(row)
+                if station is not None:
+                    yield station
+
+    @staticmethod
+    def read_m3u(path: str):
+        """Entradas de una lista M3U; título de #EXTINF (o del archivo) y group-title como etiqueta"""
+        fallback = os.path.splitext(os.path.basename(path))[0]
+        title, tags = None, []
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                if line.startswith('#'):
+                    if line[:8].upper() == '#EXTINF:':
+                        # Atributos entre comillas (pueden tener comas) y luego ",Título"
+                        info, quoted, split = line[8:], False, -1
+                        for position, char in enumerate(info):
+                            if char == '"':
+                                quoted = not quoted
+                            elif char == ',' and not quoted:
+                                split = position
+                                break
+                        title = info[split + 1:].strip() if split >= 0 else None
+                        group = info.find('group-title="')
+                        tags = [info[group + 13:info.find('"', group + 13)]] if group >= 0 else []
+                    continue
+                yield title or fallback, line, tags
+                title, tags = None, []
+
+    @staticmethod
+    def read_pls(path: str):
+        """Entradas de una lista PLS (FileN y TitleN)"""
+        fallback = os.path.splitext(os.path.basename(path))[0]
+        entries = {}
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                key, sep, value = line.strip().partition('=')
+                key = key.lower()
+                if not sep or not key.startswith(('file', 'title')):
+                    continue
+                field = 'file' if key.startswith('file') else 'title'
+                number = key[len(field):]
+                entries.setdefault(number, {})[field] = value.strip()
+        for number in sorted(entries, key=lambda n: int(n) if n.isdigit() else 0):
+            entry = entries[number]
+            if entry.get('file'):
+                yield entry.get('title') or fallback, entry['file'], []
+
+    # Segmentos y mezcla
+
+    def build_segment(self, path: str, segment: str) -> int:
+        """Leer un archivo y guardarlo como segmento ordenado; devuelve sus filas
+
+        Cada fila es una línea "búsqueda, título, URL, extra, hash de la URL"
+        separada por tabs: sin caracteres de control en los campos, el orden de
+        las líneas coincide con el de las tuplas que ordena StationStore.build.
+        """
+        control = self.CONTROL
+        runs = []
+        rows = []
+        count = 0
+        try:
+            for title, url, tags in self.records(path):
+                title, url = title.strip(), url.strip()
+                extra = url + ' ' + ' '.join(tags)
+                if not (title + extra).isprintable():
+                    title, url, extra = title.translate(control), url.translate(control), extra.translate(control)
+                rows.append(f'{normalize_text(title)}\t{title}\t{url}\t{normalize_text(extra)}\t{url_hash(url)}\n')
+                if len(rows) >= self.RUN_SIZE:
+                    runs.append(self._spill(rows))
+                    count += len(rows)
+                    rows = []
+            count += len(rows)
+            rows.sort()
+            if runs:
+                runs.append(self._spill(rows))
+                rows = heapq.merge(*runs)
+            temp = f'{segment}.{os.getpid()}.tmp'
+            with open(temp, 'w', encoding='utf-8') as out:
+                out.writelines(rows)
+            os.replace(temp, segment)
+        finally:
+            for run in runs:
+                run.close()
+        return count
+
+    def _spill(self, rows: List[str]):
+        """Ordenar un tramo y pasarlo a un archivo temporal"""
+        rows.sort()
+        run = tempfile.TemporaryFile('w+', encoding='utf-8', dir=self.work_dir)
+        run.writelines(rows)
+        run.seek(0)
+        return run
+
+    def _sorted(self, lines, runs: list):
+        """Ordenar líneas en tramos de RUN_SIZE pasados a disco (los archivos se suman a `runs`)"""
+        rows, mine = [], []
+        for line in lines:
+            rows.append(line)
+            if len(rows) >= self.RUN_SIZE:
+                mine.append(self._spill(rows))
+                rows = []
+        rows.sort()
+        runs.extend(mine)
+        return heapq.merge(*mine, rows) if mine else iter(rows)
+
+    def merge(self, segments: List[str]) -> int:
+        """Mezclar los segmentos por título sin URLs repetidas y escribir el catálogo
+
+        Las repetidas se buscan sin un conjunto en memoria: las claves
+        "hash, fuente, fila" de todas las filas se ordenan en disco y en cada
+        grupo con el mismo hash gana la primera fuente de la lista. Las demás
+        filas del grupo se anotan, por segmento, para saltearlas en la mezcla.
+        """
+        runs = []
+        skips = [tempfile.TemporaryFile('w+', encoding='utf-8', dir=self.work_dir) for _ in segments]
+        try:
+            def keys():
+                for source, segment in enumerate(segments):
+                    with open(segment, 'r', encoding='utf-8') as f:
+                        for number, line in enumerate(f):
+                            yield f'{line[-17:-1]}\t{source:08x}\t{number:010x}\n'
+
+            def duplicates():
+                previous = None
+                for key in self._sorted(keys(), runs):
+                    if key[:16] == previous:
+                        yield key[17:]
+                    else:
+                        previous = key[:16]
+
+            # Ordenadas por fuente y fila: cada segmento recibe las suyas en orden
+            for line in self._sorted(duplicates(), runs):
+                skips[int(line[:8], 16)].write(line[9:])
+            for run in runs:
+                run.close()
+            runs = []
+
+            def rows(segment: str, skip):
+                skip.seek(0)
+                next_skip = int(skip.readline() or '-1', 16)
+                with open(segment, 'r', encoding='utf-8') as f:
+                    for number, line in enumerate(f):
+                        if number == next_skip:
+                            next_skip = int(skip.readline() or '-1', 16)
+                            continue
+                        yield line
+
+            def fields(lines):
+                for line in lines:
+                    hay, title, url, extra, _ = line.split('\t')
+                    yield hay, title, url, extra
+
+            merged = heapq.merge(*(rows(segment, skip) for segment, skip in zip(segments, skips)))
+            directory = os.path.dirname(os.path.abspath(self.output))
+            os.makedirs(directory, exist_ok=True)
+            temp = f'{self.output}.{os.getpid()}.tmp'
+            with open(temp, 'wb') as out:
+                count = StationStore.write(fields(merged), out)
+            os.replace(temp, self.output)
+        finally:
+            for run in runs + skips:
+                run.close()
+        return count
+
+
+class BackgroundLoop:
+    """Bucle asyncio en un hilo propio para tareas de red en segundo plano"""
+
+    def __init__(self):
+        self.loop = None
+        self._thread = None
+        self._ready = threading.Event()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def _run(self):
+        import asyncio  # Diferido: es la importación más costosa del arranque
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self._ready.set()
+        self.loop.run_forever()
+
+    def submit(self, coroutine):
+        """Programar una corrutina desde otro hilo; devuelve un concurrent Future"""
+        import asyncio
+        self.start()
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=2)
+        self._thread = None
+
+
+class ProbeResult:
+    """Resultado de sondear un stream: estado, latencias y cabeceras ICY"""
+    __slots__ = ('url', 'ok', 'status', 'connect_ms', 'ttfb_ms', 'bitrate',
+                 'codec', 'name', 'title', 'error', 'checked')
+
+    FIELDS = __slots__[1:]
+
+    def __init__(self, url: str):
+        self.url = url
+        self.ok = False
+        self.status = 0
+        self.connect_ms = None
+        self.ttfb_ms = None
+        self.bitrate = None
+        self.codec = None
+        self.name = None
+        self.title = None  # Tema según el primer bloque ICY (solo si se pidió)
+        self.error = None
+        self.checked = 0.0
+
+    def to_dict(self) -> Dict:
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    @classmethod
+    def from_dict(cls, url: str, data: Dict) -> 'ProbeResult':
+        result = cls(url)
+        for field in cls.FIELDS:
+            if field in data:
+                setattr(result, field, data[field])
+        return result
+
+
+class HealthCache:
+    """Resultados de sondeo persistidos en disco con caducidad (TTL)"""
+
+    TTL = 30 * 60
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.version = 0  # Aumenta con cada resultado nuevo
+        self._entries = None
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        self._entries = {}
+        try:
+            if self.path is None:
+                self.path = os.path.join(cache_dir(), 'health.json')
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self._entries = {url: ProbeResult.from_dict(url, entry) for url, entry in data.items()}
+        except (OSError, ValueError, AttributeError):
+            pass
+
+    @property
+    def loaded(self) -> bool:
+        return self._entries is not None
+
+    def load(self):
+        """Leer el archivo de resultados (si no se leyó ya)"""
+        with self._lock:
+            self._load()
+
+    def get(self, url: str) -> Optional[ProbeResult]:
+        """Último resultado conocido, aunque esté vencido"""
+        with self._lock:
+            self._load()
+            return self._entries.get(url)
+
+    def is_fresh(self, result: Optional[ProbeResult]) -> bool:
+        return result is not None and time.time() - result.checked < self.TTL
+
+    def put(self, result: ProbeResult):
+        with self._lock:
+            self._load()
+            self._entries[result.url] = result
+            self._dirty = True
+            self.version += 1
+
+    def save(self):
+        """Guardar en disco (escritura atómica) si hubo cambios"""
+        with self._lock:
+            if not self._dirty or self.path is None:
+                return
+            data = {url: result.to_dict() for url, result in self._entries.items()}
+            self._dirty = False
+        try:
+            temp = f'{self.path}.{os.getpid()}.tmp'
+            with open(temp, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(temp, self.path)
+        except OSError:
+            pass
+
+
+class HttpStreamClient:
+    """Conexiones HTTP/1.0 mínimas sobre asyncio para streams de radio
+
+    Se usa HTTP/1.0 sin keep-alive porque los streams no terminan nunca: solo
+    interesan la línea de estado, las cabeceras y los primeros bytes.
+    """
+
+    USER_AGENT = 'radio-cli/1.0'
+
+    def __init__(self):
+        self._ssl = None
+
+    async def open_stream(self, url: str, extra_headers: str = ''):
+        """Conectar y enviar un GET; devuelve (reader, writer, parts, ms de conexión)"""
+        import asyncio
+        parts = urllib.parse.urlsplit(url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            raise ValueError(f'esquema no soportado: {parts.scheme}')
+
+        secure = parts.scheme == 'https'
+        if secure and self._ssl is None:
+            import ssl
+            self._ssl = ssl.create_default_context()
+
+        connect_started = time.monotonic()
+        reader, writer = await asyncio.open_connection(
+            parts.hostname, parts.port or (443 if secure else 80),
+            ssl=self._ssl if secure else None)
+        connect_ms = (time.monotonic() - connect_started) * 1000
+
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+        host = parts.hostname if parts.port is None else f'{parts.hostname}:{parts.port}'
+        writer.write((f'GET {path} HTTP/1.0\r\nHost: {host}\r\n'
+                      f'User-Agent: {self.USER_AGENT}\r\nAccept: */*\r\n'
+                      f'{extra_headers}\r\n').encode('latin-1'))
+        await writer.drain()
+        return reader, writer, parts, connect_ms
+
+    @staticmethod
+    async def read_head(reader) -> tuple:
+        """Leer línea de estado y cabeceras (HTTP o 'ICY 200 OK')"""
+        return HttpStreamClient.parse_head(await reader.readuntil(b'\r\n\r\n'))
+
+    @staticmethod
+    def parse_head(head: bytes) -> tuple:
+        """Línea de estado y cabeceras ya leídas: (código, cabeceras en minúsculas)"""
+        lines = head.decode('latin-1').split('\r\n')
+        status_parts = lines[0].split(None, 2)
+        if len(status_parts) < 2 or not status_parts[1].isdigit():
+            raise ValueError('respuesta inválida')
+
+        headers = {}
+        for line in lines[1:]:
+            name, sep, value = line.partition(':')
+            if sep:
+                headers[name.strip().lower()] = value.strip()
+        return int(status_parts[1]), headers
+
+    @staticmethod
+    def close_writer(writer):
+        try:
+            writer.close()
+        except (OSError, RuntimeError):
+            pass
+
+
+STREAM_TITLE = re.compile(rb"StreamTitle='(.*?)';", re.S)
+
+
+def icy_title(block: bytes) -> Optional[str]:
+    """StreamTitle de un bloque de metadatos ICY (UTF-8 o, si no, Latin-1)"""
+    match = STREAM_TITLE.search(block)
+    if match is None:
+        return None
+    try:
+        return match.group(1).decode('utf-8').strip()
+    except UnicodeDecodeError:
+        return match.group(1).decode('latin-1').strip()
+
+
+class StreamProber(HttpStreamClient):
+    """Sondeo concurrente de streams HTTP/Icecast/HLS con asyncio
+
+    Abre una conexión por estación (con un límite de concurrencia), mide el
+    tiempo de conexión y el tiempo hasta el primer byte de audio, sigue
+    redirecciones y lee las cabeceras ICY (bitrate, códec, nombre). Para las
+    listas HLS basta con comprobar que la lista sea válida. Con `titles` lee
+    además hasta el primer bloque de metadatos para saber qué suena, con un
+    tope de ancho de banda compartido entre todas las conexiones.
+    """
+
+    CONCURRENCY = 100
+    TIMEOUT = 5.0
+    MAX_REDIRECTS = 5
+    MAX_TITLE_BYTES = 65536  # Si el primer bloque ICY está más lejos no se espera
+
+    CODECS = {
+        'audio/mpeg': 'mp3',
+        'audio/aac': 'aac',
+        'audio/aacp': 'aac+',
+        'audio/ogg': 'ogg',
+        'application/ogg': 'ogg',
+        'audio/flac': 'flac',
+        'application/vnd.apple.mpegurl': 'hls',
+        'application/x-mpegurl': 'hls',
+        'audio/mpegurl': 'hls',
+        'audio/x-mpegurl': 'm3u',
+        'audio/x-scpls': 'pls',
+    }
+
+    def __init__(self, cache: HealthCache, concurrency: int = CONCURRENCY, timeout: float = TIMEOUT,
+                 titles: bool = False, kbps: Optional[int] = None):
+        super().__init__()
+        self.cache = cache
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.titles = titles
+        self.rate = kbps * 125 if kbps else None  # Bytes por segundo entre todos los sondeos
+        self._next_read = 0.0  # Cuándo se puede volver a leer sin pasar el tope
+        self._semaphore = None
+
+    async def probe(self, url: str) -> ProbeResult:
+        """Sondear una estación y guardar el resultado en la caché"""
+        import asyncio
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+
+        result = ProbeResult(url)
+        async with self._semaphore:
+            started = time.monotonic()
+            try:
+                await asyncio.wait_for(self._probe(url, result, started), self.timeout)
+            # Si ya respondió y lo que falla es leer el título, sigue contando como viva
+            except asyncio.TimeoutError:
+                if not result.ok:
+                    result.error = 'timeout'
+            except (OSError, ValueError, asyncio.IncompleteReadError, asyncio.LimitOverrunError) as e:
+                if not result.ok:
+                    result.error = str(e) or type(e).__name__
+
+        result.checked = time.time()
+        self.cache.put(result)
+        return result
+
+    async def probe_all(self, urls, on_result: Optional[Callable[[ProbeResult], None]] = None) -> List[ProbeResult]:
+        """Sondear muchas estaciones respetando el límite de concurrencia"""
+        import asyncio
+        async def one(url):
+            result = await self.probe(url)
+            if on_result:
+                on_result(result)
+            return result
+        return await asyncio.gather(*(one(url) for url in urls))
+
+    async def _probe(self, url: str, result: ProbeResult, started: float):
+        for _ in range(self.MAX_REDIRECTS + 1):
+            reader, writer, parts, connect_ms = await self.open_stream(url, 'Icy-MetaData: 1\r\n')
+            if result.connect_ms is None:
+                result.connect_ms = round(connect_ms, 1)
+            try:
+                status, headers = await self.read_head(reader)
+                result.status = status
+
+                if 300 <= status < 400 and 'location' in headers:
+                    url = urllib.parse.urljoin(url, headers['location'])
+                    continue
+                if status != 200:
+                    result.error = f'HTTP {status}'
+                    return
+
+                content_type = headers.get('content-type', '').split(';')[0].strip().lower()
+                result.codec = self.CODECS.get(content_type, content_type or None)
+                result.name = headers.get('icy-name') or None
+                bitrate = headers.get('icy-br', '').split(',')[0]
+                result.bitrate = int(bitrate) if bitrate.isdigit() else None
+
+                data = await reader.read(4096)
+                if not data:
+                    result.error = 'sin datos'
+                    return
+                if result.codec in ('hls', 'm3u', 'pls') or parts.path.endswith(('.m3u8', '.m3u', '.pls')):
+                    # Listas de reproducción: basta con que sean válidas
+                    if b'#EXTM3U' not in data[:512] and b'[playlist]' not in data[:512].lower() \
+                            and b'http' not in data[:512]:
+                        result.error = 'lista inválida'
+                        return
+                    result.codec = result.codec or 'hls'
+
+                result.ttfb_ms = round((time.monotonic() - started) * 1000, 1)
+                result.ok = True
+                metaint = headers.get('icy-metaint', '')
+                if self.titles and metaint.isdigit() and 0 < int(metaint) <= self.MAX_TITLE_BYTES:
+                    await self.throttle(len(data))
+                    result.title = await self.read_title(reader, int(metaint), data)
+                return
+            finally:
+                self.close_writer(writer)
+
+        result.error = 'demasiadas redirecciones'
+
+    async def throttle(self, count: int):
+        """Esperar lo necesario para no pasar el tope de ancho de banda"""
+        if self.rate is None:
+            return
+        import asyncio
+        now = time.monotonic()
+        start = max(now, self._next_read)
+        self._next_read = start + count / self.rate
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    async def read_title(self, reader, metaint: int, data: bytes) -> Optional[str]:
+        """Saltar el audio hasta el primer bloque ICY y leer su StreamTitle"""
+        skip = metaint - len(data)
+        while skip > 0:
+            chunk = await reader.read(min(skip, 16384))
+            if not chunk:
+                return None
+            await self.throttle(len(chunk))
+            skip -= len(chunk)
+        rest = data[metaint:] if skip < 0 else await reader.readexactly(1)
+        length = rest[0] * 16
+        block = rest[1:length + 1]
+        if len(block) < length:
+            block += await reader.readexactly(length - len(block))
+        return (icy_title(block) or None) if length else None
+
+    def run(self, urls, on_result: Optional[Callable[[ProbeResult], None]] = None) -> List[ProbeResult]:
+        """Sondear en primer plano (modo --check)"""
+        import asyncio
+        return asyncio.run(self.probe_all(urls, on_result))
+
+
+class StreamResolver(HttpStreamClient):
+    """Resolución anticipada de URLs con redirecciones o listas de reproducción
+
+    Sigue redirecciones HTTP y listas PLS/M3U hasta el endpoint de audio real y,
+    en las listas maestras HLS, elige la variante de mayor calidad. El destino
+    se guarda con caducidad para que mpv conecte directo al empezar a
+    reproducir. Si la reproducción del destino falla se descarta, y tras
+    varios fallos la estación se usa sin resolver hasta que caduque la entrada.
+    """
+
+    TTL = 15 * 60
+    TIMEOUT = 5.0
+    MAX_HOPS = 5
+    MAX_FAILURES = 2
+    PLAYLIST_MAX = 64 * 1024
+
+    def __init__(self, background: BackgroundLoop, path: Optional[str] = None):
+        super().__init__()
+        self.background = background
+        self.path = path
+        self._entries = None  # url -> {'target', 'expires', 'failures'}
+        self._pending = set()
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        self._entries = {}
+        try:
+            if self.path is None:
+                self.path = os.path.join(cache_dir(), 'resolved.json')
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self._entries = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+    def lookup(self, url: str) -> Optional[str]:
+        """Destino ya resuelto y vigente de una URL, sin bloquear"""
+        with self._lock:
+            self._load()
+            entry = self._entries.get(url)
+        if entry is None or entry['target'] is None or entry['expires'] < time.time():
+            return None
+        return entry['target']
+
+    def is_pending(self, url: str) -> bool:
+        return url in self._pending
+
+    def prefetch(self, url: str):
+        """Resolver en segundo plano si no hay un destino vigente"""
+        if url in self._pending or self.lookup(url) is not None:
+            return
+        self._pending.add(url)
+        future = self.background.submit(self.resolve(url))
+        future.add_done_callback(lambda _: self._pending.discard(url))
+
+    def report_failure(self, url: str):
+        """Descartar el destino de una URL cuya reproducción falló"""
+        with self._lock:
+            self._load()
+            entry = self._entries.get(url) or {'failures': 0}
+            failures = entry['failures'] + 1
+            if failures >= self.MAX_FAILURES:
+                # Tras varios fallos se deja de resolver: se usa la URL original
+                self._entries[url] = {'target': url, 'expires': time.time() + self.TTL, 'failures': failures}
+            else:
+                # Volver a resolver en la próxima reproducción
+                self._entries[url] = {'target': None, 'expires': 0, 'failures': failures}
+            self._dirty = True
+
+    def _store(self, url: str, target: str):
+        with self._lock:
+            self._load()
+            entry = self._entries.get(url)
+            # Los fallos se olvidan cuando vence el periodo sin resolver
+            failures = entry['failures'] if entry and entry['expires'] == 0 else 0
+            self._entries[url] = {'target': target, 'expires': time.time() + self.TTL, 'failures': failures}
+            self._dirty = True
+
+    async def resolve(self, url: str) -> str:
+        """Resolver una URL; ante cualquier error el destino es la propia URL"""
+        import asyncio
+        try:
+            target = await asyncio.wait_for(self._resolve(url), self.TIMEOUT)
+        except (asyncio.TimeoutError, OSError, ValueError,
+                asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            target = url
+        self._store(url, target)
+        return target
+
+    async def _read_body(self, reader) -> bytes:
+        body = b''
+        while len(body) < self.PLAYLIST_MAX:
+            chunk = await reader.read(self.PLAYLIST_MAX - len(body))
+            if not chunk:
+                break
+            body += chunk
+        return body
+
+    @staticmethod
+    def best_variant(url: str, playlist: str) -> Optional[str]:
+        """Variante de mayor BANDWIDTH de una lista maestra HLS"""
+        best, best_bandwidth = None, -1
+        lines = [line.strip() for line in playlist.splitlines()]
+        for position, line in enumerate(lines):
+            if not line.startswith('#EXT-X-STREAM-INF'):
+                continue
+            bandwidth = 0
+            for attribute in line.split(':', 1)[-1].split(','):
+                name, _, value = attribute.partition('=')
+                if name.strip() == 'BANDWIDTH' and value.strip().isdigit():
+                    bandwidth = int(value)
+            variant = next((l for l in lines[position + 1:] if l and not l.startswith('#')), None)
+            if variant and bandwidth > best_bandwidth:
+                best, best_bandwidth = urllib.parse.urljoin(url, variant), bandwidth
+        return best
+
+    @staticmethod
+    def first_entry(url: str, playlist: str) -> Optional[str]:
+        """Primer stream de una lista PLS o M3U"""
+        pls = playlist.lstrip().lower().startswith('[playlist]')
+        for line in playlist.splitlines():
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            if re.match(r'file\d*\s*=', line, re.I):
+                return urllib.parse.urljoin(url, line.split('=', 1)[1].strip())
+            # En PLS el resto son claves (Title1=, NumberOfEntries=); en M3U,
+            # cualquier otra línea es una entrada, aunque lleve ?sid=1
+            if pls or line.startswith('[') or re.match(r'\w+\s*=', line):
+                continue
+            return urllib.parse.urljoin(url, line)
+        return None
+
+    async def _resolve(self, url: str) -> str:
+        for _ in range(self.MAX_HOPS + 1):
+            reader, writer, parts, _ = await self.open_stream(url)
+            try:
+                status, headers = await self.read_head(reader)
+                if 300 <= status < 400 and 'location' in headers:
+                    url = urllib.parse.urljoin(url, headers['location'])
+                    continue
+                if status != 200:
+                    raise ValueError(f'HTTP {status}')
+
+                kind = StreamProber.CODECS.get(headers.get('content-type', '').split(';')[0].strip().lower())
+                path = parts.path.lower()
+                if kind == 'hls' or path.endswith('.m3u8'):
+                    playlist = (await self._read_body(reader)).decode('utf-8', 'replace')
+                    # Lista maestra: elegir variante; lista de medios: es el destino
+                    return self.best_variant(url, playlist) or url
+                if kind in ('m3u', 'pls') or path.endswith(('.m3u', '.pls')):
+                    playlist = (await self._read_body(reader)).decode('utf-8', 'replace')
+                    entry = self.first_entry(url, playlist)
+                    if entry is None:
+                        raise ValueError('lista vacía')
+                    url = entry
+                    continue
+                return url
+            finally:
+                self.close_writer(writer)
+        raise ValueError('demasiados saltos')
+
+    def save(self):
+        """Guardar los destinos vigentes en disco"""
+        with self._lock:
+            if not self._dirty or self.path is None:
+                return
+            now = time.time()
+            data = {url: entry for url, entry in self._entries.items()
+                    if entry['expires'] > now or entry['failures']}
+            self._dirty = False
+        try:
+            temp = f'{self.path}.{os.getpid()}.tmp'
+            with open(temp, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(temp, self.path)
+        except OSError:
+            pass
+
+
+class History:
+    """Reproducciones y favoritas en un registro de solo agregado
+
+    Cada evento es una línea JSON que un hilo escritor agrega al final de
+    history.jsonl, así reproducir nunca espera al disco. En memoria se lleva
+    la frecencia de cada estación (reproducciones con decaimiento exponencial)
+    en escala logarítmica: sumar una reproducción es O(1) y el orden no cambia
+    con el paso del tiempo, de modo que nunca hay que recalcular. Si al cerrar
+    el registro tiene muchas más líneas que estaciones se compacta en una línea
+    por estación y se olvidan las que ya no pesan: registrar un evento nunca
+    recorre todas las estaciones.
+    """
+
+    HALF_LIFE = 14 * 24 * 3600  # Una reproducción vale la mitad cada dos semanas
+    RATE = math.log(2) / HALF_LIFE
+    FORGET = math.log(0.01)  # Olvidar lo que hoy pesa menos que 1% de una reproducción
+    COMPACT_MIN = 500  # Líneas a partir de las que se considera compactar
+    COMPACT_RATIO = 4  # Compactar con más de 4 líneas por estación recordada
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.entries = {}  # URL -> [log de la frecencia, título, favorita]
+        self.lines = 0  # Líneas del registro en disco
+        self.revision = 0  # Cambia con cada evento (para saber si hay que reordenar)
+        self.loaded = False
+        self._queue = queue.Queue()  # Líneas y compactaciones para el hilo escritor
+        self._writer = None
+
+    def load(self):
+        """Reconstruir la frecencia y las favoritas leyendo el registro"""
+        if self.loaded:
+            return
+        self.loaded = True
+        if self.path is None:
+            self.path = os.path.join(data_dir(), 'history.jsonl')
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    self.lines += 1
+                    try:
+                        self.apply(json.loads(line))
+                    except (ValueError, KeyError, TypeError):
+                        pass  # Línea incompleta (p.ej. el proceso murió escribiéndola)
+        except OSError:
+            pass
+
+    @staticmethod
+    def combine(a: float, b: float) -> float:
+        """log(e^a + e^b) sin desbordes"""
+        high = max(a, b)
+        return high + math.log1p(math.exp(-abs(a - b)))
+
+    def apply(self, record: Dict):
+        """Aplicar un evento del registro al estado en memoria"""
+        url = record['url']
+        entry = self.entries.get(url)
+        if entry is None:
+            entry = self.entries[url] = [-math.inf, record.get('title', ""), False]
+        event = record['event']
+        if event == 'play':
+            entry[0] = self.combine(entry[0], record['time'] * self.RATE)
+            entry[1] = record.get('title', entry[1])
+        elif event == 'score':
+            entry[0] = -math.inf if record.get('score') is None else record['score']
+            entry[2] = bool(record.get('favorite'))
+        elif event in ('favorite', 'unfavorite'):
+            entry[2] = event == 'favorite'
+            entry[1] = record.get('title', entry[1])
+        self.revision += 1
+
+    def played(self, url: str, title: str):
+        self.log({'time': time.time(), 'event': 'play', 'title': title, 'url': url})
+
+    def toggle_favorite(self, url: str, title: str) -> bool:
+        """Marcar o desmarcar una favorita; devuelve el nuevo estado"""
+        favorite = not self.is_favorite(url)
+        self.log({'time': time.time(), 'event': 'favorite' if favorite else 'unfavorite',
+                  'title': title, 'url': url})
+        return favorite
+
+    def is_favorite(self, url: str) -> bool:
+        entry = self.entries.get(url)
+        return entry is not None and entry[2]
+
+    def ranked(self) -> List[tuple]:
+        """(URL, título) de las favoritas y luego de las demás por frecencia"""
+        items = sorted(self.entries.items(), key=lambda item: (not item[1][2], -item[1][0]))
+        return [(url, entry[1]) for url, entry in items]
+
+    def log(self, record: Dict):
+        """Aplicar un evento y encolarlo para el disco (nunca bloquea)"""
+        self.load()
+        self.apply(record)
+        self.lines += 1
+        self._enqueue(('append', record))
+
+    def _enqueue(self, item: tuple):
+        self._queue.put(item)
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._write, daemon=True)
+            self._writer.start()
+
+    def snapshot(self) -> List[Dict]:
+        """Una línea por estación recordada; descarta las que ya no pesan"""
+        now = time.time() * self.RATE
+        records = []
+        for url, (score, title, favorite) in list(self.entries.items()):
+            if not favorite and score - now < self.FORGET:
+                del self.entries[url]
+                continue
+            records.append({'event': 'score', 'title': title, 'url': url, 'favorite': favorite,
+                            'score': None if score == -math.inf else score})
+        return records
+
+    def _write(self):
+        """Hilo escritor: agregar líneas y, si se pide, reescribir el registro compactado"""
+        f = None
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            kind, data = item
+            try:
+                if kind == 'append':
+                    if f is None:
+                        f = open(self.path, 'a', encoding='utf-8')
+                    f.write(json.dumps(data, ensure_ascii=False) + '\n')
+                    if self._queue.empty():
+                        f.flush()
+                else:
+                    if f is not None:
+                        f.close()
+                        f = None
+                    temp = f'{self.path}.{os.getpid()}.tmp'
+                    with open(temp, 'w', encoding='utf-8') as out:
+                        out.writelines(json.dumps(record, ensure_ascii=False) + '\n' for record in data)
+                    os.replace(temp, self.path)
+            except OSError:
+                pass
+        if f is not None:
+            f.close()
+
+    def close(self):
+        """Terminar de escribir lo encolado y compactar el registro si creció demasiado"""
+        if self.loaded and self.lines > max(self.COMPACT_MIN, self.COMPACT_RATIO * len(self.entries)):
+            snapshot = self.snapshot()
+            self.lines = len(snapshot)
+            self._enqueue(('compact', snapshot))
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join(timeout=2)
+            self._writer = None
+
+
+class NowPlaying:
+    """Tema que suena y estado del buffer según los eventos de mpv"""
+
+    __slots__ = ('media_title', 'icy_title', 'buffering', 'core_idle')
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.media_title = ""  # Título que informa mpv (media-title)
+        self.icy_title = ""  # Tema que anuncia la emisora (metadatos ICY)
+        self.buffering = False  # mpv esperando datos (paused-for-cache)
+        self.core_idle = True  # mpv sin reproducir audio (core-idle)
+
+    def update(self, event: Dict) -> bool:
+        """Aplicar un evento de mpv; indica si era uno de los que interesan"""
+        name = event.get('event')
+        if name == 'start-file':
+            self.reset()
+            return True
+        if name != 'property-change':
+            return False
+
+        value = event.get('data')
+        prop = event.get('name')
+        if prop == 'media-title':
+            self.media_title = value or ""
+        elif prop == 'metadata/by-key/icy-title':
+            self.icy_title = value or ""
+        elif prop == 'paused-for-cache':
+            self.buffering = bool(value)
+        elif prop == 'core-idle':
+            self.core_idle = value is not False
+        else:
+            return False
+        return True
+
+    def title(self, *urls: Optional[str]) -> str:
+        """Metadatos ICY o, si no hay, el título de mpv cuando no es la propia URL"""
+        if self.icy_title:
+            return self.icy_title
+        if self.media_title and self.media_title not in urls:
+            return self.media_title
+        return ""
+
+
+class BufferProfiles:
+    """Perfil de buffer de mpv por estación, aprendido de los cortes observados
+
+    Cada estación tiene un nivel en LEVELS. Las que no se conocen empiezan en
+    DEFAULT_LEVEL; un corte por falta de datos (paused-for-cache) la sube un
+    nivel, con más segundos de caché y una espera inicial antes de sonar, y
+    varias escuchas largas sin cortes y con el buffer holgado la bajan, para
+    que arranque antes y con menos memoria. El tope de bytes del demuxer se
+    calcula con el bitrate del último sondeo, y el buffer hacia atrás (que en
+    una radio en vivo solo acumula lo ya escuchado) se desactiva.
+    """
+
+    # cache-secs, demuxer-readahead-secs, cache-pause-wait, cache-pause-initial
+    LEVELS = [
+        (4, 1, 0.5, False),    # Rápida y estable: arranca enseguida con poca memoria
+        (10, 2, 1.0, False),
+        (20, 5, 3.0, True),
+        (40, 10, 5.0, True),   # Inestable: junta unos segundos antes de sonar
+    ]
+    DEFAULT_LEVEL = 1
+    DEFAULT_KBPS = 320  # Bitrate supuesto si el sondeo no lo informó
+    MIN_BYTES = 512 * 1024
+    STABLE_SECS = 120.0  # Escucha sin cortes que cuenta como estable
+    STABLE_PLAYS = 3  # Escuchas estables seguidas para bajar un nivel
+    HEADROOM = 2.0  # Segundos de buffer que nunca faltaron para considerarla holgada
+    WARMUP = 10.0  # Segundos iniciales sin medir el buffer (se está llenando)
+    SAMPLE_INTERVAL = 5.0  # Segundos entre lecturas de demuxer-cache-duration
+    NETWORK = ('http://', 'https://', 'rtmp://', 'rtsp://')
+
+    def __init__(self, health: Optional[HealthCache] = None, path: Optional[str] = None):
+        self.health = health
+        self.path = path
+        self._entries = None  # url -> {'level', 'stable', 'rebuffers', 'updated'}
+        self._dirty = False
+        self.session = None  # Escucha en curso: [url, armada, inicio del audio, cortes, buffer mínimo, en corte]
+        self._sample = None  # Lectura de demuxer-cache-duration en vuelo
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        self._entries = {}
+        try:
+            if self.path is None:
+                self.path = os.path.join(cache_dir(), 'buffering.json')
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self._entries = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+    def level(self, url: str) -> int:
+        self._load()
+        entry = self._entries.get(url)
+        return self.DEFAULT_LEVEL if entry is None else entry['level']
+
+    def options(self, url: str) -> Optional[Dict]:
+        """Propiedades de mpv para reproducir la estación (None: no es un stream de red)"""
+        if not url.startswith(self.NETWORK):
+            return None
+        cache_secs, readahead, pause_wait, pause_initial = self.LEVELS[self.level(url)]
+        result = self.health.get(url) if self.health is not None else None
+        kbps = result.bitrate if result is not None and result.bitrate else self.DEFAULT_KBPS
+        # El doble de lo que ocupan cache-secs a ese bitrate
+        max_bytes = max(self.MIN_BYTES, int(cache_secs * kbps * 1000 / 8 * 2))
+        return {
+            'cache-secs': cache_secs,
+            'demuxer-readahead-secs': readahead,
+            'demuxer-max-bytes': max_bytes,
+            'demuxer-max-back-bytes': 0,
+            'cache-pause-wait': pause_wait,
+            'cache-pause-initial': pause_initial,
+        }
+
+    def started(self, url: str, warm: bool = False):
+        """Empezó a reproducirse una estación; sin mpv precargado se espera su start-file"""
+        self.stopped()
+        if url.startswith(self.NETWORK):
+            self.session = [url, warm, None, 0, None, False]
+
+    def update(self, event: Dict, track: NowPlaying):
+        """Seguir los cortes con los eventos de mpv ya aplicados a track"""
+        session = self.session
+        if session is None:
+            return
+        if not session[1]:
+            # Ignorar eventos del stream anterior hasta que mpv cargue el nuevo
+            session[1] = event.get('event') == 'start-file'
+            return
+        if session[2] is None:
+            if not track.core_idle and not track.buffering:
+                session[2] = time.monotonic()
+        elif track.buffering and not session[5]:
+            session[3] += 1
+        session[5] = track.buffering
+
+    def poll(self, engine) -> bool:
+        """Leer sin bloquear el buffer de mpv; indica si hay que seguir midiendo"""
+        waiter, self._sample = self._sample, None
+        session = self.session
+        if session is None:
+            return False
+        if waiter is not None and waiter.event.is_set() and waiter.reply.get('error') == 'success':
+            seconds = waiter.reply.get('data')
+            if (isinstance(seconds, (int, float)) and session[2] is not None
+                    and time.monotonic() - session[2] >= self.WARMUP):
+                session[4] = seconds if session[4] is None else min(session[4], seconds)
+        try:
+            self._sample = engine.ipc.send('get_property', 'demuxer-cache-duration', wait=True)
+        except (AttributeError, MpvIPCError):
+            pass
+        return True
+
+    def stopped(self):
+        """Terminó la escucha: ajustar el nivel de la estación según cómo fue"""
+        session, self.session = self.session, None
+        if session is None or session[2] is None:
+            return  # Nunca llegó a sonar: nada que aprender
+        url, _, heard, rebuffers, lowest, _ = session
+        self._load()
+        entry = self._entries.setdefault(url, {'level': self.DEFAULT_LEVEL, 'stable': 0, 'rebuffers': 0})
+        if rebuffers:
+            entry['level'] = min(len(self.LEVELS) - 1, entry['level'] + 1)
+            entry['stable'] = 0
+            entry['rebuffers'] += rebuffers
+        elif time.monotonic() - heard >= self.STABLE_SECS and (lowest is None or lowest >= self.HEADROOM):
+            entry['stable'] += 1
+            if entry['stable'] >= self.STABLE_PLAYS and entry['level'] > 0:
+                entry['level'] -= 1
+                entry['stable'] = 0
+        else:
+            return
+        entry['updated'] = time.time()
+        self._dirty = True
+
+    def save(self):
+        """Guardar en disco (escritura atómica) si hubo cambios"""
+        if not self._dirty or self.path is None:
+            return
+        self._dirty = False
+        try:
+            temp = f'{self.path}.{os.getpid()}.tmp'
+            with open(temp, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f)
+            os.replace(temp, self.path)
+        except OSError:
+            pass
+
+
+class EventLoop:
+    """Bucle de un solo hilo sobre selectors, con temporizadores con nombre
+
+    Los demás hilos (lectores del IPC, sondeos) no tocan el estado: encolan
+    funciones con post(), que escribe un byte en un self-pipe para despertar
+    al select. Cada descriptor registrado lleva como dato la función que lo
+    atiende.
+    """
+
+    def __init__(self):
+        self.running = False
+        self.selector = None
+        self.timers = {}  # Temporizadores por nombre: (vencimiento, función)
+        self.posted = deque()  # Trabajo enviado por otros hilos
+        self.wake_fd = None  # Extremo de escritura del canal de avisos
+        self.wake_pending = False
+        self._wake_read = None
+
+    def open_loop(self):
+        self.selector = selectors.DefaultSelector()
+        self._wake_read, self.wake_fd = os.pipe()
+        os.set_blocking(self._wake_read, False)
+        os.set_blocking(self.wake_fd, False)
+        self.selector.register(self._wake_read, selectors.EVENT_READ, self._drain_wake)
+
+    def close_loop(self):
+        if self.selector is None:
+            return
+        self.selector.close()
+        os.close(self._wake_read)
+        os.close(self.wake_fd)
+        self.selector = self.wake_fd = self._wake_read = None
+
+    def _drain_wake(self, mask: int):
+        self.wake_pending = False
+        try:
+            while os.read(self._wake_read, 4096):
+                pass
+        except (BlockingIOError, OSError):
+            pass
+
+    def post(self, callback: Callable[[], None]):
+        """Encolar trabajo para el hilo del bucle desde cualquier hilo"""
+        self.posted.append(callback)
+        self.wake()
+
+    def wake(self):
+        """Despertar al bucle (un solo byte aunque lleguen muchos avisos)"""
+        if self.wake_fd is not None and not self.wake_pending:
+            self.wake_pending = True
+            try:
+                os.write(self.wake_fd, b'\0')
+            except (BlockingIOError, OSError):
+                pass
+
+    def schedule(self, name: str, delay: float, callback: Callable[[], None]):
+        """Programar un temporizador; reprogramar el mismo nombre lo reemplaza"""
+        self.timers[name] = (time.monotonic() + delay, callback)
+
+    def cancel(self, name: str):
+        self.timers.pop(name, None)
+
+    def run_timers(self):
+        """Ejecutar los temporizadores vencidos (con 1 ms de margen para agruparlos)"""
+        now = time.monotonic() + 0.001
+        due = [name for name, (deadline, _) in self.timers.items() if deadline <= now]
+        for name in due:
+            _, callback = self.timers.pop(name)
+            callback()
+
+    def next_timeout(self) -> Optional[float]:
+        """Segundos hasta el próximo temporizador (None: esperar sin límite)"""
+        if not self.timers:
+            return None
+        deadline = min(deadline for deadline, _ in self.timers.values())
+        return max(0.0, deadline - time.monotonic())
+
+    def poll(self):
+        """Dormir hasta el próximo evento o temporizador y atenderlo"""
+        for key, mask in self.selector.select(self.next_timeout()):
+            key.data(mask)
+        while self.posted:
+            self.posted.popleft()()
+        self.run_timers()
+
+
+class CronWindow:
+    """Ventana de grabación tipo cron: `minuto hora día mes día-de-semana` y duración
+
+    Cada campo acepta `*`, listas (`1,15`), rangos (`1-5`) y pasos (`*/15`,
+    `8-20/2`). Como en cron, si se restringen el día del mes y el de la
+    semana alcanza con que coincida uno de los dos. Los días de la semana van
+    de 0 (domingo) a 6; 7 también es domingo.
+    """
+
+    FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+    def __init__(self, expression: str, minutes: int):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f'se esperaban 5 campos: "{expression}"')
+        self.minutes = int(minutes)
+        if self.minutes <= 0:
+            raise ValueError('la duración tiene que ser positiva')
+        self.minute, self.hour, self.day, self.month, weekdays = (
+            self._parse(field, low, high) for field, (low, high) in zip(fields, self.FIELDS))
+        self.weekday = {day % 7 for day in weekdays}
+        self.any_day = fields[2] == '*'
+        self.any_weekday = fields[4] == '*'
+
+    @staticmethod
+    def _parse(field: str, low: int, high: int) -> set:
+        values = set()
+        for part in field.split(','):
+            part, _, step = part.partition('/')
+            if part == '*':
+                start, end = low, high
+            elif '-' in part:
+                start, end = (int(value) for value in part.split('-', 1))
+            else:
+                start = int(part)
+                end = high if step else start  # "5/15": desde 5, cada 15
+            step = int(step) if step else 1
+            if not low <= start <= end <= high or step < 1:
+                raise ValueError(f'campo fuera de rango: "{field}"')
+            values.update(range(start, end + 1, step))
+        return values
+
+    def matches(self, moment: time.struct_time) -> bool:
+        if (moment.tm_min not in self.minute or moment.tm_hour not in self.hour
+                or moment.tm_mon not in self.month):
+            return False
+        day = moment.tm_mday in self.day
+        weekday = (moment.tm_wday + 1) % 7 in self.weekday  # tm_wday empieza el lunes
+        if self.any_day or self.any_weekday:
+            return day and weekday
+        return day or weekday
+
+    def end(self, now: float) -> Optional[float]:
+        """Fin (time.time()) de la ventana abierta en `now`, o None"""
+        start = now - now % 60
+        for minute in range(self.minutes):
+            moment = start - minute * 60
+            if self.matches(time.localtime(moment)):
+                return moment + self.minutes * 60
+        return None
+
+
+class RecordingSchedule:
+    """Grabaciones programadas, en recordings.json dentro del directorio de datos
+
+    `{"directory": "~/Música/radio", "schedule": [{"station": "Radio Mitre",
+    "cron": "0 8 * * 1-5", "minutes": 120}]}`. La estación se busca igual que
+    con `play` (número, título o búsqueda), o se da directamente con "url".
+    El archivo se vuelve a leer cuando cambia.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path  # None: data_dir()/recordings.json, en la primera lectura
+        self.directory = None  # Carpeta de las grabaciones (None: la de Recorder)
+        self.entries = []  # (estación, url, CronWindow)
+        self._stamp = None  # (mtime, tamaño) de la última lectura
+
+    def refresh(self) -> Optional[str]:
+        """Releer el archivo si cambió; devuelve el error si no se pudo usar"""
+        try:
+            if self.path is None:
+                self.path = os.path.join(data_dir(), 'recordings.json')
+            stat = os.stat(self.path)
+        except OSError:
+            self.entries, self._stamp = [], None
+            return None
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if stamp == self._stamp:
+            return None
+        self._stamp = stamp
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+            entries = [(item.get('station'), item.get('url'), CronWindow(item['cron'], item.get('minutes', 60)))
+                       for item in data.get('schedule', [])]
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            return f"{self.path}: {e}"
+        self.entries = entries
+        directory = data.get('directory')
+        self.directory = os.path.expanduser(directory) if directory else None
+        return None
+
+    def due(self, now: float) -> List[tuple]:
+        """(estación, url, fin) de las ventanas abiertas en `now`"""
+        due = []
+        for station, url, window in self.entries:
+            end = window.end(now)
+            if end is not None:
+                due.append((station, url, end))
+        return due
+
+
+class Recording:
+    """Una grabación: conexión no bloqueante, archivo actual y metadatos ICY"""
+
+    def __init__(self, url: str, title: str, until: Optional[float]):
+        self.url = url  # URL de la estación (identifica la grabación)
+        self.title = title
+        self.until = until  # Fin en time.time() (None: hasta detenerla)
+        self.target = url  # A dónde se conecta, tras redirecciones y listas
+        self.hops = 0
+        self.state = 'idle'  # resolving, connecting, handshake, request, head, body, audio, waiting, error
+        self.sock = None
+        self.host = None  # Nombre para SNI si es HTTPS
+        self.request = None  # Lo que falta enviar de la petición
+        self.head = bytearray()  # Cabeceras (o cuerpo de una lista PLS/M3U)
+        self.early = b''  # Lo que llegó junto con las cabeceras y todavía no se usó
+        self.metaint = 0  # Bytes de audio entre bloques ICY (0: sin metadatos)
+        self.audio_left = 0  # Bytes de audio hasta el próximo bloque
+        self.meta = bytearray(255 * 16)  # Bloque de metadatos en lectura
+        self.meta_view = memoryview(self.meta)
+        self.meta_length = -1  # Largo del bloque (-1: falta leer el byte de largo)
+        self.meta_size = 0
+        self.stream_title = ""  # StreamTitle ICY del archivo actual
+        self.extension = 'bin'
+        self.content_type = 'audio/mpeg'
+        self.buffer = None  # memoryview del buffer de audio (sin splice)
+        self.pipe = None  # (lectura, escritura) del pipe para splice
+        self.capacity = 0  # Bytes que entran en el buffer o el pipe
+        self.pending = 0  # Audio en el buffer o el pipe, sin escribir
+        self.fd = None  # Archivo actual
+        self.path = None
+        self.opened_at = 0.0  # time.time() del comienzo del archivo (para el nombre)
+        self.rotate_at = 0.0  # time.monotonic() en que se corta el archivo
+        self.written = 0  # Bytes del archivo actual
+        self.total = 0  # Bytes grabados en todos los archivos
+        self.files = 0
+        self.failures = 0  # Fallos seguidos (espera creciente al reconectar)
+        self.error = ""
+
+    def to_dict(self) -> Dict:
+        return {'station': self.title, 'url': self.url, 'state': self.state, 'file': self.path,
+                'title': self.stream_title, 'bytes': self.total + self.pending, 'files': self.files,
+                'until': self.until, 'error': self.error}
+
+
+class Recorder:
+    """Varias grabaciones a la vez en el hilo de un EventLoop
+
+    Cada grabación es un socket no bloqueante registrado en el selector del
+    bucle (la resolución DNS va en un hilo aparte y vuelve con post()). Se pide
+    el stream con `Icy-MetaData: 1` y se siguen redirecciones y listas PLS/M3U.
+    Las cabeceras se leen por bloques y el audio que llega con ellas se usa
+    primero; el resto no pasa por objetos de Python: en Linux y HTTP se mueve
+    con splice(2) del socket a un pipe, y del pipe al archivo cuando se juntó
+    medio pipe; con HTTPS se lee con recv_into en un buffer fijo que se
+    escribe en bloques grandes. Los bloques ICY se separan del audio: un
+    cambio de tema abre otro archivo, y además se corta cada ROTATE_SECS. Si
+    la conexión se cae se reintenta con espera creciente, en el mismo archivo.
+    """
+
+    BUFFER = 1 << 18  # Buffer (o pipe) por grabación
+    MAX_HEAD = 16384
+    HEAD_CHUNK = 4096  # Lectura de cabeceras: lo que sobra es audio (o la lista)
+    MAX_BODY = 65536  # Listas PLS/M3U
+    MAX_REDIRECTS = 5
+    ROTATE_SECS = 3600
+    RETRY_MIN = 1.0
+    RETRY_MAX = 60.0
+    READS_PER_EVENT = 16  # Lecturas por aviso del selector, para no acaparar el bucle
+    UNSAFE = re.compile(r'[\x00-\x1f/\\:*?"<>|]+')  # Caracteres que no van en un nombre de archivo
+    EXTENSIONS = {'mp3': 'mp3', 'aac': 'aac', 'aac+': 'aac', 'ogg': 'ogg', 'flac': 'flac'}
+
+    def __init__(self, loop: EventLoop, directory: Optional[str] = None,
+                 on_change: Optional[Callable[[], None]] = None):
+        self.loop = loop
+        self.directory = directory  # None: data_dir()/recordings, al abrir el primer archivo
+        self.on_change = on_change  # Aviso al empezar, terminar o cambiar de archivo
+        self.recordings = {}  # URL de la estación -> Recording
+        self.splice = hasattr(os, 'splice')
+        self._ssl = None
+        self.would_block = (BlockingIOError, InterruptedError)
+        self._want_write = None
+
+    def changed(self):
+        if self.on_change is not None:
+            self.on_change()
+
+    def start(self, url: str, title: str, until: Optional[float] = None, target: Optional[str] = None) -> Recording:
+        """Empezar a grabar (o extender la grabación que ya está en curso)"""
+        recording = self.recordings.get(url)
+        if recording is None:
+            recording = self.recordings[url] = Recording(url, title, until)
+            recording.target = target or url  # Endpoint ya resuelto, si se conoce
+            self.connect(recording)
+        else:
+            recording.until = None if until is None or recording.until is None else max(until, recording.until)
+            if recording.state == 'error':
+                recording.failures = 0
+                self.connect(recording)
+        if recording.until is None:
+            self.loop.cancel(f'record-end:{url}')
+        else:
+            self.loop.schedule(f'record-end:{url}', max(0.0, recording.until - time.time()),
+                               lambda: self.stop(url))
+        self.changed()
+        return recording
+
+    def stop(self, url: str) -> bool:
+        recording = self.recordings.pop(url, None)
+        if recording is None:
+            return False
+        self.loop.cancel(f'record-end:{url}')
+        self.loop.cancel(f'record-retry:{url}')
+        self.disconnect(recording)
+        self.close_file(recording)
+        self.release(recording)
+        recording.state = 'idle'
+        self.changed()
+        return True
+
+    def close(self):
+        for url in list(self.recordings):
+            self.stop(url)
+
+    def listing(self) -> List[Dict]:
+        return [recording.to_dict() for recording in self.recordings.values()]
+
+    def active(self, url: str) -> bool:
+        return url in self.recordings
+
+    def connect(self, recording: Recording):
+        """Resolver el nombre en un hilo y seguir la conexión en el bucle"""
+        parts = urllib.parse.urlsplit(recording.target)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            self.fail(recording, f'esquema no soportado: {parts.scheme}')
+            return
+        secure = parts.scheme == 'https'
+        recording.state = 'resolving'
+        target = recording.target
+
+        def resolve():
+            try:
+                addresses = socket.getaddrinfo(parts.hostname, parts.port or (443 if secure else 80),
+                                               type=socket.SOCK_STREAM)
+            except OSError as e:
+                self.loop.post(lambda error=e: self.resolved(recording, target, None, error))
+            else:
+                self.loop.post(lambda: self.resolved(recording, target, addresses[0], None))
+
+        threading.Thread(target=resolve, daemon=True).start()
+
+    def resolved(self, recording: Recording, target: str, address: Optional[tuple], error: Optional[OSError]):
+        if self.recordings.get(recording.url) is not recording or recording.target != target \
+                or recording.state != 'resolving':
+            return  # Se detuvo o cambió de destino mientras se resolvía
+        if error is not None:
+            self.retry(recording, str(error))
+            return
+        parts = urllib.parse.urlsplit(target)
+        family, kind, proto, _, sockaddr = address
+        sock = socket.socket(family, kind, proto)
+        sock.setblocking(False)
+        code = sock.connect_ex(sockaddr)
+        if code not in (0, errno.EINPROGRESS):
+            sock.close()
+            self.retry(recording, os.strerror(code))
+            return
+
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+        host = parts.hostname if parts.port is None else f'{parts.hostname}:{parts.port}'
+        recording.request = memoryview(
+            (f'GET {path} HTTP/1.0\r\nHost: {host}\r\nUser-Agent: {HttpStreamClient.USER_AGENT}\r\n'
+             f'Accept: */*\r\nIcy-MetaData: 1\r\n\r\n').encode('latin-1'))
+        recording.host = parts.hostname if parts.scheme == 'https' else None
+        recording.sock = sock
+        recording.state = 'connecting'
+        self.loop.selector.register(sock, selectors.EVENT_WRITE,
+                                    lambda mask, recording=recording: self.on_socket(recording, mask))
+
+    def ssl_context(self):
+        if self._ssl is None:
+            import ssl
+            self._ssl = ssl.create_default_context()
+            self.would_block = (BlockingIOError, InterruptedError, ssl.SSLWantReadError, ssl.SSLWantWriteError)
+            self._want_write = ssl.SSLWantWriteError
+        return self._ssl
+
+    def listen(self, recording: Recording, events: int):
+        self.loop.selector.modify(recording.sock, events,
+                                  lambda mask, recording=recording: self.on_socket(recording, mask))
+
+    def on_socket(self, recording: Recording, mask: int):
+        if recording.sock is None:
+            return
+        try:
+            if recording.state == 'connecting':
+                code = recording.sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                if code:
+                    raise ConnectionError(os.strerror(code))
+                if recording.host is not None:
+                    # El socket TLS reemplaza al TCP: se registra de nuevo
+                    self.loop.selector.unregister(recording.sock)
+                    recording.sock = self.ssl_context().wrap_socket(
+                        recording.sock, server_hostname=recording.host, do_handshake_on_connect=False)
+                    self.loop.selector.register(recording.sock, selectors.EVENT_WRITE,
+                                                lambda mask, recording=recording: self.on_socket(recording, mask))
+                    recording.state = 'handshake'
+                else:
+                    recording.state = 'request'
+            if recording.state == 'handshake':
+                try:
+                    recording.sock.do_handshake()
+                except self.would_block as e:
+                    self.listen(recording, selectors.EVENT_WRITE if isinstance(e, self._want_write)
+                                else selectors.EVENT_READ)
+                    return
+                recording.state = 'request'
+            if recording.state == 'request':
+                sent = recording.sock.send(recording.request)
+                recording.request = recording.request[sent:]
+                if len(recording.request):
+                    self.listen(recording, selectors.EVENT_WRITE)
+                    return
+                recording.request = None
+                recording.state = 'head'
+                self.listen(recording, selectors.EVENT_READ)
+            self.receive(recording)
+        except self.would_block:
+            pass
+        except (OSError, ValueError) as e:
+            self.retry(recording, str(e) or type(e).__name__)
+
+    def receive(self, recording: Recording):
+        """Leer lo que haya (hasta READS_PER_EVENT veces) según el estado"""
+        for _ in range(self.READS_PER_EVENT):
+            if recording.sock is None:
+                return
+            if recording.state == 'head':
+                self.read_head(recording)
+            elif recording.state == 'body':
+                self.read_body(recording)
+            elif recording.state == 'audio':
+                if recording.metaint and not recording.audio_left:
+                    self.read_meta(recording)
+                else:
+                    self.read_audio(recording)
+            else:
+                return
+        # Quedó más por leer: seguir en la próxima vuelta (TLS puede tener datos ya descifrados)
+        self.loop.post(lambda: self.on_socket(recording, selectors.EVENT_READ))
+
+    def read_head(self, recording: Recording):
+        """Leer las cabeceras por bloques; lo que llega detrás queda en `early`"""
+        head = recording.head
+        chunk = recording.sock.recv(self.HEAD_CHUNK)
+        if not chunk:
+            raise ConnectionError('conexión cerrada')
+        head += chunk
+        end = head.find(b'\r\n\r\n', max(0, len(head) - len(chunk) - 3))
+        if end < 0:
+            if len(head) >= self.MAX_HEAD:
+                raise ValueError('cabeceras demasiado largas')
+            return
+        status, headers = HttpStreamClient.parse_head(bytes(head[:end + 4]))
+        recording.early = bytes(head[end + 4:])
+        head.clear()
+        if 300 <= status < 400 and 'location' in headers:
+            self.follow(recording, urllib.parse.urljoin(recording.target, headers['location']))
+            return
+        if status != 200:
+            raise ValueError(f'HTTP {status}')
+
+        kind = StreamProber.CODECS.get(headers.get('content-type', '').split(';')[0].strip().lower())
+        path = urllib.parse.urlsplit(recording.target).path.lower()
+        if kind == 'hls' or path.endswith('.m3u8'):
+            self.fail(recording, 'las listas HLS no se pueden grabar')
+        elif kind in ('m3u', 'pls') or path.endswith(('.m3u', '.pls')):
+            recording.state = 'body'
+            recording.head += recording.early
+            recording.early = b''
+        else:
+            self.begin_audio(recording, headers, kind)
+
+    def read_body(self, recording: Recording):
+        """Lista PLS/M3U: leerla entera y seguir su primera entrada"""
+        chunk = recording.sock.recv(4096)
+        if chunk and len(recording.head) + len(chunk) <= self.MAX_BODY:
+            recording.head += chunk
+            return
+        playlist = recording.head.decode('utf-8', 'replace')
+        recording.head.clear()
+        entry = StreamResolver.first_entry(recording.target, playlist)
+        if entry is None:
+            self.fail(recording, 'lista vacía')
+        else:
+            self.follow(recording, entry)
+
+    def follow(self, recording: Recording, url: str):
+        """Redirección o entrada de lista: conectar al nuevo destino"""
+        recording.hops += 1
+        if recording.hops > self.MAX_REDIRECTS:
+            raise ValueError('demasiados saltos')
+        self.disconnect(recording)
+        recording.target = url
+        self.connect(recording)
+
+    def begin_audio(self, recording: Recording, headers: Dict, kind: Optional[str]):
+        recording.metaint = int(headers.get('icy-metaint') or 0)
+        recording.audio_left = recording.metaint
+        recording.meta_length = -1
+        extension = self.EXTENSIONS.get(kind) or os.path.splitext(urllib.parse.urlsplit(recording.target).path)[1][1:]
+        if recording.fd is None:
+            recording.extension = extension.lower()[:5] if extension.isalnum() else 'bin'
+        recording.content_type = headers.get('content-type') or 'audio/mpeg'
+        self.open_sink(recording)
+        recording.state = 'audio'
+        self.changed()
+
+    def open_sink(self, recording: Recording):
+        """Preparar el pipe o el buffer y el archivo donde va el audio"""
+        if recording.buffer is not None:
+            pass  # Ya se eligió el buffer: se sigue con él
+        elif recording.host is None and self.splice:
+            if recording.pipe is None:
+                recording.pipe = os.pipe()
+                recording.capacity = self.pipe_size(recording.pipe[1])
+        else:
+            self.flush(recording)  # Lo que quedó en el pipe de una conexión anterior
+            recording.buffer = memoryview(bytearray(self.BUFFER))
+            recording.capacity = self.BUFFER
+        if recording.fd is None:
+            self.open_file(recording)
+
+    def pipe_size(self, fd: int) -> int:
+        """Agrandar el pipe hasta BUFFER si el sistema lo permite"""
+        try:
+            import fcntl
+            return fcntl.fcntl(fd, fcntl.F_SETPIPE_SZ, self.BUFFER)
+        except (ImportError, AttributeError, OSError):
+            return 65536
+
+    def recv_into(self, recording: Recording, view: memoryview, size: int = 0) -> int:
+        """recv_into del socket, empezando por lo que llegó junto con las cabeceras"""
+        if not recording.early:
+            return recording.sock.recv_into(view, size)
+        count = min(len(recording.early), size or len(view))
+        view[:count] = recording.early[:count]
+        recording.early = recording.early[count:]
+        return count
+
+    def read_audio(self, recording: Recording):
+        room = recording.capacity - recording.pending
+        if recording.metaint:
+            room = min(room, recording.audio_left)
+        if recording.pipe is not None and recording.buffer is None:
+            if recording.early:
+                # Entra seguro: el pipe tiene lugar para `room` bytes
+                count = os.write(recording.pipe[1], recording.early[:room])
+                recording.early = recording.early[count:]
+            else:
+                count = os.splice(recording.sock.fileno(), recording.pipe[1], room,
+                                  flags=os.SPLICE_F_MOVE | os.SPLICE_F_NONBLOCK)
+        else:
+            count = self.recv_into(recording, recording.buffer[recording.pending:], room)
+        if not count:
+            raise ConnectionError('el servidor cerró el stream')
+        recording.failures = 0
+        recording.pending += count
+        recording.audio_left -= count
+        if recording.pending * 2 >= recording.capacity:
+            self.flush(recording)
+
+    def read_meta(self, recording: Recording):
+        if recording.meta_length < 0:
+            if not self.recv_into(recording, recording.meta_view, 1):
+                raise ConnectionError('el servidor cerró el stream')
+            recording.meta_length = recording.meta[0] * 16
+            recording.meta_size = 0
+        if recording.meta_size < recording.meta_length:
+            count = self.recv_into(recording, recording.meta_view[recording.meta_size:recording.meta_length])
+            if not count:
+                raise ConnectionError('el servidor cerró el stream')
+            recording.meta_size += count
+            if recording.meta_size < recording.meta_length:
+                return
+        if recording.meta_length:
+            self.metadata(recording, recording.meta[:recording.meta_length])
+        recording.meta_length = -1
+        recording.audio_left = recording.metaint
+
+    def metadata(self, recording: Recording, block: bytes):
+        """Bloque ICY: si cambió el tema, el audio que sigue va a otro archivo"""
+        title = icy_title(block)
+        if title and title != recording.stream_title:
+            self.title_changed(recording, title)  # Sin título (tandas, reconexiones) no se corta
+
+    def title_changed(self, recording: Recording, title: str):
+        if not recording.stream_title and recording.fd is not None:
+            # Primer título: el archivo recién empezado pasa a llevarlo en el nombre
+            recording.stream_title = title
+            self.rename_file(recording)
+        else:
+            self.flush(recording)
+            if recording.state == 'error':
+                return
+            self.close_file(recording)
+            recording.stream_title = title
+            self.open_file(recording)
+        self.changed()
+
+    def flush(self, recording: Recording):
+        """Pasar al archivo el audio del pipe o del buffer"""
+        if not recording.pending:
+            return
+        if recording.fd is None:
+            self.open_file(recording)
+        try:
+            if recording.buffer is None:
+                while recording.pending:
+                    count = os.splice(recording.pipe[0], recording.fd, recording.pending)
+                    recording.pending -= count
+                    recording.written += count
+                    recording.total += count
+            else:
+                written = 0
+                while written < recording.pending:
+                    written += os.write(recording.fd, recording.buffer[written:recording.pending])
+                recording.written += written
+                recording.total += written
+                recording.pending = 0
+        except OSError as e:
+            self.fail(recording, f'no se pudo escribir {recording.path}: {e}')
+            return
+        if time.monotonic() >= recording.rotate_at:
+            self.close_file(recording)
+            self.open_file(recording)
+
+    def file_path(self, recording: Recording) -> str:
+        """<carpeta>/<estación>/<fecha hora>[ - <tema>].<extensión>"""
+        if self.directory is None:
+            self.directory = os.path.join(data_dir(), 'recordings')
+        folder = os.path.join(self.directory, self.UNSAFE.sub(' ', recording.title).strip(' .') or 'radio')
+        name = time.strftime('%Y-%m-%d %H%M%S', time.localtime(recording.opened_at))
+        title = self.UNSAFE.sub(' ', recording.stream_title).strip(' .')
+        if title:
+            name = f"{name} - {title}"[:180]
+        return os.path.join(folder, name)
+
+    def open_file(self, recording: Recording):
+        recording.opened_at = time.time()
+        recording.rotate_at = time.monotonic() + self.ROTATE_SECS
+        try:
+            base = self.file_path(recording)
+            os.makedirs(os.path.dirname(base), exist_ok=True)
+            for attempt in itertools.count(1):
+                path = f"{base}.{recording.extension}" if attempt == 1 else f"{base} ({attempt}).{recording.extension}"
+                try:
+                    recording.fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+                    break
+                except FileExistsError:
+                    continue
+        except OSError as e:
+            self.fail(recording, f'no se pudo crear el archivo: {e}')
+            return
+        recording.path = path
+        recording.written = 0
+        recording.files += 1
+        self.changed()
+
+    def rename_file(self, recording: Recording):
+        base = self.file_path(recording)
+        path = f"{base}.{recording.extension}"
+        if os.path.exists(path):
+            return
+        try:
+            os.rename(recording.path, path)
+            recording.path = path
+        except OSError:
+            pass
+
+    def close_file(self, recording: Recording):
+        """Cerrar el archivo actual; si quedó vacío, borrarlo"""
+        if recording.fd is None:
+            return
+        if recording.pending and recording.state != 'error':
+            self.flush(recording)
+            if recording.fd is None:
+                return
+        os.close(recording.fd)
+        recording.fd = None
+        if not recording.written:
+            try:
+                os.remove(recording.path)
+            except OSError:
+                pass
+            recording.files -= 1
+
+    def release(self, recording: Recording):
+        """Soltar el pipe y el buffer (lo que tenían ya se escribió o se descarta)"""
+        if recording.pipe is not None:
+            os.close(recording.pipe[0])
+            os.close(recording.pipe[1])
+        recording.pipe = recording.buffer = None
+        recording.pending = 0
+
+    def disconnect(self, recording: Recording):
+        if recording.sock is not None:
+            try:
+                self.loop.selector.unregister(recording.sock)
+            except (KeyError, ValueError):
+                pass
+            recording.sock.close()
+            recording.sock = None
+        recording.head.clear()
+        recording.early = b''
+        recording.request = None
+
+    def retry(self, recording: Recording, message: str):
+        """Conexión caída: reintentar con espera creciente, si no pasó la hora de fin"""
+        self.disconnect(recording)
+        self.flush(recording)
+        if recording.state == 'error':
+            return
+        recording.error = message
+        recording.failures += 1
+        delay = min(self.RETRY_MAX, self.RETRY_MIN * 2 ** (recording.failures - 1))
+        if recording.until is not None and time.time() + delay >= recording.until:
+            self.stop(recording.url)
+            return
+        recording.state = 'waiting'
+        recording.target = recording.url
+        recording.hops = 0
+
+        def reconnect():
+            if self.recordings.get(recording.url) is recording:
+                self.connect(recording)
+
+        self.loop.schedule(f'record-retry:{recording.url}', delay, reconnect)
+        self.changed()
+
+    def fail(self, recording: Recording, message: str):
+        """Error que no se arregla reintentando: queda listada hasta detenerla"""
+        recording.state = 'error'
+        recording.error = message
+        recording.pending = 0
+        self.disconnect(recording)
+        self.close_file(recording)
+        self.release(recording)
+        self.changed()
+
+
+class RelayClient:
+    """Conexión de mpv al servidor local de TimeShift"""
+
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.request = bytearray()
+        self.position = -1  # Posición absoluta en el anillo (-1: falta la petición)
+        self.icy = False  # mpv pidió metadatos ICY intercalados
+        self.until_meta = 0  # Bytes de audio hasta el próximo bloque ICY
+        self.pending = None  # memoryview de cabeceras o bloque ICY por mandar
+        self.title = None  # Último título que se le mandó
+        self.blocked = False  # Socket lleno: esperando EVENT_WRITE
+
+
+class TimeShift(Recorder):
+    """Pausa en diferido: la estación se graba en un anillo en disco
+
+    mpv la escucha desde un servidor HTTP local. El anillo es un archivo
+    temporal de tamaño fijo (minutos a DEFAULT_KBPS) mapeado con mmap: el
+    audio entra con recv_into directo al mapa y sale hacia mpv con send desde
+    el mismo mapa, así la memoria no depende de cuánto dure la pausa. No se
+    usa sendfile(2), que dejaría en los sockets referencias a páginas que el
+    anillo pisa después.
+
+    En pausa mpv deja de leer y la captura sigue; al reanudar, mpv
+    continúa por la misma conexión local, sin reconectar a la estación.
+    Volver 30 segundos o al vivo recarga mpv desde otra posición del anillo
+    (una marca por segundo relaciona hora y posición). Si la pausa dura más
+    que el anillo se sigue desde lo más viejo que queda. Los títulos ICY se
+    guardan con su posición y se vuelven a intercalar para mpv, así el tema
+    que muestra es el que suena en diferido.
+    """
+
+    BACK = 30.0  # Segundos que retrocede la tecla a
+    METAINT = 16000  # Bytes de audio entre bloques ICY hacia mpv
+    BURST = 65536  # Al volver al vivo se empieza un poco antes, como el burst de Icecast
+    MARK_INTERVAL = 1.0
+    SEND_BUFFER = 65536
+    UNSEEKABLE = ('ogg', 'flac', 'hls')  # Sin sus cabeceras no se pueden empezar a mitad
+
+    def __init__(self, loop: EventLoop, minutes: float, on_change: Optional[Callable[[], None]] = None):
+        super().__init__(loop, on_change=on_change)
+        self.minutes = minutes
+        # Un quinto del anillo queda de margen: lo que va camino a mpv no se pisa
+        self.size = max(1 << 20, int(minutes * 60 * BufferProfiles.DEFAULT_KBPS * 125 * 5 // 4))
+        self.margin = self.size // 5
+        self.ring_file = None
+        self.ring = None  # mmap del archivo del anillo
+        self.view = None
+        self.server = None
+        self.port = None
+        self.clients = {}  # Socket -> RelayClient
+        self.generation = 0  # Cambia con cada estación: las URLs viejas dan 404
+        self.url = None  # Estación que se está capturando
+        self.kind = None  # Códec según el Content-Type
+        self.written = 0  # Bytes capturados desde que empezó la estación
+        self.marks = deque()  # (time.monotonic(), bytes capturados hasta ese momento)
+        self.titles = deque()  # (posición, título ICY desde esa posición)
+
+    def open(self):
+        """Crear el anillo (archivo temporal ya borrado) y el servidor local"""
+        os.makedirs(cache_dir(), exist_ok=True)
+        self.ring_file = tempfile.TemporaryFile(dir=cache_dir(), prefix='timeshift-')
+        os.ftruncate(self.ring_file.fileno(), self.size)
+        self.ring = mmap.mmap(self.ring_file.fileno(), self.size)
+        self.view = memoryview(self.ring)
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.bind(('127.0.0.1', 0))
+        self.server.listen(8)
+        self.server.setblocking(False)
+        self.port = self.server.getsockname()[1]
+        self.loop.selector.register(self.server, selectors.EVENT_READ, self.accept)
+
+    def capture(self, url: str, title: str, target: Optional[str] = None) -> str:
+        """Empezar a grabar una estación en el anillo; devuelve la URL local para mpv"""
+        if self.server is None:
+            self.open()
+        self.stop_capture()
+        self.generation += 1
+        self.written = 0
+        self.kind = None
+        self.marks.clear()
+        self.titles.clear()
+        self.url = url
+        self.start(url, title, target=target)
+        return self.local_url(0)
+
+    def stop_capture(self):
+        if self.url is not None:
+            self.stop(self.url)
+            self.url = None
+        for client in list(self.clients.values()):
+            self.drop(client)
+
+    def failed(self) -> Optional[str]:
+        """Motivo por el que la captura no puede seguir (p. ej. HLS), o None"""
+        recording = self.recordings.get(self.url)
+        return recording.error if recording is not None and recording.state == 'error' else None
+
+    def close(self):
+        self.stop_capture()
+        super().close()
+        if self.server is not None:
+            self.loop.selector.unregister(self.server)
+            self.server.close()
+            self.server = None
+        if self.ring is not None:
+            self.view.release()
+            self.ring.close()
+            self.ring_file.close()
+            self.view = self.ring = self.ring_file = None
+
+    @property
+    def seekable(self) -> bool:
+        return self.kind not in self.UNSEEKABLE
+
+    def local_url(self, position: int) -> str:
+        return f"http://127.0.0.1:{self.port}/{self.generation}/{position}"
+
+    def oldest(self) -> int:
+        """Posición más vieja que sigue en el anillo (sin contar el margen)"""
+        return max(0, self.written - self.size + self.margin)
+
+    def span(self) -> float:
+        """Segundos de audio que hay detrás del vivo"""
+        return time.monotonic() - self.marks[0][0] if self.marks else 0.0
+
+    def url_behind(self, seconds: float) -> str:
+        """URL local que empieza `seconds` antes del vivo (0: el vivo)"""
+        if seconds <= 0:
+            return self.local_url(max(self.oldest(), self.written - self.BURST))
+        moment = time.monotonic() - seconds
+        position = self.oldest()
+        after = (time.monotonic(), self.written)
+        for stamp, written in reversed(self.marks):
+            if stamp <= moment:
+                # Entre dos marcas se interpola
+                rate = (after[1] - written) / max(after[0] - stamp, 1e-3)
+                position = max(position, written + int((moment - stamp) * rate))
+                break
+            after = (stamp, written)
+        return self.local_url(min(position, self.written))
+
+    def title_at(self, position: int) -> str:
+        for start, title in reversed(self.titles):
+            if start <= position:
+                return title
+        return ""
+
+    def open_sink(self, recording: Recording):
+        self.kind = StreamProber.CODECS.get(recording.content_type.split(';')[0].strip().lower())
+
+    def read_audio(self, recording: Recording):
+        """Del socket de la estación directo al anillo, y de ahí a mpv si espera datos"""
+        position = self.written % self.size
+        room = self.size - position
+        if recording.metaint:
+            room = min(room, recording.audio_left)
+        count = self.recv_into(recording, self.view[position:position + room], room)
+        if not count:
+            raise ConnectionError('el servidor cerró el stream')
+        recording.failures = 0
+        recording.audio_left -= count
+        recording.total += count
+        self.written += count
+
+        now = time.monotonic()
+        if not self.marks or now - self.marks[-1][0] >= self.MARK_INTERVAL:
+            self.marks.append((now, self.written))
+            oldest = self.oldest()
+            while self.marks[0][1] < oldest:
+                self.marks.popleft()
+        for client in list(self.clients.values()):
+            if client.position >= 0 and not client.blocked:
+                self.send(client)
+
+    def title_changed(self, recording: Recording, title: str):
+        recording.stream_title = title
+        self.titles.append((self.written, title))
+        while len(self.titles) > 1 and self.titles[1][0] <= self.oldest():
+            self.titles.popleft()
+
+    def accept(self, mask: int):
+        while True:
+            try:
+                sock, _ = self.server.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            sock.setblocking(False)
+            # Buffer de envío chico: lo que mpv no leyó espera en el anillo, no en el kernel
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.SEND_BUFFER)
+            client = RelayClient(sock)
+            self.clients[sock] = client
+            self.loop.selector.register(sock, selectors.EVENT_READ,
+                                        lambda mask, client=client: self.on_client(client, mask))
+
+    def on_client(self, client: RelayClient, mask: int):
+        try:
+            if mask & selectors.EVENT_READ:
+                data = client.sock.recv(4096)
+                if not data:
+                    self.drop(client)
+                    return
+                if client.position < 0:
+                    client.request += data
+                    if b'\r\n\r\n' not in client.request:
+                        if len(client.request) > self.MAX_HEAD:
+                            self.drop(client)
+                        return
+                    self.respond(client)
+            if client.position >= 0:
+                self.send(client)
+        except (BlockingIOError, InterruptedError):
+            pass
+        except (OSError, ValueError):
+            self.drop(client)
+
+    def respond(self, client: RelayClient):
+        """GET /<generación>/<posición>: cabeceras de un stream (ICY si mpv lo pide)"""
+        lines = client.request.decode('latin-1').split('\r\n')
+        parts = lines[0].split()
+        path = parts[1].strip('/').split('/') if len(parts) > 1 else []
+        if (len(path) != 2 or path[0] != str(self.generation) or not path[1].isdigit()
+                or self.url is None):
+            client.sock.send(b'HTTP/1.0 404 Not Found\r\n\r\n')
+            raise ValueError('estación vieja')
+        client.position = min(max(int(path[1]), self.oldest()), self.written)
+        client.icy = any(line.lower().replace(' ', '') == 'icy-metadata:1' for line in lines[1:])
+        recording = self.recordings.get(self.url)
+        head = (f"HTTP/1.0 200 OK\r\nContent-Type: {recording.content_type if recording else 'audio/mpeg'}\r\n"
+                "Cache-Control: no-cache\r\n")
+        if client.icy:
+            head += f"icy-metaint: {self.METAINT}\r\n"
+            client.until_meta = self.METAINT
+        client.pending = memoryview((head + "\r\n").encode('latin-1'))
+        client.request = None
+
+    def send(self, client: RelayClient):
+        """Mandar lo que haya entre la posición de mpv y el vivo"""
+        sock = client.sock
+        try:
+            while True:
+                if client.pending is not None:
+                    sent = sock.send(client.pending)
+                    client.pending = client.pending[sent:] if sent < len(client.pending) else None
+                    continue
+                if client.position < self.oldest():
+                    client.position = self.oldest()  # La pausa duró más que el anillo
+                count = self.written - client.position
+                if not count:
+                    break
+                offset = client.position % self.size
+                count = min(count, self.size - offset)
+                if client.icy:
+                    count = min(count, client.until_meta)
+                sent = sock.send(self.view[offset:offset + count])
+                client.position += sent
+                if client.icy:
+                    client.until_meta -= sent
+                    if not client.until_meta:
+                        client.pending = memoryview(self.icy_block(client))
+                        client.until_meta = self.METAINT
+        except (BlockingIOError, InterruptedError):
+            if not client.blocked:
+                client.blocked = True
+                self.loop.selector.modify(sock, selectors.EVENT_READ | selectors.EVENT_WRITE,
+                                          lambda mask, client=client: self.on_client(client, mask))
+            return
+        except OSError:
+            self.drop(client)
+            return
+        if client.blocked:
+            # Se puso al día: esperar la captura en vez del socket
+            client.blocked = False
+            self.loop.selector.modify(sock, selectors.EVENT_READ,
+                                      lambda mask, client=client: self.on_client(client, mask))
+
+    def icy_block(self, client: RelayClient) -> bytes:
+        """Bloque ICY para mpv: el título en esa posición si cambió, si no un bloque vacío"""
+        title = self.title_at(client.position)
+        if title == client.title:
+            return b'\0'
+        client.title = title
+        text = f"StreamTitle='{title}';".encode('utf-8')[:255 * 16]
+        text += b'\0' * (-len(text) % 16)
+        return bytes([len(text) // 16]) + text
+
+    def drop(self, client: RelayClient):
+        if self.clients.pop(client.sock, None) is None:
+            return
+        try:
+            self.loop.selector.unregister(client.sock)
+        except (KeyError, ValueError):
+            pass
+        client.sock.close()
+
+
+class StationScan:
+    """Exploración de las estaciones que siguen en la lista (tecla e)
+
+    Sondea a la vez las próximas estaciones, con tope de conexiones y de ancho
+    de banda, leyendo además el primer bloque ICY para saber qué suena en
+    cada una. Las que fallan o no mandan audio a tiempo se saltan; las vivas
+    suenan de a una durante PREVIEW segundos, en el orden de la lista.
+    """
+
+    LIMIT = 50  # Estaciones que se exploran desde la seleccionada
+    CONCURRENCY = 8
+    KBPS = 2000  # Tope de ancho de banda entre todos los sondeos
+    TIMEOUT = 4.0
+    PREVIEW = 6.0  # Segundos que suena cada estación viva
+    STALL = 3.0  # Si sigue cargando pasado este tiempo se salta
+
+    def __init__(self, health: HealthCache, stations: List[Tuple[int, Station]]):
+        self.prober = StreamProber(health, self.CONCURRENCY, self.TIMEOUT, titles=True, kbps=self.KBPS)
+        self.stations = stations  # (posición en la lista, estación) en orden
+        self.results = {}  # URL -> ProbeResult
+        self.cursor = 0  # Próxima estación a previsualizar
+        self.waiting = False  # La próxima todavía no respondió
+
+    def next_live(self) -> Optional[Tuple[int, Station]]:
+        """Avanzar hasta la próxima estación viva (None si falta su resultado o se terminó)"""
+        while self.cursor < len(self.stations):
+            position, radio = self.stations[self.cursor]
+            result = self.results.get(radio.url)
+            if result is None:
+                return None
+            self.cursor += 1
+            if result.ok:
+                return position, radio
+        return None
+
+    def upcoming(self) -> Optional[Station]:
+        """Próxima estación que ya se sabe viva, sin avanzar (para precargarla)"""
+        for _, radio in self.stations[self.cursor:]:
+            result = self.results.get(radio.url)
+            if result is None:
+                return None
+            if result.ok:
+                return radio
+        return None
+
+    @property
+    def done(self) -> bool:
+        return self.cursor >= len(self.stations)
+
+    @property
+    def progress(self) -> Tuple[int, int]:
+        return self.cursor, len(self.stations)
+
+
+class StartupProfile:
+    """Tiempos de cada fase del arranque (--startup-profile)"""
 
-class RadioCLI:
     def __init__(self):
+        self.marks = [('main()', time.perf_counter())]
+
+    def mark(self, phase: str):
+        self.marks.append((phase, time.perf_counter()))
+
+    @staticmethod
+    def process_age() -> Optional[float]:
+        """Milisegundos desde que arrancó el proceso (Linux, resolución de un tick)"""
+        try:
+            with open('/proc/self/stat', 'rb') as f:
+                fields = f.read().rsplit(b')', 1)[1].split()
+            ticks = int(fields[19])
+            return (time.clock_gettime(time.CLOCK_BOOTTIME) - ticks / os.sysconf('SC_CLK_TCK')) * 1000
+        except (OSError, ValueError, IndexError, AttributeError):
+            return None
+
+    def report(self) -> str:
+        lines = []
+        age = self.process_age()
+        if age is not None:
+            # Intérprete e importaciones: todo lo anterior a main()
+            before = age - (time.perf_counter() - self.marks[0][1]) * 1000
+            lines.append(f"{'python + importaciones':<24} {before:8.1f} ms  (±10 ms)")
+        start = self.marks[0][1]
+        for (_, previous), (phase, when) in zip(self.marks, self.marks[1:]):
+            lines.append(f"{phase:<24} {(when - previous) * 1000:8.1f} ms  {(when - start) * 1000:8.1f} ms")
+        return "\n".join(lines)
+
+
+class PlaybackStats:
+    """Arranques y cortes de una estación durante la sesión"""
+    __slots__ = ('station', 'plays', 'first_audio_ms', 'rebuffers', 'rebuffer_ms')
+
+    def __init__(self, station: str):
+        self.station = station
+        self.plays = 0
+        self.first_audio_ms = deque(maxlen=32)  # Enter → audio de los últimos arranques
+        self.rebuffers = 0
+        self.rebuffer_ms = 0.0
+
+
+class Metrics:
+    """Latencias de la interfaz y de la reproducción (tecla i y --metrics)
+
+    Solo existe si se pide: con la instrumentación apagada RadioCLI.metrics es
+    None y cada punto de medición cuesta una comparación. Guarda las muestras
+    recientes para los percentiles y contadores acumulados para exportar.
+    Los bytes escritos salen de /proc/self/io (solo Linux); con el panel
+    visible su propio dibujo entra en la medición del cuadro.
+    """
+
+    WINDOW = 512  # Muestras recientes para los percentiles
+    FLUSH_INTERVAL = 10.0  # Segundos entre escrituras del archivo de exportación
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path  # JSONL al que se agregan registros, o textfile de Prometheus (.prom)
+        self.frame_ms = deque(maxlen=self.WINDOW)  # Tiempo de pintar cada cuadro
+        self.paint_ms = deque(maxlen=self.WINDOW)  # Desde la tecla hasta verla en pantalla
+        self.frame_bytes = deque(maxlen=self.WINDOW)  # Bytes enviados a la terminal por cuadro
+        self.first_audio_ms = deque(maxlen=self.WINDOW)  # Desde Enter hasta que suena
+        self.frames = 0
+        self.frame_total = 0.0
+        self.keys = 0
+        self.paint_total = 0.0
+        self.bytes_total = 0
+        self.plays_heard = 0
+        self.first_audio_total = 0.0
+        self.stations = {}  # URL -> PlaybackStats
+        self.key_time = None  # Primera tecla todavía sin pintar
+        self.play = None  # Arranque en curso: [url, inicio, armado, primer audio, inicio del corte]
+        self.records = []  # Registros JSONL pendientes de escribir
+        self.exported_frames = 0
+        try:
+            self._io = os.open('/proc/self/io', os.O_RDONLY)
+        except OSError:
+            self._io = None
+
+    def written(self) -> int:
+        """Bytes escritos por el proceso hasta ahora (0 si no se puede saber)"""
+        if self._io is None:
+            return 0
+        try:
+            data = os.pread(self._io, 512, 0)
+            return int(data.split(b'wchar:', 1)[1].split(None, 1)[0])
+        except (OSError, IndexError, ValueError):
+            return 0
+
+    def key(self):
+        """Llegó una tecla: la latencia se mide desde la primera sin pintar"""
+        if self.key_time is None:
+            self.key_time = time.perf_counter()
+
+    def frame_begin(self) -> tuple:
+        return time.perf_counter(), self.written()
+
+    def frame_end(self, begin: tuple):
+        """Registrar un cuadro pintado y, si había teclas pendientes, su latencia"""
+        now = time.perf_counter()
+        elapsed = (now - begin[0]) * 1000
+        written = self.written() - begin[1]
+        self.frame_ms.append(elapsed)
+        self.frame_bytes.append(written)
+        self.frames += 1
+        self.frame_total += elapsed
+        self.bytes_total += written
+        if self.key_time is not None:
+            latency = (now - self.key_time) * 1000
+            self.paint_ms.append(latency)
+            self.keys += 1
+            self.paint_total += latency
+            self.key_time = None
+
+    def station(self, url: str, title: str = "") -> PlaybackStats:
+        stats = self.stations.get(url)
+        if stats is None:
+            stats = self.stations[url] = PlaybackStats(title)
+        return stats
+
+    def play_started(self, url: str, title: str, warm: bool):
+        """Enter sobre una estación; con un mpv precargado no habrá start-file"""
+        self.play_stopped()
+        self.station(url, title).plays += 1
+        self.play = [url, time.perf_counter(), warm, None, None]
+
+    def play_stopped(self):
+        """Fin de la reproducción: cerrar un corte que estuviera en curso"""
+        if self.play is not None and self.play[4] is not None:
+            self.rebuffer_end(self.play)
+        self.play = None
+
+    def playback(self, event: Dict, track: NowPlaying):
+        """Seguir el arranque y los cortes con los eventos de mpv ya aplicados a track"""
+        play = self.play
+        if play is None:
+            return
+        if not play[2]:
+            # Ignorar eventos del stream anterior hasta que mpv cargue el nuevo
+            play[2] = event.get('event') == 'start-file'
+            return
+        now = time.perf_counter()
+        if play[3] is None:
+            if not track.core_idle and not track.buffering:
+                play[3] = now
+                elapsed = (now - play[1]) * 1000
+                stats = self.stations[play[0]]
+                stats.first_audio_ms.append(elapsed)
+                self.first_audio_ms.append(elapsed)
+                self.plays_heard += 1
+                self.first_audio_total += elapsed
+                self.record('first-audio', station=stats.station, url=play[0], ms=round(elapsed, 1))
+        elif track.buffering:
+            if play[4] is None:
+                play[4] = now
+                self.stations[play[0]].rebuffers += 1
+        elif play[4] is not None:
+            self.rebuffer_end(play)
+
+    def rebuffer_end(self, play: list):
+        elapsed = (time.perf_counter() - play[4]) * 1000
+        play[4] = None
+        stats = self.stations[play[0]]
+        stats.rebuffer_ms += elapsed
+        self.record('rebuffer', station=stats.station, url=play[0], ms=round(elapsed, 1))
+
+    def record(self, event: str, **fields):
+        """Encolar un registro para la próxima exportación (si hay archivo)"""
+        if self.path is not None:
+            self.records.append({'event': event, 'time': time.time(), **fields})
+
+    @staticmethod
+    def percentile(samples, fraction: float) -> Optional[float]:
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def summary(self, url: Optional[str] = None) -> List[str]:
+        """Líneas del panel de métricas (url: estación que suena)"""
+        def ms(samples, fraction):
+            value = self.percentile(samples, fraction)
+            return "-" if value is None else f"{value:.1f}" if value < 100 else f"{value:.0f}"
+
+        lines = [
+            f"Cuadros {self.frames}  p50 {ms(self.frame_ms, 0.5)}  p99 {ms(self.frame_ms, 0.99)} ms",
+            f"Tecla→pantalla p50 {ms(self.paint_ms, 0.5)}  p99 {ms(self.paint_ms, 0.99)} ms",
+            f"Bytes/cuadro p50 {self.percentile(self.frame_bytes, 0.5) or 0}  máx {max(self.frame_bytes, default=0)}",
+            f"Enter→audio p50 {ms(self.first_audio_ms, 0.5)}  p99 {ms(self.first_audio_ms, 0.99)} ms",
+        ]
+        stats = self.stations.get(url) if url else None
+        if stats is not None:
+            last = f"{stats.first_audio_ms[-1]:.0f} ms" if stats.first_audio_ms else "-"
+            lines.append(f"Esta estación: audio {last}")
+            lines.append(f"Cortes {stats.rebuffers} ({stats.rebuffer_ms / 1000:.1f} s)")
+        return lines
+
+    def flush(self):
+        """Exportar lo nuevo: agregar registros JSONL o reescribir el textfile"""
+        if self.frames != self.exported_frames:
+            self.exported_frames = self.frames
+            quantiles = lambda samples: {f'p{round(q * 100)}': round(self.percentile(samples, q) or 0.0, 3)
+                                         for q in (0.5, 0.99)}
+            self.record('frames', frames=self.frames, keys=self.keys, bytes=self.bytes_total,
+                        frame_ms=quantiles(self.frame_ms), paint_ms=quantiles(self.paint_ms))
+        if not self.records:
+            return
+        try:
+            if self.path.endswith('.prom'):
+                temp = f'{self.path}.{os.getpid()}.tmp'
+                with open(temp, 'w', encoding='utf-8') as f:
+                    f.write(self.prometheus())
+                os.replace(temp, self.path)
+            else:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.writelines(json.dumps(record, ensure_ascii=False) + '\n' for record in self.records)
+        except OSError:
+            pass
+        self.records.clear()
+
+    def prometheus(self) -> str:
+        """Métricas en el formato de texto de Prometheus (node_exporter textfile)"""
+        lines = []
+
+        def summary(name: str, help_text: str, samples, total: float, count: int):
+            lines.append(f"# HELP radio_cli_{name}_seconds {help_text}")
+            lines.append(f"# TYPE radio_cli_{name}_seconds summary")
+            for fraction in (0.5, 0.9, 0.99):
+                value = self.percentile(samples, fraction)
+                if value is not None:
+                    lines.append(f'radio_cli_{name}_seconds{{quantile="{fraction}"}} {value / 1000:.6f}')
+            lines.append(f"radio_cli_{name}_seconds_sum {total / 1000:.6f}")
+            lines.append(f"radio_cli_{name}_seconds_count {count}")
+
+        def label(text: str) -> str:
+            return text.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+        def per_station(name: str, kind: str, help_text: str, value):
+            lines.append(f"# HELP radio_cli_{name} {help_text}")
+            lines.append(f"# TYPE radio_cli_{name} {kind}")
+            for url, stats in self.stations.items():
+                lines.append(f'radio_cli_{name}{{station="{label(stats.station)}",url="{label(url)}"}} {value(stats)}')
+
+        summary('frame', "Tiempo de pintar un cuadro", self.frame_ms, self.frame_total, self.frames)
+        summary('key_to_paint', "Desde la tecla hasta verla en pantalla", self.paint_ms, self.paint_total, self.keys)
+        summary('first_audio', "Desde Enter hasta que mpv reproduce", self.first_audio_ms,
+                self.first_audio_total, self.plays_heard)
+        lines.append("# HELP radio_cli_terminal_bytes_total Bytes enviados a la terminal")
+        lines.append("# TYPE radio_cli_terminal_bytes_total counter")
+        lines.append(f"radio_cli_terminal_bytes_total {self.bytes_total}")
+        per_station('plays_total', 'counter', "Reproducciones iniciadas", lambda stats: stats.plays)
+        per_station('rebuffers_total', 'counter', "Cortes por falta de datos", lambda stats: stats.rebuffers)
+        per_station('rebuffer_seconds_total', 'counter', "Tiempo total en cortes",
+                    lambda stats: f"{stats.rebuffer_ms / 1000:.3f}")
+        return "\n".join(lines) + "\n"
+
+    def close(self):
+        self.play_stopped()
+        self.flush()
+        if self._io is not None:
+            os.close(self._io)
+            self._io = None
+
+
+class RadioCLI(EventLoop):
+    FRAME_INTERVAL = 1 / 60  # Como máximo 60 cuadros por segundo
+    SEARCH_BUDGET = 0.003    # Segundos de búsqueda por cuadro; el resto sigue entre eventos
+    
+    def __init__(self, attach: Optional[str] = None):
+        super().__init__()
         self.selected = 0
         self.playing = False
-        self.mpv_pid = None
         self.volume = 50
         self.current_station = ""
         self.radios = []
@@ -24,50 +3878,234 @@ class RadioCLI:
         self.search_mode = False  # Modo de búsqueda
         self.search_query = ""  # Consulta de búsqueda
         self.filtered_radios = []  # Estaciones filtradas por búsqueda
-        
+        self.windows = {}  # Ventanas persistentes: cabecera, lista, estado, pie
+        self.layout = None  # Dimensiones con las que se crearon las ventanas
+        self.drawn = {}  # Último estado pintado de cada región
+        self.attached = attach is not None  # Interfaz conectada a un daemon
+        if self.attached:
+            # El daemon es dueño de mpv: sin procesos propios ni precarga
+            self.engine = DaemonEngine(attach, self.volume, loop=self)
+            self.standby = StandbyPool(size=0)
+        else:
+            self.engine = MpvEngine(self.volume)  # Proceso mpv único en modo idle
+            self.standby = StandbyPool(size=2)  # mpv silenciados que precargan estaciones
+        self.index = None  # Índice de búsqueda sobre el catálogo
+        self.search_typing = False  # Escribiendo la consulta en la vista principal
+        self.ordered = []  # Catálogo en el orden elegido (vista sin copias)
+        self.sort_by_latency = False  # Ordenar por tiempo de respuesta del stream
+        self.history = History()  # Reproducciones y favoritas (frecencia)
+        self.preferred = []  # Favoritas y recientes presentes en el catálogo, en orden
+        self.preferred_ids = {}  # URL -> posición en el catálogo de las estaciones del historial
+        self.ranked_revision = -1  # Revisión del historial con la que se ordenó la lista
+        self.health = HealthCache()  # Estado de los streams (vivo/caído/latencia)
+        self.background = BackgroundLoop()  # Bucle asyncio para tareas de red
+        self.prober = StreamProber(self.health)
+        self.probing = set()  # URLs con sondeo en curso
+        self.resolver = StreamResolver(self.background)  # Destinos finales de las URLs
+        self.buffering = BufferProfiles(self.health)  # Perfil de buffer de mpv por estación
+        self.playing_source = None  # URL original de la estación que suena
+        self.engine.listener = self.on_mpv_event
+        self.track = NowPlaying()  # Tema y buffer según los eventos de mpv
+        self.mpv_died = False  # El proceso mpv terminó inesperadamente
+        self.dirty = True  # Hay que repintar en la próxima vuelta del bucle
+        self.resized = False  # Llegó SIGWINCH
+        self.last_frame = 0.0  # Momento del último cuadro pintado
+        self.loading = False  # Catálogo reconstruyéndose en segundo plano
+        self.load_error = None  # Motivo por el que no se pudo cargar el catálogo
+        self.mpv_path = None  # Ruta de mpv ('' si no está instalado), se comprueba al usarlo
+        self.probe_queue = []  # Estaciones visibles pendientes de sondear
+        self.profile = None  # StartupProfile con --startup-profile
+        self.metrics = None  # Metrics (tecla i o --metrics); None: sin instrumentación
+        self.show_metrics = False  # Panel de métricas visible
+        # Grabaciones de la tecla r: en el daemon si está conectada, si no en este proceso
+        self.recorder = None if self.attached else Recorder(self, on_change=self.recordings_changed)
+        self.recording_urls = set()  # URLs que se están grabando
+        self.timeshift = None  # TimeShift con --timeshift: Enter pausa en diferido
+        self.paused_at = None  # Momento de la pausa en diferido (None: no está en pausa)
+        self.behind = 0.0  # Segundos detrás del vivo al reanudar o retroceder
+        self.scan = None  # StationScan mientras se exploran estaciones (tecla e)
+        self.stream_titles = {}  # URL -> tema que sonaba al explorarla
+        self.engine.observe(MpvEngine.PLAYBACK_PROPERTIES)
+    
     def load_radios(self, json_file: str = "radios.json") -> bool:
-        """Cargar estaciones de radio desde archivo JSON"""
+        """Cargar estaciones de radio desde archivo JSON (vía caché binaria)"""
         try:
-            with open(json_file, 'r', encoding='utf-8') as f:
-                self.radios = json.load(f)
-            
-            # Ordenar estaciones: recientes primero, luego alfabéticamente
-            self.sort_stations()
-            
+            # Catálogo compacto, ya ordenado y preprocesado en la caché
+            self.install_catalog(StationStore.open(json_file))
             return True
-        except (FileNotFoundError, json.JSONDecodeError) as e:
+        except (OSError, ValueError, KeyError, TypeError) as e:
             print(f"Error cargando {json_file}: {e}")
             return False
     
-    def sort_stations(self):
-        """Ordenar estaciones alfabéticamente por título"""
-        if not self.radios:
+    def open_catalog(self, json_file: str = "radios.json"):
+        """Abrir el catálogo sin demorar el primer cuadro
+
+        Con la caché al día basta mapearla (menos de un milisegundo). Si hay que
+        reconstruirla se hace en un hilo aparte mientras la interfaz ya está en
+        pantalla, y el catálogo aparece al terminar.
+        """
+        store = StationStore.open_cached(json_file)
+        if store is not None:
+            self.install_catalog(store)
             return
         
-        # Ordenar alfabéticamente por título (ignorando mayúsculas/minúsculas)
-        self.radios.sort(key=lambda x: x['title'].lower())
+        def rebuild():
+            try:
+                store = StationStore.open(json_file)
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                message = f"Error cargando {json_file}: {e}"
+                self.post(lambda: self.fail_loading(message))
+            else:
+                self.post(lambda: self.install_catalog(store))
         
-        # Inicializar estaciones filtradas
-        self.filtered_radios = self.radios.copy()
+        self.loading = True
+        threading.Thread(target=rebuild, daemon=True).start()
+    
+    def install_catalog(self, store: StationStore):
+        """Usar un catálogo recién abierto"""
+        self.radios = store
+        self.loading = False
+        self.preferred_ids = {}
+        self.sort_stations()
+        self.index = StationIndex(store)
+        self.dirty = True
+        if self.profile:
+            self.profile.mark('catálogo')
+    
+    def fail_loading(self, message: str):
+        self.load_error = message
+        self.running = False
+    
+    def sort_stations(self):
+        """Ordenar estaciones: favoritas y recientes primero, o por tiempo de respuesta"""
+        self.ranked_revision = self.history.revision
+        self.preferred = []
+        if self.sort_by_latency:
+            # Vivas por latencia, luego sin sondear y al final las caídas
+            def responsiveness(index: int):
+                result = self.health.get(self.radios.url(index))
+                if result is None:
+                    return (1, 0.0)
+                return (0, result.ttfb_ms or 0.0) if result.ok else (2, 0.0)
+            self.ordered = StationView(self.radios, sorted(range(len(self.radios)), key=responsiveness))
+        else:
+            # La caché ya guarda el catálogo ordenado por título normalizado
+            # (ignorando mayúsculas/minúsculas y acentos): no hace falta copiarlo
+            self.ordered = self.radios
+            if self.history.loaded and len(self.radios):
+                self.preferred = self.history_positions()
+                if self.preferred:
+                    self.ordered = RankedView(self.radios, self.preferred)
+        if not self.search_mode:
+            self.filtered_radios = self.ordered
+    
+    def history_positions(self) -> List[int]:
+        """Posiciones en el catálogo de las favoritas y recientes, en orden de frecencia"""
+        positions = []
+        for url, title in self.history.ranked():
+            if url not in self.preferred_ids:
+                self.preferred_ids[url] = self.radios.find(title, url)
+            position = self.preferred_ids[url]
+            if position is not None:
+                positions.append(position)
+        return list(dict.fromkeys(positions))
+    
+    def load_history(self):
+        """Leer el historial (después del primer cuadro) y ordenar la lista con él"""
+        self.history.load()
+        if not self.search_mode:
+            self.sort_stations()
+            self.dirty = True
+    
+    def toggle_favorite(self):
+        """Marcar o desmarcar como favorita la estación seleccionada"""
+        radios = self.get_display_radios()
+        if radios:
+            radio = radios[self.selected]
+            self.history.toggle_favorite(radio.url, radio.title)
+    
+    def toggle_recording(self):
+        """Grabar la estación seleccionada, o dejar de grabarla"""
+        radios = self.get_display_radios()
+        if not radios:
+            return
+        radio = radios[self.selected]
+        recording = radio.url not in self.recording_urls
+        if self.attached:
+            self.engine.record(radio.url, recording)  # El daemon avisa con un evento status
+        elif recording:
+            self.recorder.start(radio.url, radio.title)
+        else:
+            self.recorder.stop(radio.url)
+    
+    def recordings_changed(self):
+        self.recording_urls = set(self.recorder.recordings)
+        self.dirty = True
+    
+    def toggle_latency_sort(self):
+        """Alternar entre orden alfabético y por tiempo de respuesta"""
+        self.sort_by_latency = not self.sort_by_latency
+        self.sort_stations()
+        self.selected = 0
+        self.scroll_offset = 0
+    
+    def request_probe(self, url: str):
+        """Sondear una estación en segundo plano si no hay un resultado vigente"""
+        if url in self.probing or self.health.is_fresh(self.health.get(url)):
+            return
+        self.probing.add(url)
+        self.probe_queue.append(url)
+        # Se envían después de pintar: el primer cuadro no espera a asyncio
+        self.schedule('probe', 0.0, self.submit_probes)
+    
+    def submit_probes(self):
+        queued, self.probe_queue = self.probe_queue, []
+        for url in queued:
+            future = self.background.submit(self.prober.probe(url))
+            future.add_done_callback(lambda _, url=url: self.probing.discard(url))
+            future.add_done_callback(lambda _: self.post(self.redraw))
+    
+    def redraw(self):
+        self.dirty = True
+    
+    def health_badge(self, url: str) -> tuple:
+        """Indicador de estado del stream: texto y color"""
+        if not self.health.loaded:
+            # Los resultados guardados se leen después del primer cuadro
+            self.schedule('health', 0.0, self.load_health)
+            return ("  ···", 7)
+        result = self.health.get(url)
+        if not self.health.is_fresh(result):
+            self.request_probe(url)
+        if result is None:
+            return ("  ···", 7)
+        if not result.ok:
+            return ("✗ caída", 1)
+        latency = result.ttfb_ms or 0
+        return (f"● {latency:.0f}ms" if latency < 10000 else "● >10s", 2 if latency < 1000 else 3)
+    
+    def load_health(self):
+        self.health.load()
+        self.dirty = True
     
     def search_stations(self, query: str):
-        """Buscar estaciones por título"""
+        """Filtrar estaciones por título (y URL) usando el índice"""
+        self.search_query = query
+        
         if not query.strip():
             self.search_mode = False
-            self.search_query = ""
-            self.filtered_radios = self.radios.copy()
+            if self.ranked_revision != self.history.revision:
+                # Reordenar al volver a la lista, no mientras se navega
+                self.sort_stations()
+            self.filtered_radios = self.ordered
             self.selected = 0
             self.scroll_offset = 0
             return
         
+        # Si la consulta amplía la anterior se refinan sus resultados
+        previous = self.filtered_radios if isinstance(self.filtered_radios, SearchResults) else None
         self.search_mode = True
-        self.search_query = query.lower()
-        
-        # Filtrar estaciones que contengan la consulta
-        self.filtered_radios = [
-            radio for radio in self.radios 
-            if self.search_query in radio['title'].lower()
-        ]
+        self.filtered_radios = self.index.search(query, previous, self.preferred)
         
         # Resetear selección y scroll
         self.selected = 0
@@ -75,49 +4113,56 @@ class RadioCLI:
     
     def get_display_radios(self):
         """Obtener estaciones a mostrar (filtradas o todas)"""
-        return self.filtered_radios if self.search_mode else self.radios
+        return self.filtered_radios if self.search_mode else self.ordered
     
-    def draw_box(self, y: int, x: int, height: int, width: int, title: str = ""):
+    def draw_box(self, y: int, x: int, height: int, width: int, title: str = "", win=None):
         """Dibujar un marco con título"""
-        # Validar límites de la pantalla
-        screen_height, screen_width = self.screen.getmaxyx()
+        win = win or self.screen
+        # Validar límites de la ventana
+        screen_height, screen_width = win.getmaxyx()
         
-        # Asegurar que el marco quepa en la pantalla
+        # Asegurar que el marco quepa en la ventana
         if x < 0 or y < 0 or x + width > screen_width or y + height > screen_height:
             return
         
         try:
-            # Esquinas
-            self.screen.addch(y, x, curses.ACS_ULCORNER)
-            self.screen.addch(y, x + width - 1, curses.ACS_URCORNER)
-            self.screen.addch(y + height - 1, x, curses.ACS_LLCORNER)
-            self.screen.addch(y + height - 1, x + width - 1, curses.ACS_LRCORNER)
+            # Líneas completas en una sola llamada cada una
+            win.hline(y, x + 1, curses.ACS_HLINE, width - 2)
+            win.hline(y + height - 1, x + 1, curses.ACS_HLINE, width - 2)
+            win.vline(y + 1, x, curses.ACS_VLINE, height - 2)
+            win.vline(y + 1, x + width - 1, curses.ACS_VLINE, height - 2)
             
-            # Líneas horizontales
-            for i in range(x + 1, x + width - 1):
-                if i < screen_width:
-                    self.screen.addch(y, i, curses.ACS_HLINE)
-                    self.screen.addch(y + height - 1, i, curses.ACS_HLINE)
-            
-            # Líneas verticales
-            for i in range(y + 1, y + height - 1):
-                if i < screen_height:
-                    self.screen.addch(i, x, curses.ACS_VLINE)
-                    self.screen.addch(i, x + width - 1, curses.ACS_VLINE)
+            # Esquinas
+            win.addch(y, x, curses.ACS_ULCORNER)
+            win.addch(y, x + width - 1, curses.ACS_URCORNER)
+            win.addch(y + height - 1, x, curses.ACS_LLCORNER)
+            # La esquina inferior derecha de una ventana mueve el cursor fuera
+            # de ella: curses la dibuja pero lanza error
+            win.insch(y + height - 1, x + width - 1, curses.ACS_LRCORNER)
             
             # Título centrado
             if title:
-                title_x = x + (width - len(title)) // 2
-                if title_x >= x and title_x + len(title) < x + width:
-                    self.screen.addstr(y, title_x, f" {title} ")
+                self.draw_box_title(y, x, width, title, win)
         except curses.error:
             # Si hay algún error, simplemente continuar
             pass
     
-    def draw_progress_bar(self, y: int, x: int, width: int, percent: int, label: str = ""):
+    def draw_box_title(self, y: int, x: int, width: int, title: str, win=None):
+        """Redibujar solo la línea superior de un marco con su título"""
+        win = win or self.screen
+        try:
+            win.hline(y, x + 1, curses.ACS_HLINE, width - 2)
+            title_x = x + (width - len(title)) // 2
+            if title_x >= x and title_x + len(title) < x + width:
+                win.addstr(y, title_x, f" {title} ")
+        except curses.error:
+            pass
+    
+    def draw_progress_bar(self, y: int, x: int, width: int, percent: int, label: str = "", win=None):
         """Dibujar barra de progreso para el volumen"""
-        # Validar límites de la pantalla
-        screen_height, screen_width = self.screen.getmaxyx()
+        win = win or self.screen
+        # Validar límites de la ventana
+        screen_height, screen_width = win.getmaxyx()
         
         if y < 0 or y >= screen_height or x < 0 or x + width > screen_width:
             return
@@ -127,280 +4172,943 @@ class RadioCLI:
             
             # Etiqueta
             if label:
-                self.screen.addstr(y, x, f"{label}: ")
+                win.addstr(y, x, f"{label}: ")
                 x += len(label) + 2
             
-            # Barra
-            self.screen.addstr(y, x, "[")
-            for i in range(width):
-                if i < filled:
-                    self.screen.addch(y, x + 1 + i, '█', curses.color_pair(2))
-                else:
-                    self.screen.addch(y, x + 1 + i, '░', curses.color_pair(7))
-            self.screen.addstr(y, x + width + 1, f"] {percent}%")
+            # Barra: un tramo por color en lugar de un carácter por celda
+            win.addstr(y, x, "[")
+            win.addstr(y, x + 1, '█' * filled, curses.color_pair(2))
+            win.addstr(y, x + 1 + filled, '░' * (width - filled), curses.color_pair(7))
+            win.addstr(y, x + width + 1, f"] {percent}%   ")
         except curses.error:
             # Si hay algún error, simplemente continuar
             pass
     
-    def show_interface(self):
-        """Mostrar la interfaz principal"""
-        self.screen.clear()
+    def stations_height(self) -> int:
+        """Altura del panel de estaciones según la terminal"""
+        screen_height, _ = self.screen.getmaxyx()
+        return min(screen_height - 18, screen_height - 14)
+    
+    def max_visible(self) -> int:
+        """Cantidad de estaciones que caben en el panel"""
+        return max(1, self.stations_height() - 3)
+    
+    def invalidate(self):
+        """Forzar un repintado completo en el próximo cuadro"""
+        self.layout = None
+    
+    def changed(self, key: str, value) -> bool:
+        """Indicar si una región cambió desde el último pintado y recordar su estado"""
+        if self.drawn.get(key, self) == value:
+            return False
+        self.drawn[key] = value
+        return True
+    
+    def build_layout(self, height: int, width: int):
+        """Crear las ventanas persistentes y pintar sus partes estáticas"""
+        self.drawn = {}
+        self.screen.erase()
+        self.screen.noutrefresh()
         
-        # Obtener dimensiones
-        height, width = self.screen.getmaxyx()
+        stations_width = min(70, width - 10)
+        stations_x = max(2, (width - stations_width) // 2)
+        stations_height = self.stations_height()
+        controls_width = min(60, width - 10)
+        controls_x = max(2, (width - controls_width) // 2)
+        controls_y = min(4 + stations_height + 1, height - 13)
         
-        # Verificar tamaño mínimo de terminal
-        if width < 60 or height < 20:
-            self.screen.addstr(0, 0, "Terminal muy pequeña. Necesitas al menos 60x20 caracteres.", curses.color_pair(1))
-            self.screen.addstr(1, 0, f"Tu terminal: {width}x{height}", curses.color_pair(3))
-            self.screen.addstr(2, 0, "Redimensiona la terminal y presiona cualquier tecla...", curses.color_pair(3))
-            self.screen.refresh()
-            self.screen.getch()
-            return
+        self.windows = {
+            'header': curses.newwin(4, width, 0, 0),
+            'list': curses.newwin(stations_height, stations_width, 4, stations_x),
+            'status': curses.newwin(11, controls_width, controls_y, controls_x),
+            'footer': curses.newwin(1, width, controls_y + 11, 0),
+        }
+        if self.show_metrics:
+            # Panel superpuesto arriba a la derecha; se vuelca al final de cada cuadro
+            self.windows['metrics'] = curses.newwin(9, 44, 0, width - 44)
         
-        # Título principal con línea decorativa
+        # Cabecera: título principal con línea decorativa
+        header = self.windows['header']
         title = "🎵 RADIO CLI 🎵"
         title_x = max(0, (width - len(title)) // 2)
-        self.screen.addstr(1, title_x, title, curses.color_pair(4) | curses.A_BOLD)
-        
-        # Línea decorativa debajo del título
+        header.addstr(1, title_x, title, curses.color_pair(4) | curses.A_BOLD)
         line = "─" * (len(title) + 4)
         line_x = max(0, (width - len(line)) // 2)
-        self.screen.addstr(2, line_x, line, curses.color_pair(4))
+        header.addstr(2, line_x, line, curses.color_pair(4))
+        
+        # Marco de estaciones (el título se pinta al dibujar la lista)
+        stations = self.windows['list']
+        self.draw_box(0, 0, stations_height, stations_width, win=stations)
+        
+        # Panel de controles: marco y textos fijos
+        status = self.windows['status']
+        self.draw_box(0, 0, 11, controls_width, "🎮 CONTROLES Y ESTADO", win=status)
+        try:
+            status.addstr(1, 2, "↑/↓: Navegar", curses.color_pair(3))
+            status.addstr(1, 25, "←/→: Volumen", curses.color_pair(3))
+            status.addstr(1, 45, "Enter: Play/Pause"[:controls_width - 46], curses.color_pair(3))
+            status.addstr(2, 2, "/: Buscar", curses.color_pair(3))
+            status.addstr(2, 25, "ESC: Cancelar búsqueda", curses.color_pair(3))
+            status.addstr(3, 2, "o: Orden por latencia", curses.color_pair(3))
+            status.addstr(3, 25, "f: Favorita", curses.color_pair(3))
+            status.addstr(3, 45, "i: Métricas"[:controls_width - 46], curses.color_pair(3))
+            status.addstr(4, 2, "r: Grabar", curses.color_pair(3))
+            status.addstr(4, 25, "a/v: Diferido/Vivo", curses.color_pair(3))
+            status.addstr(4, 45, "e: Explorar"[:controls_width - 46], curses.color_pair(3))
+            status.addstr(5, 2, "Estado:")
+            status.addstr(6, 2, "Estación:")
+            status.addstr(7, 2, "Sonando:")
+            status.addstr(8, 2, "Volumen:")
+        except curses.error:
+            pass
+        
+        # Información de ayuda
+        footer = self.windows['footer']
+        help_text = "💡 Usa las flechas para navegar, '/' para buscar y ajustar volumen"
+        help_x = max(0, (width - len(help_text)) // 2)
+        try:
+            footer.addstr(0, help_x, help_text[:width - help_x - 1], curses.color_pair(3))
+        except curses.error:
+            pass
+        
+        for win in self.windows.values():
+            win.noutrefresh()
+        self.layout = (height, width)
+    
+    def render_header(self) -> bool:
+        """Pintar la barra de búsqueda si cambió"""
+        complete = not self.search_mode or self.filtered_radios.complete
+        state = (self.search_mode, self.search_typing, self.search_query, len(self.filtered_radios), complete)
+        if not self.changed('search', state):
+            return False
         
-        # Barra de búsqueda
+        header = self.windows['header']
+        _, width = header.getmaxyx()
         search_y = 3
         search_label = "🔍 Buscar: "
         search_x = max(2, (width - len(search_label) - 30) // 2)
         
-        self.screen.addstr(search_y, search_x, search_label, curses.color_pair(3))
-        
-        # Mostrar consulta de búsqueda actual
+        try:
+            header.move(search_y, 0)
+            header.clrtoeol()
+            header.addstr(search_y, search_x, search_label, curses.color_pair(3))
+            
+            # Mostrar consulta de búsqueda actual
+            if self.search_mode or self.search_typing:
+                cursor = "_" if self.search_typing else ""
+                search_display = f"[{self.search_query}{cursor}]"
+                header.addstr(search_y, search_x + len(search_label), search_display, curses.color_pair(6))
+                # Mostrar número de resultados (con "+" mientras se siguen buscando)
+                count = len(self.filtered_radios) if self.search_mode else len(self.radios)
+                results_info = f" ({count}{'' if complete else '+'} resultados)"
+                header.addstr(search_y, search_x + len(search_label) + len(search_display), results_info, curses.color_pair(4))
+            else:
+                header.addstr(search_y, search_x + len(search_label), "Presiona '/' para buscar", curses.color_pair(7))
+        except curses.error:
+            pass
+        return True
+    
+    def render_station_row(self, win, row: int, width: int, index: int, radio: Optional[Station], badge: tuple = None):
+        """Reescribir una fila de la lista de estaciones"""
+        try:
+            win.addstr(row, 1, " " * (width - 2))
+            if radio is None:
+                return
+            
+            win.addstr(row, 2, f"{index + 1:2d}.", curses.color_pair(3))
+            if badge:
+                win.addstr(row, width - 11, badge[0], curses.color_pair(badge[1]))
+            title = radio.title
+            if self.history.is_favorite(radio.url):
+                title = "★ " + title
+            if radio.url in self.recording_urls:
+                title = "● " + title
+            if radio.url in self.stream_titles:
+                title = f"{title}  ♪ {self.stream_titles[radio.url]}"
+            title = title[:max(0, width - 21)]
+            if index == self.selected:
+                win.addstr(row, 6, "▶ ", curses.color_pair(2))
+                win.addstr(row, 8, title, curses.color_pair(2) | curses.A_BOLD)
+            else:
+                win.addstr(row, 8, title, curses.color_pair(7))
+        except curses.error:
+            pass
+    
+    def render_list(self) -> bool:
+        """Repintar solo las filas de la lista que cambiaron"""
+        stations = self.windows['list']
+        height, width = stations.getmaxyx()
+        radios = self.get_display_radios()
+        max_visible = self.max_visible()
         if self.search_mode:
-            search_display = f"[{self.search_query}]"
-            self.screen.addstr(search_y, search_x + len(search_label), search_display, curses.color_pair(6))
-            # Mostrar número de resultados
-            results_info = f" ({len(self.filtered_radios)} resultados)"
-            self.screen.addstr(search_y, search_x + len(search_label) + len(search_display), results_info, curses.color_pair(4))
+            # Encontrar la página visible y saber si hay más debajo, sin pasarse del
+            # presupuesto del cuadro: extend_search completa el resto
+            radios.ensure(self.scroll_offset + max_visible + 1, self.SEARCH_BUDGET)
+        total = len(radios)
+        dirty = False
+        
+        # Línea superior: título con información de scroll e indicador ↑
+        if total > max_visible:
+            box_title = f"📻 ESTACIONES ({total}) - Scroll {self.scroll_offset + 1}-{min(self.scroll_offset + max_visible, total)}"
         else:
-            self.screen.addstr(search_y, search_x + len(search_label), "Presiona '/' para buscar", curses.color_pair(7))
+            box_title = "📻 ESTACIONES (cargando...)" if self.loading else f"📻 ESTACIONES ({total})"
+        if self.changed('list:top', (box_title, self.scroll_offset > 0)):
+            self.draw_box_title(0, 0, width, box_title, win=stations)
+            if self.scroll_offset > 0:
+                try:
+                    stations.addstr(0, width - 8, "↑ ↑ ↑", curses.color_pair(3))
+                except curses.error:
+                    pass
+            dirty = True
         
-        # Panel principal de estaciones (más ancho y centrado)
-        stations_width = min(70, width - 10)
-        stations_x = max(2, (width - stations_width) // 2)
-        stations_height = min(height - 15, height - 11)  # Reducir altura para dar espacio a la búsqueda
+        # Filas de estaciones
+        for row in range(max_visible):
+            index = self.scroll_offset + row
+            radio = radios[index] if index < total else None
+            badge = self.health_badge(radio.url) if radio else None
+            marks = radio is not None and (self.history.is_favorite(radio.url), radio.url in self.recording_urls)
+            song = radio is not None and self.stream_titles.get(radio.url)
+            state = (index, radio.title, index == self.selected, badge, marks, song) if radio else None
+            if self.changed(f'list:{row}', state):
+                self.render_station_row(stations, row + 1, width, index, radio, badge)
+                dirty = True
+        
+        # Penúltima fila: URL de la estación seleccionada (debajo de la lista)
+        url = radios[self.selected].url if 0 <= self.selected < total else ""
+        if self.changed('list:url', url):
+            url_display = url[:width - 13] + "..." if len(url) > width - 10 else url
+            try:
+                stations.addstr(height - 2, 1, " " * (width - 2))
+                stations.addstr(height - 2, 8, url_display, curses.color_pair(6))
+            except curses.error:
+                pass
+            dirty = True
+        
+        # Línea inferior: indicador ↓
+        more_below = self.scroll_offset + max_visible < total
+        if self.changed('list:bottom', more_below):
+            try:
+                stations.hline(height - 1, 1, curses.ACS_HLINE, width - 2)
+                if more_below:
+                    stations.addstr(height - 1, width // 2 - 3, "↓ ↓ ↓", curses.color_pair(3))
+            except curses.error:
+                pass
+            dirty = True
         
-        # Marco para estaciones
-        # Mostrar estaciones con mejor formato y scroll
-        start_y = 6
-        max_visible = stations_height - 3
+        if dirty:
+            stations.noutrefresh()
+        return dirty
+    
+    def render_status(self) -> bool:
+        """Repintar solo los campos del panel de estado que cambiaron"""
+        status = self.windows['status']
+        _, controls_width = status.getmaxyx()
+        dirty = False
         
-        # Calcular qué estaciones mostrar basado en el scroll
-        visible_radios = self.get_display_radios()[self.scroll_offset:self.scroll_offset + max_visible]
+        def clear_field(row: int, x: int):
+            status.addstr(row, x, " " * (controls_width - x - 1))
         
-        for i, radio in enumerate(visible_radios):
-            if start_y + i < height - 1:
-                y_pos = start_y + i
-                actual_index = self.scroll_offset + i
-                
-                # Número de estación
-                station_num = f"{actual_index + 1:2d}."
-                self.screen.addstr(y_pos, stations_x + 2, station_num, curses.color_pair(3))
-                
-                # Estación seleccionada
-                if actual_index == self.selected:
-                    self.screen.addstr(y_pos, stations_x + 6, "▶ ", curses.color_pair(2))
-                    self.screen.addstr(y_pos, stations_x + 8, radio['title'], curses.color_pair(2) | curses.A_BOLD)
-                    
-                    # Mostrar URL de la estación seleccionada
-                    url_y = y_pos + 1
-                    if url_y < height - 1 and url_y < stations_height + 3:
-                        url_display = radio['url'][:stations_width - 10] + "..." if len(radio['url']) > stations_width - 10 else radio['url']
-                        self.screen.addstr(url_y, stations_x + 8, url_display, curses.color_pair(6))
+        try:
+            # Estado de reproducción (según los eventos de mpv)
+            loading = self.playing and (self.track.buffering or self.track.core_idle)
+            paused = self.paused_at is not None
+            shift = self.shift_label() if self.shifting() else ""
+            if self.changed('status:playing', (self.playing, loading, self.mpv_died, paused, shift)):
+                clear_field(5, 10)
+                if paused:
+                    status.addstr(5, 10, f"⏸ En pausa, grabando {shift}", curses.color_pair(3))
+                elif shift and not loading:
+                    status.addstr(5, 10, f"▶ En diferido {shift}", curses.color_pair(2))
+                elif loading:
+                    status.addstr(5, 10, "⏳ Cargando...", curses.color_pair(3))
+                elif self.playing:
+                    status.addstr(5, 10, "▶ Reproduciendo", curses.color_pair(2))
+                elif self.mpv_died:
+                    status.addstr(5, 10, "✗ mpv terminó", curses.color_pair(1))
+                else:
+                    status.addstr(5, 10, "⏸ Pausado", curses.color_pair(1))
+                dirty = True
+            
+            # Estación actual
+            if self.changed('status:station', self.current_station):
+                clear_field(6, 12)
+                if self.current_station:
+                    status.addstr(6, 12, self.current_station[:controls_width - 14], curses.color_pair(6))
                 else:
-                    # Estación no seleccionada
-                    self.screen.addstr(y_pos, stations_x + 6, "  ")
-                    self.screen.addstr(y_pos, stations_x + 8, radio['title'], curses.color_pair(7))
-        
-        # Mostrar indicadores de scroll
-        if self.scroll_offset > 0:
-            # Indicador de que hay más arriba
-            scroll_up_y = start_y - 1
-            if scroll_up_y >= 0:
-                self.screen.addstr(scroll_up_y, stations_x + stations_width // 2 - 3, "↑ ↑ ↑", curses.color_pair(3))
-        
-        if self.scroll_offset + max_visible < len(self.get_display_radios()):
-            # Indicador de que hay más abajo
-            scroll_down_y = start_y + max_visible
-            if scroll_down_y < height - 1:
-                self.screen.addstr(scroll_down_y, stations_x + stations_width // 2 - 3, "↓ ↓ ↓", curses.color_pair(3))
-        
-        # Mostrar información de scroll en el título del marco
-        if len(self.get_display_radios()) > max_visible:
-            scroll_info = f"📻 ESTACIONES ({len(self.get_display_radios())}) - Scroll {self.scroll_offset + 1}-{min(self.scroll_offset + max_visible, len(self.get_display_radios()))}"
-            self.draw_box(4, stations_x, stations_height, stations_width, scroll_info)
+                    status.addstr(6, 12, "Ninguna seleccionada", curses.color_pair(7))
+                dirty = True
+            
+            # Tema actual: metadatos ICY o, si no hay, el título de mpv
+            now_playing = self.now_playing()
+            if self.changed('status:title', now_playing):
+                clear_field(7, 12)
+                status.addstr(7, 12, now_playing[:controls_width - 14], curses.color_pair(4))
+                dirty = True
+            
+            # Volumen con barra integrada
+            if self.changed('status:volume', self.volume):
+                volume_bar_width = min(30, controls_width - 15)
+                self.draw_progress_bar(8, 12, volume_bar_width, self.volume, "", win=status)
+                dirty = True
+            
+            # Información adicional
+            complete = not self.search_mode or self.filtered_radios.complete
+            scan = self.scan.progress if self.scan else None
+            info = (self.selected, len(self.get_display_radios()), complete, self.search_mode, scan)
+            if self.changed('status:info', info):
+                clear_field(9, 2)
+                status.addstr(9, 2, f"Estación {self.selected + 1} de {len(self.get_display_radios())}{'' if complete else '+'}", curses.color_pair(3))
+                if scan:
+                    status.addstr(9, 30, f"📡 Explorando {scan[0]}/{scan[1]}", curses.color_pair(4))
+                elif self.search_mode:
+                    status.addstr(9, 30, "🔍 Búsqueda activa", curses.color_pair(4))
+                status.addstr(9, controls_width - 10, "q: Salir", curses.color_pair(3))
+                dirty = True
+        except curses.error:
+            pass
+        
+        if dirty:
+            status.noutrefresh()
+        return dirty
+    
+    def show_interface(self):
+        """Mostrar la interfaz principal repintando solo lo que cambió"""
+        # Obtener dimensiones
+        height, width = self.screen.getmaxyx()
+        
+        # Verificar tamaño mínimo de terminal
+        if width < 60 or height < 22:
+            if self.changed('too-small', (height, width)):
+                self.layout = None
+                self.screen.erase()
+                try:
+                    self.screen.addstr(0, 0, "Terminal muy pequeña. Necesitas al menos 60x22 caracteres.", curses.color_pair(1))
+                    self.screen.addstr(1, 0, f"Tu terminal: {width}x{height}", curses.color_pair(3))
+                    self.screen.addstr(2, 0, "Redimensiona la terminal para continuar...", curses.color_pair(3))
+                except curses.error:
+                    pass
+                self.screen.refresh()
+            return
+        
+        # Regiones copiadas con noutrefresh en este cuadro
+        refreshed = self.layout != (height, width)
+        if refreshed:
+            self.build_layout(height, width)
+        
+        if self.render_header():
+            self.windows['header'].noutrefresh()
+            refreshed = True
+        refreshed = self.render_list() or refreshed
+        refreshed = self.render_status() or refreshed
+        if self.show_metrics:
+            self.render_metrics()
+            refreshed = True
+        
+        # Enviar todos los cambios a la terminal de una vez (si hubo alguno)
+        if refreshed:
+            curses.doupdate()
+    
+    def render_metrics(self):
+        """Pintar el panel de métricas encima del resto de las ventanas"""
+        panel = self.windows['metrics']
+        height, width = panel.getmaxyx()
+        panel.erase()
+        self.draw_box(0, 0, height, width, "📊 MÉTRICAS", win=panel)
+        for row, line in enumerate(self.metrics.summary(self.playing_source)[:height - 2]):
+            try:
+                panel.addstr(row + 1, 2, line[:width - 4], curses.color_pair(4))
+            except curses.error:
+                pass
+        # Volver a copiarlo entero: las ventanas de abajo pudieron pisarlo
+        panel.touchwin()
+        panel.noutrefresh()
+    
+    def toggle_metrics(self):
+        """Mostrar u ocultar el panel de métricas (empieza a medir la primera vez)"""
+        if self.metrics is None:
+            self.metrics = Metrics()
+        self.show_metrics = not self.show_metrics
+        self.invalidate()
+    
+    def flush_metrics(self):
+        self.metrics.flush()
+        self.schedule('metrics', Metrics.FLUSH_INTERVAL, self.flush_metrics)
+    
+    def adjust_volume(self, change: int):
+        """Ajustar volumen (se envía a mpv una vez por cuadro con sync_volume)"""
+        self.volume = max(0, min(100, self.volume + change))
+    
+    def sync_volume(self):
+        """Enviar a mpv el volumen final de las teclas acumuladas"""
+        if self.engine.volume != self.volume:
+            try:
+                self.engine.set_volume(self.volume)
+            except MpvIPCError:
+                pass
+    
+    def move_selection(self, delta: int):
+        """Mover la selección delta posiciones, dando la vuelta en los extremos"""
+        radios = self.get_display_radios()
+        if self.search_mode:
+            # Asegurar que existan las estaciones de destino antes de navegar
+            radios.ensure(self.selected + delta + 2)
+            if self.selected + delta < 0:
+                radios.finish()
+        total = len(radios)
+        if total == 0:
+            return
+        self.selected = (self.selected + delta) % total
+        
+        # Ajustar scroll para que la selección quede visible
+        max_visible = self.max_visible()
+        if self.selected < self.scroll_offset:
+            self.scroll_offset = self.selected
+        elif self.selected >= self.scroll_offset + max_visible:
+            self.scroll_offset = self.selected - max_visible + 1
+    
+    def play_station(self):
+        """Reproducir o detener estación (con --timeshift, pausar y reanudar la que suena)"""
+        if self.shifting():
+            radios = self.get_display_radios()
+            if not radios or radios[self.selected].url == self.playing_source:
+                self.toggle_pause()
+                return
+        if self.playing:
+            self.stop_station()
+        elif not self.mpv_ready():
+            self.current_station = "Error: mpv no está instalado"
+        elif self.get_display_radios():
+            self.start_station(self.get_display_radios()[self.selected])
+    
+    def stop_station(self):
+        """Detener la reproducción (mpv queda en espera)"""
+        try:
+            if self.paused_at is not None:
+                self.engine.set_pause(False)
+            self.engine.stop()
+        except MpvIPCError:
+            pass
+        self.stop_timeshift()
+        self.playing = False
+        self.playing_source = None
+        self.current_station = ""
+        self.track.reset()
+        self.buffering.stopped()
+        if self.metrics:
+            self.metrics.play_stopped()
+    
+    def start_station(self, radio: Station, remember: bool = True):
+        """Empezar a reproducir una estación (sin `remember` no cuenta en el historial)"""
+        self.current_station = radio.title
+        
+        # Usar el endpoint ya resuelto; si no lo hay, la URL original. Al daemon
+        # se le manda la del catálogo: con ella sabe qué estación es
+        target = radio.url if self.attached else self.resolver.lookup(radio.url)
+        if target is None:
+            self.resolver.prefetch(radio.url)
+            target = radio.url
+        
+        # Antes de cargar: los eventos de mpv pueden llegar enseguida
+        self.playing_source = radio.url
+        self.playing = True
+        self.mpv_died = False
+        self.track.reset()
+        try:
+            warm = self.standby.take(target)
+            if warm is not None:
+                # Intercambiar: el mpv precargado pasa a ser el principal
+                warm.set_volume(self.volume)
+                warm.listener = self.on_mpv_event
+                warm.observe(MpvEngine.PLAYBACK_PROPERTIES)
+                previous, self.engine = self.engine, warm
+                previous.unobserve()
+                self.standby.promote(warm, previous)
+            elif self.timeshift and self.health_codec(radio.url) != 'hls' \
+                    and not urllib.parse.urlsplit(target).path.lower().endswith('.m3u8'):
+                # mpv escucha el anillo local mientras se captura la estación
+                local = self.timeshift.capture(radio.url, radio.title, target)
+                self.engine.play(local, self.buffer_options(radio.url))
+            else:
+                self.engine.play(target, self.buffer_options(radio.url))
+            if not self.attached:
+                self.buffering.started(radio.url, warm is not None)
+                self.schedule('buffer', BufferProfiles.SAMPLE_INTERVAL, self.sample_buffer)
+            if self.metrics:
+                self.metrics.play_started(radio.url, radio.title, warm is not None)
+            if remember:
+                self.history.played(radio.url, radio.title)
+        except (OSError, MpvIPCError) as e:
+            self.playing = False
+            self.playing_source = None
+            self.current_station = f"Error: {e}"
+    
+    def start_scan(self):
+        """Explorar las estaciones siguientes: sondearlas en paralelo y previsualizar las vivas"""
+        radios = self.get_display_radios()
+        if not radios or not self.mpv_ready():
+            return
+        first = self.selected + (1 if self.playing else 0)
+        if self.search_mode:
+            radios.ensure(first + StationScan.LIMIT)
+        stations = [(position, radios[position])
+                    for position in range(first, min(first + StationScan.LIMIT, len(radios)))]
+        if not stations:
+            return
+        self.scan = scan = StationScan(self.health, stations)
+        for _, radio in stations:
+            future = self.background.submit(scan.prober.probe(radio.url))
+            future.add_done_callback(lambda future, scan=scan: self.post(lambda: self.scan_result(scan, future)))
+        scan.waiting = True
+    
+    def scan_result(self, scan: StationScan, future):
+        """Llegó el sondeo de una estación explorada"""
+        if future.cancelled() or future.exception() is not None:
+            return
+        result = future.result()
+        if result.title:
+            self.stream_titles[result.url] = result.title
+        self.dirty = True
+        if scan is not self.scan:
+            return
+        scan.results[result.url] = result
+        if scan.waiting:
+            self.scan_step()
         else:
-            self.draw_box(4, stations_x, stations_height, stations_width, f"📻 ESTACIONES ({len(self.get_display_radios())})")
-        
-        # Panel de controles y estado (abajo, centrado)
-        controls_width = min(60, width - 10)
-        controls_x = max(2, (width - controls_width) // 2)
-        controls_y = min(4 + stations_height + 1, height - 10)
-        
-        # Asegurar que el panel de controles quepa en la pantalla
-        if controls_y + 8 < height:
-            self.draw_box(controls_y, controls_x, 8, controls_width, "🎮 CONTROLES Y ESTADO")
-            
-            # Primera fila: Controles principales
-            self.screen.addstr(controls_y + 1, controls_x + 2, "↑/↓: Navegar", curses.color_pair(3))
-            self.screen.addstr(controls_y + 1, controls_x + 25, "←/→: Volumen", curses.color_pair(3))
-            self.screen.addstr(controls_y + 1, controls_x + 45, "Enter: Play/Pause", curses.color_pair(3))
-            
-            # Segunda fila: Controles adicionales
-            self.screen.addstr(controls_y + 2, controls_x + 2, "/: Buscar", curses.color_pair(3))
-            self.screen.addstr(controls_y + 2, controls_x + 25, "ESC: Cancelar búsqueda", curses.color_pair(3))
-            self.screen.addstr(controls_y + 2, controls_x + 50, "q: Salir", curses.color_pair(3))
-            
-            # Tercera fila: Estado de reproducción
-            self.screen.addstr(controls_y + 3, controls_x + 2, "Estado:")
-            if self.playing:
-                self.screen.addstr(controls_y + 3, controls_x + 10, "▶ Reproduciendo", curses.color_pair(2))
+            self.scan_warm()
+    
+    def scan_step(self):
+        """Pasar a la próxima estación viva (o esperar a que responda)"""
+        scan = self.scan
+        entry = scan.next_live()
+        if entry is None:
+            if scan.done:
+                self.stop_scan()
             else:
-                self.screen.addstr(controls_y + 3, controls_x + 10, "⏸ Pausado", curses.color_pair(1))
-            
-            # Cuarta fila: Estación actual
-            self.screen.addstr(controls_y + 4, controls_x + 2, "Estación:")
-            if self.current_station:
-                self.screen.addstr(controls_y + 4, controls_x + 12, self.current_station, curses.color_pair(6))
+                scan.waiting = True
+            return
+        scan.waiting = False
+        position, radio = entry
+        radios = self.get_display_radios()
+        if position < len(radios) and radios[position].url == radio.url:
+            self.move_selection(position - self.selected)
+        if self.playing:
+            self.stop_station()
+        self.start_station(radio, remember=False)
+        self.schedule('scan', StationScan.PREVIEW, self.scan_step)
+        self.schedule('scan-stall', StationScan.STALL, self.scan_stalled)
+        self.scan_warm()
+        self.dirty = True
+    
+    def scan_stalled(self):
+        """Saltar la estación si todavía no empezó a sonar"""
+        if self.scan and self.playing and (self.track.buffering or self.track.core_idle):
+            self.scan_step()
+    
+    def scan_warm(self):
+        """Precargar la próxima estación viva mientras suena la actual"""
+        radio = self.scan.upcoming()
+        if radio is None or self.attached:
+            return
+        target = self.resolver.lookup(radio.url) or radio.url
+        if target != self.engine.current_url and not self.standby.is_warm(target):
+            self.standby.warm(target, self.buffer_options(radio.url))
+    
+    def stop_scan(self, keep: bool = False):
+        """Terminar la exploración (con `keep`, la estación que suena cuenta como elegida)"""
+        self.scan = None
+        self.cancel('scan')
+        self.cancel('scan-stall')
+        if keep and self.playing and self.playing_source:
+            self.history.played(self.playing_source, self.current_station)
+        self.dirty = True
+    
+    def health_codec(self, url: str) -> Optional[str]:
+        result = self.health.get(url) if self.health.loaded else None
+        return result.codec if result is not None else None
+    
+    def shifting(self) -> bool:
+        """Suena una estación a través del anillo de TimeShift"""
+        return bool(self.timeshift and self.playing and self.timeshift.url is not None
+                    and self.timeshift.url == self.playing_source)
+    
+    def toggle_pause(self):
+        """Pausar en diferido (la captura sigue) o reanudar donde quedó"""
+        try:
+            if self.paused_at is None:
+                self.engine.set_pause(True)
+                self.paused_at = time.monotonic()
+                self.schedule('timeshift', 1.0, self.tick_pause)
             else:
-                self.screen.addstr(controls_y + 4, controls_x + 12, "Ninguna seleccionada", curses.color_pair(7))
-            
-            # Quinta fila: Volumen con barra integrada
-            self.screen.addstr(controls_y + 5, controls_x + 2, "Volumen:")
-            volume_bar_width = min(30, controls_width - 15)
-            volume_bar_x = controls_x + 12
-            self.draw_progress_bar(controls_y + 5, volume_bar_x, volume_bar_width, self.volume, "")
-            
-            # Sexta fila: Información adicional
-            self.screen.addstr(controls_y + 6, controls_x + 2, f"Estación {self.selected + 1} de {len(self.get_display_radios())}", curses.color_pair(3))
-            if self.search_mode:
-                self.screen.addstr(controls_y + 6, controls_x + 35, "🔍 Búsqueda activa", curses.color_pair(4))
-            self.screen.addstr(controls_y + 6, controls_x + 55, "q: Salir", curses.color_pair(3))
-            
-            # Línea separadora
-            separator_y = controls_y + 7
-            if separator_y < height - 1:
-                separator_line = "─" * (controls_width - 4)
-                self.screen.addstr(separator_y, controls_x + 2, separator_line, curses.color_pair(4))
-                
-                # Información de ayuda
-                help_text = "💡 Usa las flechas para navegar, '/' para buscar y ajustar volumen"
-                help_x = max(0, (width - len(help_text)) // 2)
-                if separator_y + 1 < height - 1:
-                    self.screen.addstr(separator_y + 1, help_x, help_text, curses.color_pair(3))
-        
-        self.screen.refresh()
+                self.behind = min(self.behind + time.monotonic() - self.paused_at, self.timeshift.span())
+                self.paused_at = None
+                self.engine.set_pause(False)
+        except (OSError, MpvIPCError) as e:
+            self.current_station = f"Error: {e}"
     
-    def adjust_volume(self, change: int):
-        """Ajustar volumen"""
-        new_volume = self.volume + change
-        if 0 <= new_volume <= 100:
-            self.volume = new_volume
-            
-            # Ajustar volumen en mpv si está reproduciendo
-            if self.playing and self.mpv_pid:
-                try:
-                    # Usar mpv --input-ipc-server para control remoto
-                    subprocess.run([
-                        'mpv', '--input-ipc-server=/tmp/mpv-socket',
-                        '--volume=' + str(self.volume)
-                    ], check=False)
-                except:
-                    pass
+    def tick_pause(self):
+        """Repintar el contador de la pausa una vez por segundo"""
+        if self.paused_at is not None:
+            self.dirty = True
+            self.schedule('timeshift', 1.0, self.tick_pause)
     
-    def play_station(self):
-        """Reproducir o pausar estación"""
-        if self.playing:
-            # Detener reproducción
-            if self.mpv_pid:
+    def shift(self, seconds: Optional[float]):
+        """Retroceder `seconds` en el anillo (None: volver al vivo) y seguir reproduciendo"""
+        if not self.shifting() or not self.timeshift.seekable:
+            return
+        behind = self.behind
+        if self.paused_at is not None:
+            behind += time.monotonic() - self.paused_at
+        self.behind = 0.0 if seconds is None else min(behind + seconds, self.timeshift.span())
+        self.paused_at = None
+        try:
+            self.engine.play(self.timeshift.url_behind(self.behind), self.buffer_options(self.playing_source))
+            self.engine.set_pause(False)
+        except (OSError, MpvIPCError) as e:
+            self.current_station = f"Error: {e}"
+    
+    def stop_timeshift(self):
+        if self.timeshift:
+            self.timeshift.stop_capture()
+        self.paused_at = None
+        self.behind = 0.0
+    
+    def timeshift_changed(self):
+        """Si la estación no se puede capturar (p. ej. HLS), reproducirla directo"""
+        if self.timeshift.failed() and self.shifting():
+            source = self.playing_source
+            self.stop_timeshift()
+            try:
+                self.engine.set_pause(False)
+                self.engine.play(self.resolver.lookup(source) or source, self.buffer_options(source))
+            except (OSError, MpvIPCError):
+                pass
+        self.dirty = True
+    
+    def shift_label(self) -> str:
+        """Cuánto detrás del vivo está lo que suena (-M:SS), vacío si va en vivo"""
+        behind = self.behind
+        if self.paused_at is not None:
+            behind += time.monotonic() - self.paused_at
+        if behind < 1:
+            return ""
+        minutes, seconds = divmod(int(behind), 60)
+        return f"-{minutes}:{seconds:02d}"
+    
+    def buffer_options(self, url: str) -> Optional[Dict]:
+        """Propiedades de buffer aprendidas para la estación (el daemon usa las suyas)"""
+        return None if self.attached else self.buffering.options(url)
+    
+    def sample_buffer(self):
+        """Leer cada tanto el buffer de mpv mientras suena una estación"""
+        if self.buffering.poll(self.engine):
+            self.schedule('buffer', BufferProfiles.SAMPLE_INTERVAL, self.sample_buffer)
+    
+    def mpv_ready(self) -> bool:
+        """Comprobar una vez por sesión (con caché en disco) que mpv funciona"""
+        if self.attached:
+            return True  # mpv corre en el daemon
+        if self.mpv_path is None:
+            self.mpv_path = find_mpv() or ''
+        return bool(self.mpv_path)
+    
+    def start_mpv(self):
+        """Lanzar el mpv principal en espera, ya con la interfaz en pantalla"""
+        if not self.mpv_ready() or self.engine.alive():
+            return
+        try:
+            self.engine.start()
+        except (OSError, MpvIPCError):
+            pass  # Se reintenta al reproducir
+    
+    def on_mpv_event(self, engine: MpvEngine, event: Dict):
+        """Eventos de mpv: llegan en el hilo lector del IPC y se atienden en el principal"""
+        self.post(lambda: self.handle_mpv_event(engine, event))
+    
+    def handle_mpv_event(self, engine: MpvEngine, event: Dict):
+        """Actualizar el estado de reproducción con un evento del mpv principal"""
+        if engine is not self.engine:
+            return
+        
+        name = event.get('event')
+        if self.track.update(event):
+            self.buffering.update(event, self.track)
+            if self.metrics:
+                self.metrics.playback(event, self.track)
+        elif name == 'end-file' and event.get('reason') == 'error':
+            source = self.playing_source
+            if self.playing and source and engine.current_url != source:
+                # Falló el endpoint resuelto o el anillo local: volver a la URL original.
+                # Solo un destino resuelto que falla cuenta contra el resolver
+                if engine.current_url == self.resolver.lookup(source):
+                    self.resolver.report_failure(source)
+                self.stop_timeshift()
                 try:
-                    os.kill(self.mpv_pid, signal.SIGTERM)
-                except:
+                    engine.play(source, self.buffer_options(source))
+                except (OSError, MpvIPCError):
                     pass
+        elif name == 'shutdown':
+            # mpv (o el daemon) terminó: se relanza al reproducir de nuevo
+            self.mpv_died = True
             self.playing = False
-            self.current_station = ""
-            self.mpv_pid = None
+            self.playing_source = None
+            self.stop_timeshift()
+            if self.scan:
+                self.stop_scan()
+            self.track.reset()
+            self.buffering.stopped()
+            if self.metrics:
+                self.metrics.play_stopped()
+        elif name == 'status':
+            # Otro cliente del daemon cambió la reproducción
+            self.adopt_status(event.get('data') or {})
         else:
-            # Iniciar reproducción
-            if self.get_display_radios():
-                radio = self.get_display_radios()[self.selected]
-                self.current_station = radio['title']
-                
-                try:
-                    # Iniciar mpv en segundo plano
-                    process = subprocess.Popen([
-                        'mpv', '--volume=' + str(self.volume),
-                        '--input-ipc-server=/tmp/mpv-socket',
-                        '--no-video', '--quiet',
-                        radio['url']
-                    ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-                    self.mpv_pid = process.pid
-                    self.playing = True
-                except Exception as e:
-                    self.current_station = f"Error: {e}"
+            return
+        self.dirty = True
     
-    def activate_search(self):
-        """Activar modo de búsqueda y permitir al usuario escribir"""
-        # Guardar estado actual de la terminal
-        curses.echo()
-        curses.nocbreak()
-        
-        # Mostrar prompt de búsqueda
-        self.screen.clear()
-        height, width = self.screen.getmaxyx()
+    def adopt_status(self, status: Dict):
+        """Tomar el estado del daemon (al conectarse o cuando otro cliente lo cambia)"""
+        self.volume = self.engine.volume = status.get('volume', self.volume)
+        self.recording_urls = set(status.get('recording', ()))
+        self.playing = status.get('playing', False)
+        if not self.playing:
+            if self.metrics:
+                self.metrics.play_stopped()
+            self.playing_source = None
+            self.current_station = ""
+            self.engine.current_url = None
+        elif status.get('url') != self.engine.current_url:
+            self.playing_source = self.engine.current_url = status.get('url')
+            self.current_station = status.get('station', "")
+    
+    def now_playing(self) -> str:
+        """Tema que suena: metadatos ICY o el título de mpv si no es la URL"""
+        if not self.playing:
+            return ""
+        return self.track.title(self.engine.current_url, self.playing_source)
+    
+    def prewarm_selected(self):
+        """Precargar la estación bajo el cursor (se llama tras DWELL segundos quieto)"""
+        radios = self.get_display_radios()
+        if not radios or not self.mpv_ready():
+            return
         
-        # Título
-        title = "🔍 BÚSQUEDA DE ESTACIONES"
-        title_x = (width - len(title)) // 2
-        self.screen.addstr(height // 2 - 2, title_x, title, curses.color_pair(4) | curses.A_BOLD)
+        # Resolver primero para precargar el mismo endpoint que se reproducirá
+        url = radios[self.selected].url
+        target = self.resolver.lookup(url)
+        if target is None:
+            self.resolver.prefetch(url)
+            if self.resolver.is_pending(url):
+                self.schedule('dwell', 0.15, self.prewarm_selected)
+                return
+            target = self.resolver.lookup(url) or url
+        if target != self.engine.current_url and not self.standby.is_warm(target):
+            self.standby.warm(target, self.buffer_options(url))
+    
+    def activate_search(self):
+        """Activar la búsqueda en vivo: las teclas siguientes forman la consulta"""
+        if self.index is None:
+            return  # Catálogo todavía cargando
+        self.search_typing = True
+        self.index.prepare()
+    
+    def read_char(self, key: int) -> str:
+        """Completar un carácter UTF-8 a partir del primer byte leído con getch"""
+        if key < 0x80:
+            return chr(key)
+        # Bytes de continuación según el primer byte
+        length = 2 if key < 0xE0 else 3 if key < 0xF0 else 4
+        self.screen.nodelay(False)
+        try:
+            data = bytes([key] + [self.screen.getch() & 0xFF for _ in range(length - 1)])
+        finally:
+            self.screen.nodelay(True)
+        return data.decode('utf-8', errors='ignore')
+    
+    def handle_search_key(self, key: int) -> bool:
+        """Procesar una tecla mientras se escribe la búsqueda; indica si la consumió"""
+        if key in (curses.KEY_BACKSPACE, 127, 8):
+            self.search_stations(self.search_query[:-1])
+        elif key == ord('\x1b'):  # ESC: cancelar búsqueda
+            self.search_typing = False
+            self.search_stations("")
+        elif key == ord('\n'):  # Enter: dejar de escribir y conservar el filtro
+            self.search_typing = False
+        elif 32 <= key < 127 or 0xC0 <= key < 0xF8:
+            self.search_stations(self.search_query + self.read_char(key))
+        else:
+            return False
+        return True
+    
+    def extend_search(self):
+        """Completar la búsqueda actual por tramos entre eventos"""
+        if not self.search_mode:
+            return
+        if self.filtered_radios.extend(0.004):
+            self.dirty = True
+        if not self.filtered_radios.complete:
+            self.schedule('search', 0.01, self.extend_search)
+    
+    def expire_standby(self):
+        self.standby.expire()
+        self.schedule('standby', StandbyPool.MAX_IDLE / 3, self.expire_standby)
+    
+    def handle_resize(self):
+        """Adaptar curses al nuevo tamaño de la terminal (SIGWINCH)"""
+        self.resized = False
+        try:
+            size = os.get_terminal_size(sys.__stdout__.fileno())
+            curses.resizeterm(size.lines, size.columns)
+        except (OSError, curses.error):
+            pass
+        self.invalidate()
+        self.dirty = True
+    
+    def read_keys(self):
+        """Leer todas las teclas disponibles y aplicarlas como un solo cambio
+
+        Con una tecla mantenida llegan muchas repeticiones por cuadro: los
+        movimientos seguidos se suman en un único desplazamiento y el texto
+        escrito de corrido en una sola búsqueda, así la pantalla nunca se
+        atrasa respecto del teclado.
+        """
+        moves = 0
+        typed = ""
+        while self.running:
+            key = self.screen.getch()
+            if key == -1:
+                break
+            self.dirty = True
+            if self.metrics:
+                self.metrics.key()
+            
+            if self.search_typing and (32 <= key < 127 or 0xC0 <= key < 0xF8):
+                if moves:
+                    self.move_selection(moves)
+                    moves = 0
+                typed += self.read_char(key)
+                continue
+            if typed:
+                self.search_stations(self.search_query + typed)
+                typed = ""
+            
+            if key in (curses.KEY_UP, curses.KEY_DOWN):
+                if self.scan:
+                    self.stop_scan()
+                moves += 1 if key == curses.KEY_DOWN else -1
+                continue
+            if moves:
+                self.move_selection(moves)
+                moves = 0
+            self.handle_key(key)
         
-        # Prompt
-        prompt = "Escribe tu búsqueda (Enter para buscar, ESC para cancelar):"
-        prompt_x = (width - len(prompt)) // 2
-        self.screen.addstr(height // 2, prompt_x, prompt, curses.color_pair(3))
+        if typed:
+            self.search_stations(self.search_query + typed)
+        if moves:
+            self.move_selection(moves)
+        self.after_selection_change()
+    
+    def handle_key(self, key: int):
+        """Procesar una tecla"""
+        if key == curses.KEY_RESIZE:
+            self.invalidate()
+            return
         
-        # Línea de entrada
-        input_x = (width - 40) // 2
-        self.screen.addstr(height // 2 + 1, input_x, "_" * 40, curses.color_pair(7))
+        if self.search_typing and self.handle_search_key(key):
+            return
         
-        # Posicionar cursor
-        self.screen.addstr(height // 2 + 1, input_x, "", curses.color_pair(7))
-        self.screen.refresh()
+        if self.scan and key in (ord('\n'), ord(' '), ord('\x1b'), ord('e')):
+            # Quedarse con la estación que suena
+            self.stop_scan(keep=True)
+            return
         
-        try:
-            # Leer entrada del usuario
-            query = self.screen.getstr(height // 2 + 1, input_x, 40).decode('utf-8')
-            
-            # Realizar búsqueda
-            self.search_stations(query)
-            
-        except (KeyboardInterrupt, EOFError):
+        if key == ord('q'):
+            self.running = False
+        elif key == ord('/'):
+            # Activar modo búsqueda
+            self.activate_search()
+        elif key == ord('\x1b'):  # ESC
             # Cancelar búsqueda
-            self.search_stations("")
+            if self.search_mode:
+                self.search_stations("")
+        elif key == curses.KEY_UP:
+            self.move_selection(-1)
+        elif key == curses.KEY_DOWN:
+            self.move_selection(1)
+        elif key == ord('o'):
+            # Ordenar por tiempo de respuesta (o volver al alfabético)
+            self.toggle_latency_sort()
+        elif key == ord('f'):
+            # Marcar como favorita (se ordena al principio de la lista)
+            self.toggle_favorite()
+        elif key == ord('i'):
+            # Panel de métricas: latencias, bytes por cuadro y arranques
+            self.toggle_metrics()
+        elif key == ord('r'):
+            # Grabar la estación seleccionada mientras suena otra
+            self.toggle_recording()
+        elif key == ord('a'):
+            # Diferido: volver 30 segundos
+            self.shift(TimeShift.BACK)
+        elif key == ord('v'):
+            # Diferido: volver al vivo
+            self.shift(None)
+        elif key == ord('e'):
+            # Explorar las estaciones siguientes y previsualizar las vivas
+            self.start_scan()
+        elif key == curses.KEY_LEFT:
+            self.adjust_volume(-10)
+        elif key == curses.KEY_RIGHT:
+            self.adjust_volume(10)
+        elif key == ord('\n') or key == ord(' '):  # Enter o Espacio
+            self.play_station()
+    
+    def render_frame(self):
+        """Pintar un cuadro como máximo cada FRAME_INTERVAL segundos"""
+        wait = self.last_frame + self.FRAME_INTERVAL - time.monotonic()
+        if wait > 0:
+            # Demasiado pronto: juntar lo que llegue hasta el próximo cuadro
+            self.schedule('frame', wait, self.redraw)
+            return
+        self.sync_volume()
+        metrics = self.metrics
+        if metrics:
+            begin = metrics.frame_begin()
+            self.show_interface()
+            metrics.frame_end(begin)
+        else:
+            self.show_interface()
+        self.dirty = False
+        self.last_frame = time.monotonic()
         
-        # Restaurar estado de la terminal
-        curses.noecho()
-        curses.cbreak()
+        if self.profile:
+            # Medición de arranque: salir apenas se ve el catálogo
+            if all(phase != 'primer cuadro' for phase, _ in self.profile.marks):
+                self.profile.mark('primer cuadro')
+            elif not self.loading:
+                self.profile.mark('catálogo en pantalla')
+            if not self.loading:
+                self.running = False
+                self.timers.clear()
+    
+    def after_selection_change(self):
+        """Reiniciar la espera para precargar y seguir completando la búsqueda"""
+        self.schedule('dwell', StandbyPool.DWELL, self.prewarm_selected)
+        if self.search_mode and not self.filtered_radios.complete:
+            self.schedule('search', 0.0, self.extend_search)
     
-    def run(self):
+    def run(self, json_file: str = "radios.json"):
         """Ejecutar la aplicación principal"""
+        self.open_loop()
+        previous_wakeup = None
         try:
-            # Configurar curses
+            # Configurar curses (ESC sin la espera por defecto de un segundo)
+            os.environ.setdefault('ESCDELAY', '25')
             self.screen = curses.initscr()
             curses.noecho()
             curses.cbreak()
             curses.curs_set(0)
             self.screen.keypad(True)
+            self.screen.nodelay(True)
             
             # Configurar colores
             curses.start_color()
@@ -412,72 +5120,56 @@ class RadioCLI:
             curses.init_pair(6, curses.COLOR_MAGENTA, -1)  # Magenta
             curses.init_pair(7, curses.COLOR_WHITE, -1)    # Blanco
             
-            # Bucle principal
-            while True:
-                self.show_interface()
-                
-                # Leer tecla
-                key = self.screen.getch()
-                
-                if key == ord('q'):
-                    break
-                elif key == ord('/'):
-                    # Activar modo búsqueda
-                    self.activate_search()
-                elif key == ord('\x1b'):  # ESC
-                    # Cancelar búsqueda
-                    if self.search_mode:
-                        self.search_stations("")
-                elif key == curses.KEY_UP:
-                    if self.selected > 0:
-                        self.selected -= 1
-                        # Ajustar scroll si es necesario
-                        if self.selected < self.scroll_offset:
-                            self.scroll_offset = self.selected
-                    elif len(self.get_display_radios()) > 0:
-                        # Ir a la última estación (wrap around)
-                        self.selected = len(self.get_display_radios()) - 1
-                        # Ajustar scroll para mostrar la última estación
-                        screen_height, _ = self.screen.getmaxyx()
-                        stations_height = min(screen_height - 15, screen_height - 11)
-                        max_visible = stations_height - 3
-                        if len(self.get_display_radios()) > max_visible:
-                            self.scroll_offset = max(0, len(self.get_display_radios()) - max_visible)
-                elif key == curses.KEY_DOWN:
-                    if self.selected < len(self.get_display_radios()) - 1:
-                        self.selected += 1
-                        # Ajustar scroll si es necesario
-                        screen_height, _ = self.screen.getmaxyx()
-                        stations_height = min(screen_height - 15, screen_height - 11)
-                        max_visible = stations_height - 3
-                        if self.selected >= self.scroll_offset + max_visible:
-                            self.scroll_offset = self.selected - max_visible + 1
-                    elif len(self.get_display_radios()) > 0:
-                        # Ir a la primera estación (wrap around)
-                        self.selected = 0
-                        self.scroll_offset = 0
-                elif key == curses.KEY_LEFT:
-                    self.adjust_volume(-10)
-                elif key == curses.KEY_RIGHT:
-                    self.adjust_volume(10)
-                elif key == ord('\n') or key == ord(' '):  # Enter o Espacio
-                    self.play_station()
+            # Un solo punto de espera: teclado, avisos de otros hilos
+            # (eventos de mpv, sondeos) y señales, más temporizadores
+            self.selector.register(sys.stdin.fileno(), selectors.EVENT_READ, lambda _: self.read_keys())
+            previous_wakeup = signal.set_wakeup_fd(self.wake_fd)
+            signal.signal(signal.SIGWINCH, lambda *_: setattr(self, 'resized', True))
+            
+            if self.profile:
+                self.profile.mark('curses')
+            self.open_catalog(json_file)
+            
+            # Lanzar mpv una sola vez, después del primer cuadro
+            self.schedule('mpv', 0.0, self.start_mpv)
+            self.schedule('standby', StandbyPool.MAX_IDLE / 3, self.expire_standby)
+            self.schedule('history', 0.0, self.load_history)
+            if self.metrics and self.metrics.path:
+                self.schedule('metrics', Metrics.FLUSH_INTERVAL, self.flush_metrics)
+            self.after_selection_change()
+            
+            # Bucle principal: dormir hasta que haya algo que hacer
+            self.running = True
+            while self.running:
+                if self.dirty:
+                    self.render_frame()
+                self.poll()
+                if self.resized:
+                    self.handle_resize()
                 
         except KeyboardInterrupt:
             pass
         finally:
-            # Limpiar
-            if self.playing and self.mpv_pid:
-                try:
-                    os.kill(self.mpv_pid, signal.SIGTERM)
-                except:
-                    pass
+            # Cerrar mpv, recoger los procesos y borrar sus sockets
+            self.standby.shutdown()
+            self.engine.shutdown()
+            self.background.stop()
+            self.health.save()
+            self.resolver.save()
+            self.history.close()
+            self.buffering.stopped()
+            self.buffering.save()
+            if self.recorder:
+                self.recorder.close()
+            if self.timeshift:
+                self.timeshift.close()
+            if self.metrics:
+                self.metrics.close()
             
-            # Limpiar socket temporal
-            try:
-                os.remove('/tmp/mpv-socket')
-            except:
-                pass
+            # Restaurar señales y cerrar el canal de avisos
+            if previous_wakeup is not None:
+                signal.set_wakeup_fd(previous_wakeup)
+            self.close_loop()
             
             # Restaurar terminal
             curses.nocbreak()
@@ -485,25 +5177,790 @@ class RadioCLI:
             curses.echo()
             curses.endwin()
 
+def default_catalog() -> str:
+    """Catálogo importado con `radio.py import` si existe; si no, radios.json"""
+    imported = os.path.join(data_dir(), 'catalog.bin')
+    return imported if os.path.exists(imported) else "radios.json"
+
+
+def run_import(args) -> int:
+    """Importar fuentes al catálogo compacto e informar el resultado"""
+    importer = CatalogImporter(args.output or os.path.join(data_dir(), 'catalog.bin'))
+    try:
+        stats = importer.run(args.sources, progress=lambda path: print(f"Leyendo {path}"))
+    except (OSError, ValueError) as e:
+        print(f"Error importando: {e}")
+        return 1
+    reused = stats['files'] - stats['parsed']
+    print(f"{stats['files']} archivos ({stats['parsed']} leídos, {reused} sin cambios): "
+          f"{stats['stations']} estaciones, {stats['duplicates']} duplicadas descartadas")
+    if stats['rebuilt']:
+        print(f"Catálogo escrito en {importer.output} ({stats['seconds']:.1f} s)")
+    else:
+        print(f"Sin cambios: {importer.output} ya está al día")
+    return 0
+
+
+def daemon_socket_path() -> str:
+    """Socket de control del daemon (uno por usuario)"""
+    return os.path.join(runtime_dir(), 'daemon.sock')
+
+
+def daemon_running(socket_path: str) -> bool:
+    """Indica si hay un daemon atendiendo en el socket"""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+        return True
+    except OSError:
+        return False
+    finally:
+        sock.close()
+
+
+def launch_daemon(socket_path: str):
+    """Lanzar el daemon en segundo plano, sin esperar a que abra el socket"""
+    # Sesión propia: el daemon sobrevive al cliente y a la terminal
+    subprocess.Popen([sys.executable, os.path.abspath(__file__), '--socket', socket_path, 'daemon'],
+                     stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                     stderr=subprocess.DEVNULL, start_new_session=True)
+
+
+def connect_daemon(socket_path: str, autostart: bool = True, timeout: float = 10.0) -> bool:
+    """Asegurar que el daemon está corriendo, lanzándolo en segundo plano si hace falta"""
+    if daemon_running(socket_path):
+        return True
+    if not autostart:
+        return False
+    launch_daemon(socket_path)
+
+    # El daemon abre el socket cuando ya cargó el catálogo y lanzó mpv
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if daemon_running(socket_path):
+            return True
+        time.sleep(0.02)
+    return False
+
+
+class ControlConnection:
+    """Cliente conectado al daemon, con sus buffers de entrada y salida"""
+
+    __slots__ = ('sock', 'inbox', 'outbox', 'subscribed', 'writing')
+
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.inbox = b''
+        self.outbox = bytearray()
+        self.subscribed = False  # Recibe los eventos de reproducción
+        self.writing = False  # Registrado también para escritura
+
+
+class RadioDaemon(EventLoop):
+    """Servicio sin interfaz: un mpv y el catálogo, controlados por un socket Unix
+
+    Habla el mismo protocolo que el IPC de mpv: una línea JSON por comando,
+    `{"command": ["play", "Mitre"], "request_id": 1}`, y una respuesta con el
+    mismo request_id, `error` y `data`. También acepta líneas de texto
+    (`play Radio Mitre`) para usarlo con socat. Los clientes suscritos reciben
+    los eventos de mpv y un evento `status` cada vez que cambia el estado.
+    Todo se atiende en un solo hilo con sockets no bloqueantes, así que puede
+    haber muchos clientes y cientos de comandos por segundo.
+    """
+
+    MAX_OUTBOX = 1 << 20  # Un suscriptor que no lee se desconecta pasado 1 MiB
+
+    def __init__(self, socket_path: str, json_file: str = "radios.json"):
+        super().__init__()
+        self.socket_path = socket_path
+        self.json_file = json_file
+        self.radios = None
+        self.index = None
+        self._by_url = None  # URL -> posición en el catálogo, al primer play-url
+        self.engine = MpvEngine(name='daemon')
+        self.engine.listener = self.on_mpv_event
+        self.engine.observe(MpvEngine.PLAYBACK_PROPERTIES)
+        self.track = NowPlaying()
+        self.buffering = BufferProfiles(HealthCache())  # Perfil de buffer de mpv por estación
+        self.station = ""  # Título de la estación que suena
+        self.playing_url = None  # URL que se mandó a mpv
+        self.recorder = Recorder(self, on_change=self.changed)  # Grabaciones a pedido y programadas
+        self.recording_schedule = RecordingSchedule()
+        self.scheduled = set()  # Ventanas programadas ya empezadas: (estación, url, fin)
+        self.volume = self.engine.volume
+        self.server = None
+        self.clients = {}  # Socket -> ControlConnection
+        self.handlers = {
+            'status': self.command_status,
+            'play': self.command_play,
+            'play-url': self.command_play_url,
+            'stop': self.command_stop,
+            'volume': self.command_volume,
+            'search': self.command_search,
+            'record': self.command_record,
+            'record-url': self.command_record_url,
+            'record-stop': self.command_record_stop,
+            'recordings': self.command_recordings,
+            'subscribe': self.command_subscribe,
+            'quit': self.command_quit,
+        }
+
+    def serve(self) -> int:
+        """Cargar el catálogo, lanzar mpv y atender clientes hasta recibir quit"""
+        try:
+            self.radios = StationStore.open(self.json_file)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Error cargando {self.json_file}: {e}")
+            return 1
+        self.index = StationIndex(self.radios)
+
+        if daemon_running(self.socket_path):
+            print(f"Ya hay un daemon en {self.socket_path}")
+            return 1
+        if not find_mpv():
+            print("Error: mpv no está instalado. Instálalo primero.")
+            return 1
+
+        self.open_loop()
+        previous_wakeup = None
+        try:
+            self.engine.start()
+
+            # Un socket que quedó de un daemon anterior ya no atiende: reemplazarlo
+            try:
+                os.remove(self.socket_path)
+            except OSError:
+                pass
+            self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.server.bind(self.socket_path)
+            self.server.listen(128)
+            self.server.setblocking(False)
+            self.selector.register(self.server, selectors.EVENT_READ, self.accept)
+
+            previous_wakeup = signal.set_wakeup_fd(self.wake_fd)
+            for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+                signal.signal(signum, lambda *_: setattr(self, 'running', False))
+
+            self.running = True
+            self.schedule('recordings', 0.0, self.check_schedule)
+            while self.running:
+                self.poll()
+        except (OSError, MpvIPCError) as e:
+            print(f"Error: {e}")
+            return 1
+        finally:
+            for conn in list(self.clients.values()):
+                self.drop(conn)
+            if self.server is not None:
+                self.server.close()
+                try:
+                    os.remove(self.socket_path)
+                except OSError:
+                    pass
+            self.engine.shutdown()
+            self.buffering.stopped()
+            self.buffering.save()
+            self.recorder.close()
+            if previous_wakeup is not None:
+                signal.set_wakeup_fd(previous_wakeup)
+            self.close_loop()
+        return 0
+
+    def accept(self, mask: int):
+        while True:
+            try:
+                sock, _ = self.server.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            sock.setblocking(False)
+            conn = ControlConnection(sock)
+            self.clients[sock] = conn
+            self.selector.register(sock, selectors.EVENT_READ, lambda mask, conn=conn: self.on_client(conn, mask))
+
+    def on_client(self, conn: ControlConnection, mask: int):
+        """Leer comandos (todos los que llegaron juntos) y responder de una vez"""
+        if mask & selectors.EVENT_WRITE:
+            self.flush(conn)
+        if not mask & selectors.EVENT_READ or conn.sock not in self.clients:
+            return
+        try:
+            data = conn.sock.recv(65536)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b''
+        if not data:
+            self.drop(conn)
+            return
+
+        lines = (conn.inbox + data).split(b'\n')
+        conn.inbox = lines.pop()
+        for line in lines:
+            reply = self.execute(conn, line)
+            if reply is not None:
+                conn.outbox += json.dumps(reply, ensure_ascii=False).encode('utf-8') + b'\n'
+        self.flush(conn)
+
+    def execute(self, conn: ControlConnection, line: bytes) -> Optional[Dict]:
+        """Ejecutar una línea del protocolo y armar la respuesta"""
+        line = line.strip()
+        if not line:
+            return None
+        request_id = None
+        try:
+            if line.startswith(b'{'):
+                message = json.loads(line)
+                request_id = message.get('request_id')
+                args = list(message['command'])
+            else:
+                # Texto: el comando y, si hay, el resto de la línea como argumento
+                args = line.decode('utf-8').split(None, 1)
+            handler = self.handlers.get(args[0])
+            if handler is None:
+                raise ValueError(f'comando desconocido: {args[0]}')
+            reply = {'request_id': request_id, 'error': 'success', 'data': handler(conn, *args[1:])}
+        except (ValueError, TypeError, KeyError, IndexError, AttributeError, MpvIPCError, OSError) as e:
+            # Un fallo de mpv o del disco se responde como error: el daemon sigue atendiendo
+            reply = {'request_id': request_id, 'error': str(e) or type(e).__name__}
+        return reply
+
+    def flush(self, conn: ControlConnection):
+        """Enviar lo pendiente sin bloquear; esperar a EVENT_WRITE si no entra todo"""
+        if conn.outbox:
+            try:
+                sent = conn.sock.send(conn.outbox)
+                del conn.outbox[:sent]
+            except (BlockingIOError, InterruptedError):
+                pass
+            except OSError:
+                self.drop(conn)
+                return
+        if len(conn.outbox) > self.MAX_OUTBOX:
+            self.drop(conn)
+            return
+
+        writing = bool(conn.outbox)
+        if writing != conn.writing:
+            conn.writing = writing
+            events = selectors.EVENT_READ | (selectors.EVENT_WRITE if writing else 0)
+            self.selector.modify(conn.sock, events, self.selector.get_key(conn.sock).data)
+
+    def drop(self, conn: ControlConnection):
+        if self.clients.pop(conn.sock, None) is None:
+            return
+        try:
+            self.selector.unregister(conn.sock)
+        except (KeyError, ValueError):
+            pass
+        conn.sock.close()
+
+    def broadcast(self, message: Dict):
+        """Mandar un evento a los clientes suscritos"""
+        data = json.dumps(message, ensure_ascii=False).encode('utf-8') + b'\n'
+        for conn in list(self.clients.values()):
+            if conn.subscribed:
+                conn.outbox += data
+                self.flush(conn)
+
+    def status(self) -> Dict:
+        playing = self.playing_url is not None
+        return {
+            'playing': playing,
+            'station': self.station,
+            'url': self.playing_url,
+            'title': self.track.title(self.playing_url) if playing else "",
+            'buffering': playing and (self.track.buffering or self.track.core_idle),
+            'volume': self.volume,
+            'stations': len(self.radios),
+            'recording': sorted(self.recorder.recordings),
+        }
+
+    def changed(self):
+        """Avisar el nuevo estado a los suscriptores (una vez por vuelta del bucle)"""
+        self.schedule('status', 0.0, lambda: self.broadcast({'event': 'status', 'data': self.status()}))
+
+    def on_mpv_event(self, engine: MpvEngine, event: Dict):
+        self.post(lambda: self.handle_mpv_event(event))
+
+    def handle_mpv_event(self, event: Dict):
+        name = event.get('event')
+        if name == 'shutdown':
+            # mpv terminó: se relanza con el próximo play
+            self.playing_url = None
+            self.station = ""
+            self.track.reset()
+            self.buffering.stopped()
+        elif self.track.update(event):
+            self.buffering.update(event, self.track)
+        elif name != 'end-file':
+            return
+        self.broadcast(event)
+        self.changed()
+
+    def find(self, query: str) -> int:
+        """Posición de una estación por número (desde 1), título exacto o búsqueda"""
+        query = query.strip()
+        if query.isdigit():
+            position = int(query) - 1
+            if not 0 <= position < len(self.radios):
+                raise IndexError(f'no existe la estación {query}')
+            return position
+
+        results = self.index.search(query)
+        results.ensure(StationIndex.TOP_K)
+        if not len(results):
+            raise ValueError(f'no se encontró "{query}"')
+        wanted = normalize_text(query)
+        for station_id in results.ids[:StationIndex.TOP_K]:
+            if normalize_text(self.radios.title(station_id)) == wanted:
+                return station_id
+        return results.ids[0]
+
+    def start(self, title: str, url: str) -> Dict:
+        self.engine.play(url, self.buffering.options(url))
+        self.buffering.started(url)
+        self.schedule('buffer', BufferProfiles.SAMPLE_INTERVAL, self.sample_buffer)
+        self.station = title
+        self.playing_url = url
+        self.track.reset()
+        self.changed()
+        return self.status()
+
+    def command_status(self, conn: ControlConnection) -> Dict:
+        return self.status()
+
+    def command_play(self, conn: ControlConnection, station) -> Dict:
+        position = self.find(str(station))
+        return self.start(self.radios.title(position), self.radios.url(position))
+
+    def command_play_url(self, conn: ControlConnection, url: str) -> Dict:
+        return self.start(self.title_for(url), url)
+
+    def title_for(self, url: str) -> str:
+        """Título en el catálogo de una URL (la URL misma si no está)"""
+        if self._by_url is None:
+            self._by_url = {self.radios.url(i): i for i in range(len(self.radios))}
+        position = self._by_url.get(url)
+        return self.radios.title(position) if position is not None else url
+
+    def sample_buffer(self):
+        if self.buffering.poll(self.engine):
+            self.schedule('buffer', BufferProfiles.SAMPLE_INTERVAL, self.sample_buffer)
+
+    def command_stop(self, conn: ControlConnection) -> Dict:
+        self.engine.stop()
+        self.buffering.stopped()
+        self.playing_url = None
+        self.station = ""
+        self.track.reset()
+        self.changed()
+        return self.status()
+
+    def command_volume(self, conn: ControlConnection, level) -> Dict:
+        """Volumen absoluto (60) o relativo ("+10", "-10")"""
+        text = str(level).strip()
+        volume = self.volume + int(text) if text[:1] in '+-' else int(text)
+        self.volume = max(0, min(100, volume))
+        # Muchos cambios seguidos se mandan a mpv como uno solo
+        self.schedule('volume', 0.0, lambda: self.engine.set_volume(self.volume))
+        self.changed()
+        return self.status()
+
+    def command_search(self, conn: ControlConnection, query: str, limit=10) -> List[Dict]:
+        results = self.index.search(str(query))
+        results.ensure(int(limit))
+        return [{'index': station_id + 1, 'title': self.radios.title(station_id), 'url': self.radios.url(station_id)}
+                for station_id in results.ids[:int(limit)]]
+
+    def command_record(self, conn: ControlConnection, station, minutes=None) -> List[Dict]:
+        """Grabar por número, título o búsqueda; sin minutos, hasta detenerla"""
+        position = self.find(str(station))
+        return self.record(self.radios.title(position), self.radios.url(position), minutes)
+
+    def command_record_url(self, conn: ControlConnection, url: str, minutes=None) -> List[Dict]:
+        return self.record(self.title_for(url), url, minutes)
+
+    def record(self, title: str, url: str, minutes) -> List[Dict]:
+        until = time.time() + float(minutes) * 60 if minutes else None
+        self.recorder.start(url, title, until)
+        return self.recorder.listing()
+
+    def command_record_stop(self, conn: ControlConnection, station) -> List[Dict]:
+        """Terminar una grabación, por su URL o como se busca en play"""
+        station = str(station)
+        if not self.recorder.stop(station) and not self.recorder.stop(self.radios.url(self.find(station))):
+            raise ValueError(f'no se está grabando "{station}"')
+        return self.recorder.listing()
+
+    def command_recordings(self, conn: ControlConnection) -> List[Dict]:
+        return self.recorder.listing()
+
+    def check_schedule(self):
+        """Empezar las grabaciones programadas cuyas ventanas se abrieron (a cada minuto)"""
+        error = self.recording_schedule.refresh()
+        if error:
+            print(f"Error: {error}")
+        if self.recording_schedule.directory:
+            self.recorder.directory = self.recording_schedule.directory
+        now = time.time()
+        self.scheduled = {window for window in self.scheduled if window[2] > now}
+        for window in self.recording_schedule.due(now):
+            if window in self.scheduled:
+                continue  # Ya empezó (aunque después se haya detenido a mano)
+            self.scheduled.add(window)
+            station, url, end = window
+            try:
+                if url is None:
+                    position = self.find(str(station))
+                    station, url = self.radios.title(position), self.radios.url(position)
+                self.recorder.start(url, station or self.title_for(url), end)
+            except (ValueError, IndexError) as e:
+                print(f"Error: grabación programada de {station or url}: {e}")
+        self.schedule('recordings', 60 - now % 60, self.check_schedule)
+
+    def command_subscribe(self, conn: ControlConnection) -> Dict:
+        conn.subscribed = True
+        return self.status()
+
+    def command_quit(self, conn: ControlConnection):
+        self.running = False
+
+
+class DaemonEngine:
+    """Motor que delega en el daemon: la interfaz conectada no lanza mpv
+
+    Ofrece la misma interfaz que MpvEngine. Los eventos de mpv que reenvía el
+    daemon llegan al listener igual que los de un mpv propio, más los eventos
+    `status` cuando otro cliente cambia la reproducción. La conexión no
+    bloquea el bucle de la interfaz: si el daemon no corre se lanza y se
+    reintenta con un temporizador, los comandos esperan en cola y el socket
+    se lee desde el selector del bucle.
+    """
+
+    START_TIMEOUT = 10.0  # Lo que puede tardar el daemon en abrir el socket
+    RETRY_INTERVAL = 0.05
+
+    def __init__(self, socket_path: str, volume: int = 50, loop: Optional['EventLoop'] = None):
+        self.socket_path = socket_path
+        self.volume = volume
+        self.loop = loop
+        self.ipc = MpvIPC(socket_path, on_event=self._on_event)
+        self.current_url = None
+        self.listener = None
+        self.observed = []
+        self.queued = []  # Comandos pedidos antes de conectarse
+        self.deadline = None  # Conectándose hasta este momento (None: no se está conectando)
+        self.launched = False  # Ya se lanzó el daemon en este intento
+
+    def _on_event(self, event: Dict):
+        listener = self.listener
+        if listener is not None:
+            listener(self, event)
+
+    @property
+    def pid(self) -> Optional[int]:
+        return None
+
+    def alive(self) -> bool:
+        return self.ipc.connected
+
+    def start(self):
+        """Empezar a conectarse al daemon (lanzándolo si no corre) sin esperar"""
+        if self.alive() or self.deadline is not None:
+            return
+        self.ipc.reset()
+        self.deadline = time.monotonic() + self.START_TIMEOUT
+        self.launched = False
+        self.attempt()
+
+    def attempt(self):
+        """Un intento de conexión: un socket Unix conecta o falla en el acto"""
+        if self.deadline is None:
+            return
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.setblocking(False)
+        code = sock.connect_ex(self.socket_path)
+        if code:
+            sock.close()
+            if not self.launched and code in (errno.ENOENT, errno.ECONNREFUSED):
+                self.launched = True
+                try:
+                    launch_daemon(self.socket_path)
+                except OSError:
+                    self.deadline = 0.0
+            if time.monotonic() >= self.deadline:
+                self.deadline = None
+                self.queued = []
+                self._on_event({'event': 'shutdown'})  # Como si mpv hubiera terminado
+            else:
+                self.loop.schedule('daemon', self.RETRY_INTERVAL, self.attempt)
+            return
+
+        self.deadline = None
+        self.ipc.attach(sock, self.loop.selector)
+        self.ipc.send('subscribe', callback=self.subscribed)
+        queued, self.queued = self.queued, []
+        for args in queued:
+            self.ipc.send(*args)
+
+    def subscribed(self, reply: Dict):
+        if reply.get('error') == 'success':
+            self._on_event({'event': 'status', 'data': reply.get('data') or {}})
+
+    def send(self, *args):
+        """Mandar un comando; si todavía no hay conexión queda en cola hasta que la haya"""
+        if self.alive():
+            self.ipc.send(*args)
+        else:
+            self.queued.append(args)
+            self.start()
+
+    def play(self, url: str, options: Optional[Dict] = None):
+        self.send('play-url', url)  # El daemon aplica sus propios perfiles de buffer
+        self.current_url = url
+
+    def stop(self):
+        self.current_url = None
+        if self.alive() or self.deadline is not None:
+            self.send('stop')
+
+    def set_volume(self, volume: int):
+        self.volume = volume
+        if self.alive() or self.deadline is not None:
+            self.send('volume', volume)
+
+    def set_mute(self, muted: bool):
+        pass  # Sin motores de reserva no hace falta silenciar
+
+    def record(self, url: str, enabled: bool):
+        """Empezar o terminar una grabación en el daemon (sigue aunque la interfaz se cierre)"""
+        self.send('record-url' if enabled else 'record-stop', url)
+
+    def observe(self, names: List[str]):
+        self.observed = list(names)  # El daemon ya observa las propiedades de reproducción
+
+    def unobserve(self):
+        self.observed = []
+
+    def shutdown(self):
+        """Desconectarse; el daemon sigue sonando"""
+        self.deadline = None
+        self.queued = []
+        if self.loop is not None:
+            self.loop.cancel('daemon')
+        self.ipc.close()
+        self.current_url = None
+
+
+def format_status(status: Dict) -> str:
+    """Estado del daemon en una línea (para barras de estado)"""
+    recording = f" · ● {len(status['recording'])} grabando" if status.get('recording') else ""
+    if not status.get('playing'):
+        return f"⏸ Detenido · vol {status.get('volume', 0)}%{recording}"
+    icon = "⏳" if status.get('buffering') else "▶"
+    title = f" — {status['title']}" if status.get('title') else ""
+    return f"{icon} {status.get('station', '')}{title} · vol {status.get('volume', 0)}%{recording}"
+
+
+def format_recording(recording: Dict) -> str:
+    """Una grabación en una línea: estación, tamaño, hasta cuándo y archivo actual"""
+    until = time.strftime(" hasta %H:%M", time.localtime(recording['until'])) if recording.get('until') else ""
+    problem = f" ({recording['error']})" if recording['state'] in ('waiting', 'error') else ""
+    return (f"● {recording['station']} · {recording['bytes'] / 1e6:.1f} MB{until}{problem}"
+            f" → {recording.get('file') or '-'}")
+
+
+def run_client(args) -> int:
+    """Comandos de una línea contra el daemon: play, stop, status, volume, search, record, events, quit"""
+    autostart = args.command in ('play', 'volume', 'search', 'record')
+    if not connect_daemon(args.socket, autostart):
+        print("El daemon no está corriendo (iniciarlo con: ./radio.py daemon)")
+        return 1
+
+    show = (lambda data: json.dumps(data, ensure_ascii=False)) if args.json else format_status
+    if args.command == 'events':
+        # Imprimir el estado cada vez que cambia, hasta Ctrl+C o que el daemon termine
+        finished = threading.Event()
+        shown = [None]
+
+        def on_event(event: Dict):
+            if event.get('event') == 'shutdown':
+                finished.set()
+            elif args.json:
+                print(show(event), flush=True)
+            elif event.get('event') == 'status' and show(event['data']) != shown[0]:
+                shown[0] = show(event['data'])
+                print(shown[0], flush=True)
+
+        ipc = MpvIPC(args.socket, on_event=on_event)
+        try:
+            shown[0] = show(ipc.command('subscribe'))
+            print(shown[0], flush=True)
+            finished.wait()
+        except KeyboardInterrupt:
+            pass
+        except MpvIPCError as e:
+            print(f"Error: {e}")
+            return 1
+        finally:
+            ipc.close()
+        return 0
+
+    if args.command == 'play':
+        command = ['play', ' '.join(args.station)]
+    elif args.command == 'volume':
+        command = ['volume', args.level]
+    elif args.command == 'search':
+        command = ['search', ' '.join(args.query), args.limit]
+    elif args.command == 'record':
+        station = ' '.join(args.station)
+        command = ['record-stop', station] if args.stop else ['record', station, args.minutes]
+    else:
+        command = [args.command]
+
+    ipc = MpvIPC(args.socket)
+    try:
+        result = ipc.command(*command, timeout=5.0)
+    except MpvIPCError as e:
+        print(f"Error: {e}")
+        return 1
+    finally:
+        ipc.close()
+
+    if args.command == 'search' and not args.json:
+        for station in result:
+            print(f"{station['index']:>6}  {station['title']}")
+    elif args.command in ('record', 'recordings') and not args.json:
+        for recording in result:
+            print(format_recording(recording))
+        if not result:
+            print("No hay grabaciones en curso")
+    elif result is not None:
+        print(show(result))
+    return 0
+
+
+def check_stations(radio: RadioCLI, concurrency: int) -> int:
+    """Modo --check: sondear todas las estaciones y mostrar un resumen"""
+    prober = StreamProber(radio.health, concurrency=concurrency)
+    titles = {}
+    for station in radio.radios:
+        titles.setdefault(station.url, station.title)
+    
+    started = time.monotonic()
+    done = [0]
+    
+    def progress(result: ProbeResult):
+        done[0] += 1
+        print(f"\r  Sondeando {done[0]}/{len(titles)}...", end="", file=sys.stderr, flush=True)
+    
+    results = prober.run(list(titles), progress)
+    radio.health.save()
+    elapsed = time.monotonic() - started
+    print("\r" + " " * 40 + "\r", end="", file=sys.stderr)
+    
+    # Vivas primero, ordenadas por tiempo hasta el primer byte
+    results.sort(key=lambda r: (not r.ok, r.ttfb_ms or 0))
+    for result in results:
+        if result.ok:
+            bitrate = f"{result.bitrate}kbps" if result.bitrate else ""
+            print(f"✓ {result.ttfb_ms:7.0f}ms {bitrate:>8} {result.codec or '':6} {titles[result.url]}")
+        else:
+            print(f"✗ {'':9} {'':8} {'':6} {titles[result.url]} ({result.error})")
+    
+    alive = sum(1 for result in results if result.ok)
+    print(f"\n{alive} de {len(results)} estaciones responden ({elapsed:.1f}s)")
+    return 0 if alive else 1
+
+
 def main():
     """Función principal"""
-    # Verificar dependencias
-    try:
-        subprocess.run(['mpv', '--version'], capture_output=True, check=True)
-    except (subprocess.CalledProcessError, FileNotFoundError):
+    profile = StartupProfile()
+    parser = argparse.ArgumentParser(description="Reproductor de radio en línea de comandos")
+    parser.add_argument('--check', action='store_true',
+                        help="sondear todas las estaciones y mostrar su estado, sin interfaz")
+    parser.add_argument('--concurrency', type=int, default=StreamProber.CONCURRENCY,
+                        help="conexiones simultáneas al sondear (por defecto %(default)s)")
+    parser.add_argument('--startup-profile', action='store_true',
+                        help="medir cada fase del arranque hasta el primer cuadro y salir")
+    parser.add_argument('--catalog', metavar='ARCHIVO', default=None,
+                        help="catálogo JSON o importado (por defecto el de `import` si existe, si no radios.json)")
+    parser.add_argument('--metrics', metavar='ARCHIVO', default=None,
+                        help="medir latencias y exportarlas: JSONL (se agrega al final) o textfile de Prometheus si termina en .prom")
+    parser.add_argument('--timeshift', type=float, default=0, metavar='MINUTOS',
+                        help="Enter pausa en diferido: guardar hasta MINUTOS del vivo en un anillo en disco")
+    parser.add_argument('--attach', action='store_true',
+                        help="usar la interfaz como cliente del daemon (lo lanza si no corre)")
+    parser.add_argument('--socket', default=None,
+                        help="socket de control del daemon (por defecto $XDG_RUNTIME_DIR/radio-cli/daemon.sock)")
+    parser.add_argument('--json', action='store_true',
+                        help="respuestas de los comandos en JSON")
+    
+    # Daemon y comandos de una línea para controlarlo
+    commands = parser.add_subparsers(dest='command', metavar='COMANDO')
+    commands.add_parser('daemon', help="servir el reproductor sin interfaz en el socket de control")
+    play = commands.add_parser('play', help="reproducir por número, título o búsqueda")
+    play.add_argument('station', nargs='+')
+    commands.add_parser('stop', help="detener la reproducción")
+    commands.add_parser('status', help="mostrar qué suena")
+    volume = commands.add_parser('volume', help="volumen absoluto (60) o relativo (+10, -10)")
+    volume.add_argument('level')
+    search = commands.add_parser('search', help="buscar estaciones en el catálogo del daemon")
+    search.add_argument('query', nargs='+')
+    search.add_argument('--limit', type=int, default=10)
+    record = commands.add_parser('record', help="grabar una estación en el daemon, aunque suene otra")
+    record.add_argument('station', nargs='+')
+    record.add_argument('--minutes', type=float, default=None,
+                        help="duración de la grabación (por defecto hasta detenerla)")
+    record.add_argument('--stop', action='store_true', help="dejar de grabarla")
+    commands.add_parser('recordings', help="listar las grabaciones en curso")
+    commands.add_parser('events', help="seguir los cambios de estado")
+    commands.add_parser('quit', help="cerrar el daemon")
+    importing = commands.add_parser('import', help="unir catálogos JSON/CSV, listas M3U/PLS y directorios")
+    importing.add_argument('sources', nargs='+', metavar='FUENTE')
+    importing.add_argument('--output', default=None,
+                           help="catálogo a escribir (por defecto ~/.local/share/radio-cli/catalog.bin)")
+    args = parser.parse_args()
+    profile.mark('argumentos')
+    args.socket = args.socket or daemon_socket_path()
+    
+    if args.command == 'import':
+        sys.exit(run_import(args))
+    catalog = args.catalog or default_catalog()
+    if args.command == 'daemon':
+        sys.exit(RadioDaemon(args.socket, catalog).serve())
+    if args.command:
+        sys.exit(run_client(args))
+    
+    if args.check:
+        radio = RadioCLI()
+        if not radio.load_radios(catalog):
+            sys.exit(1)
+        sys.exit(check_stations(radio, args.concurrency))
+    
+    # Crear y ejecutar aplicación (mpv se comprueba al reproducir)
+    radio = RadioCLI(attach=args.socket if args.attach else None)
+    if args.startup_profile:
+        profile.mark('RadioCLI()')
+        radio.profile = profile
+    if args.metrics:
+        radio.metrics = Metrics(args.metrics)
+    if args.timeshift > 0 and not args.attach:
+        radio.timeshift = TimeShift(radio, args.timeshift, on_change=radio.timeshift_changed)
+        radio.standby = StandbyPool(size=0)  # mpv escucha el anillo local: no hay qué precargar
+    radio.run(catalog)
+    
+    if radio.load_error:
+        print(radio.load_error)
+        print(f"Error: No se pudo cargar el archivo {catalog}")
+        sys.exit(1)
+    if radio.mpv_path == '' and not radio.attached:
         print("Error: mpv no está instalado. Instálalo primero.")
         print("Ubuntu/Debian: sudo apt install mpv")
         print("Fedora/RHEL: sudo dnf install mpv")
         print("Arch: sudo pacman -S mpv")
-        sys.exit(1)
-    
-    # Crear y ejecutar aplicación
-    radio = RadioCLI()
-    if radio.load_radios():
-        radio.run()
-    else:
-        print("Error: No se pudo cargar el archivo radios.json")
-        sys.exit(1)
+    if radio.profile:
+        print(radio.profile.report())
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,132 @@
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def audio(size: int, start: int = 0) -> bytes:
+    """Audio de prueba reconocible: la posición en el stream módulo 251"""
+    return bytes((start + i) % 251 for i in range(size))
+
+
+def icy_block(title) -> bytes:
+    """Bloque de metadatos ICY con su byte de largo (None: bloque vacío)"""
+    if title is None:
+        return b'\0'
+    data = f"StreamTitle='{title}';".encode('utf-8')
+    data += b'\0' * (-len(data) % 16)
+    return bytes([len(data) // 16]) + data
+
+
+def icy_stream(titles, metaint: int = 1000, hold: bool = False):
+    """Ruta que manda un bloque de audio por título (con metadatos si se piden)
+
+    Devuelve el audio enviado para comparar con lo grabado. Con `hold` la
+    conexión queda abierta al terminar, como un stream en vivo.
+    """
+    def route(conn, request, events):
+        icy = b'icy-metadata: 1' in request.lower()
+        head = b'ICY 200 OK\r\nContent-Type: audio/mpeg\r\nicy-br: 128\r\nicy-name: Prueba\r\n'
+        if icy:
+            head += b'icy-metaint: %d\r\n' % metaint
+        conn.sendall(head + b'\r\n')
+        for number, title in enumerate(titles):
+            chunk = audio(metaint, number * metaint)
+            conn.sendall(chunk + icy_block(title) if icy else chunk)
+        if hold:
+            events.wait(10)
+    return route
+
+
+def respond(data: bytes):
+    return lambda conn, request, events: conn.sendall(data)
+
+
+def stall(conn, request, events):
+    events.wait(10)
+
+
+class Icecast(socketserver.ThreadingTCPServer):
+    """Servidor HTTP/ICY local: cada ruta es una función (socket, petición, evento)"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), Handler)
+        self.routes = {}
+        self.requests = []  # Rutas pedidas, en orden
+        self.closing = threading.Event()
+
+    def url(self, path: str) -> str:
+        return f'http://127.0.0.1:{self.server_address[1]}{path}'
+
+
+class Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        request = b''
+        while b'\r\n\r\n' not in request:
+            data = self.request.recv(4096)
+            if not data:
+                return
+            request += data
+        path = request.split(b' ')[1].decode()
+        self.server.requests.append(path)
+        route = self.server.routes.get(path, respond(b'HTTP/1.0 404 Not Found\r\n\r\n'))
+        try:
+            route(self.request, request, self.server.closing)
+        except OSError:
+            pass
+        try:
+            self.request.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+@pytest.fixture
+def icecast():
+    server = Icecast()
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.closing.set()
+    server.shutdown()
+    server.server_close()
+
+
+class FakeMpv:
+    """Registro de los procesos lanzados por el mpv de prueba"""
+
+    def __init__(self, log: str):
+        self.log = log
+
+    def entries(self) -> list:
+        try:
+            with open(self.log, encoding='utf-8') as f:
+                return [json.loads(line) for line in f]
+        except FileNotFoundError:
+            return []
+
+    def args(self, pid: int) -> list:
+        return next(entry['args'] for entry in self.entries() if entry['pid'] == pid and 'args' in entry)
+
+
+@pytest.fixture
+def fake_mpv(tmp_path, monkeypatch):
+    """Pone primero en PATH un `mpv` que ejecuta tests/fake_mpv.py"""
+    bin_dir = tmp_path / 'bin'
+    bin_dir.mkdir()
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fake_mpv.py')
+    wrapper = bin_dir / 'mpv'
+    wrapper.write_text(f'#!/bin/sh\nexec {sys.executable} {script} "$@"\n')
+    wrapper.chmod(0o755)
+    monkeypatch.setenv('PATH', str(bin_dir) + os.pathsep + os.environ.get('PATH', ''))
+    monkeypatch.setenv('FAKE_MPV_LOG', str(tmp_path / 'mpv.log'))
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'cache'))
+    return FakeMpv(str(tmp_path / 'mpv.log'))
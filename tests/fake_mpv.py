@@ -0,0 +1,68 @@
+"""mpv de prueba: atiende el IPC JSON y guarda sus argumentos y comandos
+
+Se lanza a través del `mpv` que el fixture `fake_mpv` pone primero en PATH.
+Cada proceso anota una línea JSON por evento en el archivo FAKE_MPV_LOG.
+"""
+import json
+import os
+import socket
+import sys
+import threading
+
+
+def log(entry):
+    with open(os.environ['FAKE_MPV_LOG'], 'a', encoding='utf-8') as f:
+        f.write(json.dumps(entry) + '\n')
+
+
+def serve(conn, properties, done):
+    for line in conn.makefile('rb'):
+        message = json.loads(line)
+        command = message['command']
+        log({'pid': os.getpid(), 'command': command})
+        reply = {'request_id': message.get('request_id'), 'error': 'success'}
+        if command[0] == 'get_property':
+            if command[1] in properties:
+                reply['data'] = properties[command[1]]
+            else:
+                reply['error'] = 'property unavailable'
+        elif command[0] == 'set_property':
+            properties[command[1]] = command[2]
+        elif command[0] == 'loadfile':
+            properties['path'] = command[1]
+        elif command[0] == 'stop':
+            properties.pop('path', None)
+        try:
+            conn.sendall(json.dumps(reply).encode() + b'\n')
+        except OSError:
+            return
+        if command[0] == 'quit':
+            done.set()
+            return
+
+
+def main(args):
+    if '--version' in args:
+        print('mpv 0.0.0 (prueba)')
+        return
+    options = dict(arg[2:].split('=', 1) for arg in args if arg.startswith('--') and '=' in arg)
+    log({'pid': os.getpid(), 'args': args})
+    properties = {'volume': int(options.get('volume', 100)), 'mute': options.get('mute') == 'yes',
+                  'pause': False, 'core-idle': True}
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(options['input-ipc-server'])
+    server.listen(4)
+    done = threading.Event()
+
+    def accept():
+        while True:
+            conn, _ = server.accept()
+            threading.Thread(target=serve, args=(conn, properties, done), daemon=True).start()
+
+    threading.Thread(target=accept, daemon=True).start()
+    done.wait()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,50 @@
+import types
+
+import benchmark
+
+
+def args(tmp_path, **extra):
+    return types.SimpleNamespace(sizes=(1000,), repeat=1, rows=24, cols=80, workdir=str(tmp_path), **extra)
+
+
+def test_percentiles():
+    samples = [n / 1000 for n in range(1, 101)]  # 1..100 ms
+    stats = benchmark.summarize(samples)
+    assert (stats['n'], stats['p50'], stats['p90'], stats['p99'], stats['max']) == (100, 50, 90, 99, 100)
+    assert benchmark.percentile([7.0], 0.99) == 7.0
+
+
+def test_compare_counts_p50_regressions(tmp_path, capsys):
+    base = benchmark.Report()
+    base.add('rápido', [0.001] * 10)
+    base.add('lento', [0.001] * 10)
+    base.save(str(tmp_path / 'base.json'), args(tmp_path))
+
+    report = benchmark.Report()
+    report.add('rápido', [0.00105] * 10)  # +5%: dentro del umbral
+    report.add('lento', [0.002] * 10)
+    report.add('nuevo', [0.002] * 10)  # Sin línea base: no cuenta
+    assert report.compare(str(tmp_path / 'base.json'), 15.0) == 1
+    assert '▲' in capsys.readouterr().out
+
+
+def test_missed_target_is_reported():
+    report = benchmark.Report()
+    report.add('tecla', [0.001] * 98 + [0.009] * 2, target=5.0)
+    report.add('otra', [0.001] * 100, target=5.0)
+    assert report.missed == ['tecla']
+
+
+def test_synthetic_catalog_is_reproducible():
+    assert benchmark.synthetic_records(50) == benchmark.synthetic_records(50)
+    assert len({record['url'] for record in benchmark.synthetic_records(1000)}) == 1000
+
+
+def test_cases_run_without_terminal_or_mpv(tmp_path, monkeypatch):
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'cache'))
+    monkeypatch.setenv('XDG_DATA_HOME', str(tmp_path / 'data'))
+    report = benchmark.Report()
+    for case in (benchmark.bench_render, benchmark.bench_search, benchmark.bench_load, benchmark.bench_ipc):
+        case(report, args(tmp_path))
+    assert {'render/sin cambios', 'search/tecla/1000', 'load/caliente/1000', 'ipc/volumen'} <= set(report.results)
+    assert report.results['render/sin cambios']['bytes'] == 0
@@ -0,0 +1,77 @@
+import json
+
+from radio import BufferProfiles, HealthCache, NowPlaying, ProbeResult
+
+URL = 'http://a/radio'
+
+
+def listen(profiles, *buffering, warm=True):
+    """Una escucha que empieza a sonar y pasa por los cortes indicados"""
+    track = NowPlaying()
+    profiles.started(URL, warm=warm)
+    for name, value in [('core-idle', False)] + [('paused-for-cache', value) for value in buffering]:
+        event = {'event': 'property-change', 'name': name, 'data': value}
+        track.update(event)
+        profiles.update(event, track)
+    profiles.stopped()
+
+
+def test_unknown_station_uses_the_default_level(tmp_path):
+    profiles = BufferProfiles(path=str(tmp_path / 'buffering.json'))
+    options = profiles.options(URL)
+    assert options['cache-secs'] == BufferProfiles.LEVELS[BufferProfiles.DEFAULT_LEVEL][0]
+    assert options['demuxer-max-back-bytes'] == 0
+    assert profiles.options('/musica/tema.mp3') is None  # Archivo local: lo que diga mpv
+
+
+def test_max_bytes_follow_the_probed_bitrate(tmp_path):
+    health = HealthCache(str(tmp_path / 'health.json'))
+    health.put(ProbeResult.from_dict(URL, {'ok': True, 'bitrate': 1411}))
+    profiles = BufferProfiles(health, path=str(tmp_path / 'buffering.json'))
+    assert profiles.options(URL)['demuxer-max-bytes'] == int(10 * 1411 * 1000 / 8 * 2)
+    assert profiles.options('http://b/radio')['demuxer-max-bytes'] == int(10 * BufferProfiles.DEFAULT_KBPS * 1000 / 8 * 2)
+
+    health.put(ProbeResult.from_dict('http://c/radio', {'ok': True, 'bitrate': 32}))
+    assert profiles.options('http://c/radio')['demuxer-max-bytes'] == BufferProfiles.MIN_BYTES
+
+
+def test_rebuffer_raises_the_level_up_to_the_top(tmp_path):
+    profiles = BufferProfiles(path=str(tmp_path / 'buffering.json'))
+    listen(profiles, True, False, True, False)
+    assert profiles.level(URL) == 2 and profiles._entries[URL]['rebuffers'] == 2
+    assert profiles.options(URL)['cache-pause-initial'] is True
+    for _ in range(5):
+        listen(profiles, True)
+    assert profiles.level(URL) == len(BufferProfiles.LEVELS) - 1
+
+
+def test_stable_plays_lower_the_level(tmp_path):
+    profiles = BufferProfiles(path=str(tmp_path / 'buffering.json'))
+    profiles.STABLE_SECS = 0
+    for _ in range(BufferProfiles.STABLE_PLAYS - 1):
+        listen(profiles)
+    assert profiles.level(URL) == BufferProfiles.DEFAULT_LEVEL
+    listen(profiles)
+    assert profiles.level(URL) == BufferProfiles.DEFAULT_LEVEL - 1
+
+    # Un corte reinicia la cuenta de escuchas estables
+    listen(profiles, True)
+    listen(profiles)
+    assert profiles.level(URL) == BufferProfiles.DEFAULT_LEVEL and profiles._entries[URL]['stable'] == 1
+
+
+def test_events_before_start_file_are_ignored(tmp_path):
+    profiles = BufferProfiles(path=str(tmp_path / 'buffering.json'))
+    listen(profiles, True, warm=False)  # Los cortes eran del stream anterior
+    assert profiles.level(URL) == BufferProfiles.DEFAULT_LEVEL and not profiles._dirty
+
+
+def test_profiles_persist(tmp_path):
+    path = tmp_path / 'buffering.json'
+    profiles = BufferProfiles(path=str(path))
+    profiles.save()
+    assert not path.exists()  # Sin cambios no escribe
+    listen(profiles, True)
+    profiles.save()
+    assert json.loads(path.read_text())[URL]['level'] == 2
+    assert BufferProfiles(path=str(path)).level(URL) == 2
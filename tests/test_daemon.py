@@ -0,0 +1,161 @@
+import json
+import socket
+import threading
+import time
+
+import pytest
+
+import radio
+from radio import RadioCLI, Station
+
+
+class FakeDaemon:
+    """Socket de control que responde como el daemon y anota los comandos"""
+
+    def __init__(self, path: str):
+        self.commands = []
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(path)
+        self.server.listen(8)
+        threading.Thread(target=self.accept, daemon=True).start()
+
+    def accept(self):
+        while True:
+            try:
+                sock, _ = self.server.accept()
+            except OSError:
+                return
+            threading.Thread(target=self.serve, args=(sock,), daemon=True).start()
+
+    def serve(self, sock: socket.socket):
+        try:
+            for line in sock.makefile('rb'):
+                message = json.loads(line)
+                self.commands.append(message['command'])
+                data = {'playing': False, 'volume': 50, 'recording': []}
+                reply = {'request_id': message.get('request_id'), 'error': 'success', 'data': data}
+                sock.sendall(json.dumps(reply).encode() + b'\n')
+        except OSError:
+            pass
+
+    def wait_for(self, name: str, timeout: float = 3.0) -> list:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            for command in self.commands:
+                if command[0] == name:
+                    return command
+            time.sleep(0.01)
+        raise AssertionError(f'no llegó {name}: {self.commands}')
+
+    def close(self):
+        self.server.close()
+
+
+@pytest.fixture
+def cli(tmp_path, monkeypatch):
+    monkeypatch.setenv('XDG_DATA_HOME', str(tmp_path / 'data'))
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'cache'))
+    cli = RadioCLI(attach=str(tmp_path / 'daemon.sock'))
+    cli.open_loop()
+    yield cli
+    cli.engine.shutdown()
+    cli.background.stop()
+    cli.close_loop()
+
+
+@pytest.fixture
+def attached(cli):
+    daemon = FakeDaemon(cli.engine.socket_path)
+    yield cli, daemon
+    daemon.close()
+
+
+def run_until(loop, condition, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'se agotó el tiempo de espera'
+        loop.schedule('test-tick', 0.02, lambda: None)
+        loop.poll()
+
+
+def test_attached_play_sends_catalog_url(attached):
+    cli, daemon = attached
+    cli.resolver.lookup = lambda url: 'http://resuelto.example/stream'
+    cli.start_station(Station('Radio', 'http://catalogo.example/radio.pls'))
+    assert daemon.wait_for('play-url') == ['play-url', 'http://catalogo.example/radio.pls']
+
+
+def test_missing_daemon_does_not_block_the_interface(cli, monkeypatch):
+    launched = []
+    monkeypatch.setattr(radio, 'launch_daemon', launched.append)
+    cli.engine.START_TIMEOUT = 0.3
+    started = time.monotonic()
+    cli.start_station(Station('Radio', 'http://a/radio'))
+    assert time.monotonic() - started < 0.1
+    assert cli.playing and cli.engine.queued == [('play-url', 'http://a/radio')]
+
+    run_until(cli, lambda: cli.mpv_died)
+    assert launched == [cli.engine.socket_path]
+    assert not cli.playing and cli.engine.queued == []
+
+
+def test_slow_daemon_gets_the_queued_commands(cli, monkeypatch):
+    daemons = []
+    monkeypatch.setattr(radio, 'launch_daemon', lambda path: threading.Timer(
+        0.3, lambda: daemons.append(FakeDaemon(path))).start())
+    cli.start_station(Station('Radio', 'http://a/radio'))
+    cli.engine.set_volume(70)
+
+    ticks = []
+    cli.schedule('tick', 0.1, lambda: ticks.append(True))
+    run_until(cli, lambda: daemons and len(daemons[0].commands) >= 3)
+    assert ticks  # El bucle siguió atendiendo temporizadores mientras tanto
+    assert daemons[0].commands == [['subscribe'], ['play-url', 'http://a/radio'], ['volume', 70]]
+    assert cli.engine.alive()
+    daemons[0].close()
+
+
+def test_daemon_replies_to_os_errors(tmp_path, monkeypatch):
+    monkeypatch.setenv('XDG_DATA_HOME', str(tmp_path / 'data'))
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'cache'))
+    daemon = radio.RadioDaemon(str(tmp_path / 'daemon.sock'))
+    daemon.open_loop()
+
+    def broken_pipe():
+        raise BrokenPipeError(32, 'Broken pipe')
+
+    monkeypatch.setattr(daemon.engine, 'stop', broken_pipe)
+    conn = radio.ControlConnection(socket.socket(socket.AF_UNIX, socket.SOCK_STREAM))
+    reply = daemon.execute(conn, b'{"command": ["stop"], "request_id": 7}')
+    assert reply == {'request_id': 7, 'error': '[Errno 32] Broken pipe'}
+    conn.sock.close()
+    daemon.recorder.close()
+    daemon.close_loop()
+
+
+def test_attached_ipc_queues_what_does_not_fit(cli):
+    ours, theirs = socket.socketpair()
+    ipc = radio.MpvIPC('sin-socket')
+    ipc.attach(ours, cli.selector)
+    assert not ours.getblocking()
+
+    # Mucho más de lo que entra en el buffer del socket: send no espera al otro lado
+    started = time.monotonic()
+    for number in range(50):
+        ipc.send('echo', number, 'x' * 65536)
+    assert time.monotonic() - started < 0.5
+
+    theirs.setblocking(False)
+    received = bytearray()
+
+    def drained():
+        try:
+            received.extend(theirs.recv(1 << 20))
+        except BlockingIOError:
+            pass
+        return received.count(b'\n') == 50
+
+    run_until(cli, drained)
+    assert [json.loads(line)['command'][1] for line in received.splitlines()] == list(range(50))
+    ipc.close()
+    theirs.close()
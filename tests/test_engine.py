@@ -0,0 +1,58 @@
+import os
+
+import pytest
+
+from radio import MpvEngine, find_mpv
+
+
+def test_start_launches_the_mpv_found_on_path(fake_mpv, tmp_path):
+    engine = MpvEngine(name='prueba')
+    engine.start()
+    try:
+        assert engine.binary == find_mpv() == str(tmp_path / 'bin' / 'mpv')
+        assert fake_mpv.args(engine.pid)[0] == '--idle=yes'
+    finally:
+        engine.shutdown()
+
+
+def test_start_without_mpv(tmp_path, monkeypatch):
+    monkeypatch.setenv('PATH', str(tmp_path))
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'cache'))
+    engine = MpvEngine(name='prueba')
+    with pytest.raises(OSError):
+        engine.start()
+    assert engine.process is None and not os.path.exists(engine.socket_path)
+
+
+def test_one_process_switches_stations_with_loadfile(fake_mpv):
+    engine = MpvEngine(name='prueba')
+    engine.play('http://a/uno')
+    pid = engine.pid
+    engine.play('http://a/dos', {'cache-secs': 5})
+    assert engine.pid == pid and engine.current_url == 'http://a/dos'
+    assert engine.ipc.get_property('path') == 'http://a/dos'
+
+    commands = [entry['command'] for entry in fake_mpv.entries() if 'command' in entry]
+    loads = [command for command in commands if command[0] == 'loadfile']
+    assert loads == [['loadfile', 'http://a/uno', 'replace'], ['loadfile', 'http://a/dos', 'replace']]
+    assert ['set_property', 'cache-secs', 5] in commands
+
+    process = engine.process
+    engine.shutdown()
+    assert process.returncode is not None  # Recogido: no queda un zombi
+    assert not os.path.exists(engine.socket_path)
+
+
+def test_sockets_are_per_instance_and_dead_mpv_is_relaunched(fake_mpv, tmp_path, monkeypatch):
+    monkeypatch.setenv('XDG_RUNTIME_DIR', str(tmp_path))
+    first, second = MpvEngine(name='a'), MpvEngine(name='b')
+    assert first.socket_path != second.socket_path
+    assert first.socket_path.startswith(str(tmp_path / 'radio-cli'))
+
+    first.start()
+    pid = first.pid
+    first.process.kill()
+    first.process.wait()
+    first.play('http://a/uno')
+    assert first.alive() and first.pid != pid
+    first.shutdown()
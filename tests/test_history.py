@@ -0,0 +1,67 @@
+from radio import History
+
+
+def lines(path) -> int:
+    return len(path.read_text().splitlines())
+
+
+def test_log_only_appends_and_close_compacts(tmp_path):
+    path = tmp_path / 'history.jsonl'
+    history = History(str(path))
+    for number in range(History.COMPACT_MIN + 10):
+        history.played(f'http://a/{number % 3}', f'Radio {number % 3}')
+    history.toggle_favorite('http://a/2', 'Radio 2')
+    before = history.ranked()
+    assert history.lines == History.COMPACT_MIN + 11  # Registrar no compacta
+
+    history.close()
+    assert lines(path) == 3
+    again = History(str(path))
+    again.load()
+    assert again.ranked() == before and again.is_favorite('http://a/2')
+
+
+def play(history, url, days_ago, now):
+    history.apply({'time': now - days_ago * 24 * 3600, 'event': 'play', 'title': url[-1], 'url': url})
+
+
+def test_frecency_order_with_favorites_first(tmp_path):
+    history = History(str(tmp_path / 'history.jsonl'))
+    history.loaded = True
+    now = 1_800_000_000
+    play(history, 'http://a/1', 0, now)  # Una reciente
+    for _ in range(3):
+        play(history, 'http://a/2', 42, now)  # Tres de hace seis semanas: pesan 3/8
+    for _ in range(3):
+        play(history, 'http://a/3', 7, now)  # Tres de hace una semana: pesan ~2.1
+    history.apply({'event': 'favorite', 'title': '4', 'url': 'http://a/4'})
+    assert [url for url, _ in history.ranked()] == ['http://a/4', 'http://a/3', 'http://a/1', 'http://a/2']
+
+
+def test_decay_halves_each_half_life(tmp_path):
+    history = History(str(tmp_path / 'history.jsonl'))
+    history.loaded = True
+    now = 1_800_000_000
+    play(history, 'http://a/1', 0, now)
+    play(history, 'http://a/2', 14, now)
+    play(history, 'http://a/2', 14, now)
+    first, second = history.entries['http://a/1'][0], history.entries['http://a/2'][0]
+    assert abs(first - second) < 1e-9  # Dos reproducciones de hace dos semanas = una de hoy
+
+
+def test_forgotten_stations_are_dropped_but_favorites_stay(tmp_path):
+    history = History(str(tmp_path / 'history.jsonl'))
+    history.loaded = True
+    history.apply({'time': 0, 'event': 'play', 'title': 'Vieja', 'url': 'http://a/vieja'})
+    history.apply({'time': 0, 'event': 'favorite', 'title': 'Fiel', 'url': 'http://a/fiel'})
+    history.played('http://a/nueva', 'Nueva')
+    assert [record['url'] for record in history.snapshot()] == ['http://a/fiel', 'http://a/nueva']
+    history.close()
+
+
+def test_truncated_line_is_skipped(tmp_path):
+    path = tmp_path / 'history.jsonl'
+    path.write_text('{"time": 1, "event": "play", "title": "A", "url": "http://a/1"}\n{"time": 2, "ev')
+    history = History(str(path))
+    history.load()
+    assert history.ranked() == [('http://a/1', 'A')] and history.lines == 2
@@ -0,0 +1,90 @@
+import json
+
+from radio import CatalogImporter, StationStore
+
+
+def stations(path) -> list:
+    store = StationStore(path.read_bytes())
+    return [(store[entry].title, store[entry].url) for entry in range(len(store))]
+
+
+def test_equivalent_urls_collapse_into_one_entry(tmp_path):
+    (tmp_path / 'a.json').write_text(json.dumps([
+        {'title': 'Mitre', 'url': 'HTTP://Radio.Example:80/stream/;'},
+        {'title': 'Jazz', 'url': 'http://jazz.example/live'}]))
+    (tmp_path / 'b.m3u').write_text('#EXTM3U\n#EXTINF:-1,Mitre AM\nhttp://radio.example/stream\n'
+                                    '#EXTINF:-1,Jazz HTTPS\nhttps://jazz.example:443/live/\n')
+    (tmp_path / 'c.csv').write_text('name,url\nMitre 790,http://radio.example:80/stream/\n'
+                                    'Otra,http://radio.example:8000/stream\n')
+
+    importer = CatalogImporter(str(tmp_path / 'out.cache'), work_dir=str(tmp_path / 'work'))
+    importer.RUN_SIZE = 2  # Tramos en disco también para las claves de las repetidas
+    stats = importer.run([str(tmp_path / name) for name in ('a.json', 'b.m3u', 'c.csv')])
+    assert (stats['read'], stats['stations'], stats['duplicates']) == (6, 4, 2)
+    # Gana la primera fuente; otro esquema u otro puerto es otra estación
+    assert stations(tmp_path / 'out.cache') == [
+        ('Jazz', 'http://jazz.example/live'), ('Jazz HTTPS', 'https://jazz.example:443/live/'),
+        ('Mitre', 'HTTP://Radio.Example:80/stream/;'), ('Otra', 'http://radio.example:8000/stream')]
+
+
+def records(tmp_path, name, text, **options):
+    path = tmp_path / name
+    path.write_text(text, encoding='utf-8')
+    importer = CatalogImporter(str(tmp_path / 'out.cache'), work_dir=str(tmp_path / 'work'))
+    for key, value in options.items():
+        setattr(importer, key, value)
+    return list(importer.records(str(path)))
+
+
+def test_json_array_is_decoded_across_chunks(tmp_path):
+    data = [{'name': f'Radio {number}', 'url_resolved': f'http://a/{number}', 'tags': 'rock,pop'}
+            for number in range(50)] + [{'title': 'Sin URL'}, 'basura']
+    result = records(tmp_path, 'radios.json', '\ufeff  ' + json.dumps(data, indent=1), CHUNK=7)
+    assert len(result) == 50
+    assert result[7] == ('Radio 7', 'http://a/7', ['rock', 'pop'])
+
+
+def test_json_lines_skip_damaged_lines(tmp_path):
+    text = '{"title": "A", "url": "http://a/1"}\n\n{"title": "B", "url"\n{"url": "http://a/3"}\n'
+    assert records(tmp_path, 'radios.jsonl', text) == [('A', 'http://a/1', []), ('http://a/3', 'http://a/3', [])]
+
+
+def test_csv_with_header(tmp_path):
+    text = 'name,url,tags\n"Radio, con coma",http://a/1,"jazz,blues"\nVacía,,\n'
+    assert records(tmp_path, 'radios.csv', text) == [('Radio, con coma', 'http://a/1', ['jazz', 'blues'])]
+
+
+def test_m3u_titles_and_groups(tmp_path):
+    text = ('#EXTM3U\n#EXTINF:-1 tvg-name="a,b" group-title="Noticias",Mitre, AM 790\nhttp://a/1\n'
+            '#EXTVLCOPT:network-caching=1000\nhttp://a/2\n')
+    assert records(tmp_path, 'lista.m3u', text) == [
+        ('Mitre, AM 790', 'http://a/1', ['Noticias']), ('lista', 'http://a/2', [])]
+
+
+def test_pls_entries_in_numeric_order(tmp_path):
+    text = '[playlist]\nFile10=http://a/10\nTitle10=Diez\nFile2=http://a/2\nNumberOfEntries=2\n'
+    assert records(tmp_path, 'lista.pls', text) == [('lista', 'http://a/2', []), ('Diez', 'http://a/10', [])]
+
+
+def test_reimport_only_reads_what_changed(tmp_path):
+    sources = tmp_path / 'fuentes'
+    sources.mkdir()
+    (sources / 'a.m3u').write_text('#EXTINF:-1,Uno\nhttp://a/1\n')
+    (sources / 'b.pls').write_text('File1=http://a/2\nTitle1=Dos\n')
+    (sources / 'notas.txt').write_text('no es una fuente')
+    importer = CatalogImporter(str(tmp_path / 'out.cache'), work_dir=str(tmp_path / 'work'))
+
+    stats = importer.run([str(sources)])
+    assert (stats['files'], stats['parsed'], stats['stations'], stats['rebuilt']) == (2, 2, 2, True)
+    stats = importer.run([str(sources)])
+    assert (stats['parsed'], stats['stations'], stats['rebuilt']) == (0, 2, False)
+
+    (sources / 'a.m3u').write_text('#EXTINF:-1,Uno\nhttp://a/1\n#EXTINF:-1,Tres\nhttp://a/3\n')
+    stats = importer.run([str(sources)])
+    assert (stats['parsed'], stats['stations'], stats['rebuilt']) == (1, 3, True)
+    assert [title for title, _ in stations(tmp_path / 'out.cache')] == ['Dos', 'Tres', 'Uno']
+
+    (sources / 'b.pls').unlink()
+    stats = importer.run([str(sources)])
+    assert (stats['parsed'], stats['stations']) == (0, 2)
+    assert len(list((tmp_path / 'work').glob('*.seg'))) == 1
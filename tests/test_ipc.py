@@ -0,0 +1,127 @@
+import json
+import socket
+import threading
+import time
+
+import pytest
+
+from radio import MpvIPC, MpvIPCError
+
+
+class Mpv:
+    """Socket IPC que contesta en orden inverso de a `batch` comandos"""
+
+    def __init__(self, path: str, batch: int = 1):
+        self.path = path
+        self.batch = batch
+        self.commands = []
+        self.conns = []
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(path)
+        self.server.listen(4)
+        threading.Thread(target=self.accept, daemon=True).start()
+
+    def accept(self):
+        while True:
+            try:
+                conn, _ = self.server.accept()
+            except OSError:
+                return
+            self.conns.append(conn)
+            threading.Thread(target=self.serve, args=(conn,), daemon=True).start()
+
+    def serve(self, conn):
+        waiting = []
+        try:
+            for line in conn.makefile('rb'):
+                message = json.loads(line)
+                self.commands.append(message['command'])
+                error = 'property unavailable' if message['command'][:2] == ['get_property', 'nada'] else 'success'
+                waiting.append({'request_id': message['request_id'], 'error': error, 'data': message['command'][-1]})
+                if len(waiting) >= self.batch:
+                    for reply in reversed(waiting):
+                        conn.sendall(json.dumps(reply).encode() + b'\n')
+                    waiting = []
+        except OSError:
+            pass
+
+    def emit(self, event: dict):
+        for conn in self.conns:
+            conn.sendall(json.dumps(event).encode() + b'\n')
+
+    def close(self):
+        self.server.close()
+        for conn in self.conns:
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            conn.close()
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'mpv.sock')
+
+
+def test_replies_are_matched_to_their_requests(path):
+    mpv = Mpv(path, batch=2)
+    ipc = MpvIPC(path)
+    first = ipc.send('get_property', 'volume', wait=True)
+    second = ipc.send('get_property', 'pause', wait=True)
+    assert first.event.wait(2) and second.event.wait(2)
+    # Llegaron al revés, pero cada una a su pedido
+    assert (first.reply['data'], second.reply['data']) == ('volume', 'pause')
+    ipc.close()
+    mpv.close()
+
+
+def test_command_errors_and_events(path):
+    mpv = Mpv(path)
+    events = []
+    ipc = MpvIPC(path, on_event=events.append)
+    assert ipc.command('set_property', 'volume', 70) == 70
+    with pytest.raises(MpvIPCError, match='property unavailable'):
+        ipc.get_property('nada')
+
+    mpv.emit({'event': 'property-change', 'name': 'media-title', 'data': 'Tema'})
+    deadline = time.monotonic() + 2
+    while not events and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert events == [{'event': 'property-change', 'name': 'media-title', 'data': 'Tema'}]
+
+    # El otro lado se cierra: los que esperan se liberan y se avisa como evento
+    mpv.close()
+    deadline = time.monotonic() + 2
+    while ipc.connected and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not ipc.connected and events[-1] == {'event': 'shutdown'}
+    ipc.close()
+
+
+def test_reconnects_with_backoff(path):
+    ipc = MpvIPC(path)
+    with pytest.raises(MpvIPCError):
+        ipc.send('get_property', 'volume')
+    assert not ipc.connect()  # Dentro del backoff no se vuelve a intentar
+    assert ipc._backoff == 2 * MpvIPC.BACKOFF_MIN
+
+    mpv = Mpv(path)
+    assert ipc.wait_connected(2.0)
+    assert ipc.get_property('volume') == 'volume'
+    assert ipc._backoff == MpvIPC.BACKOFF_MIN
+    ipc.close()
+    mpv.close()
+
+
+def test_no_processes_for_volume_changes(path, monkeypatch):
+    import subprocess
+    mpv = Mpv(path)
+    ipc = MpvIPC(path)
+    monkeypatch.setattr(subprocess, 'Popen', None)  # Cualquier proceso nuevo fallaría
+    for volume in range(0, 101, 10):
+        ipc.set_property('volume', volume)
+    assert ipc.get_property('volume') == 'volume'
+    assert mpv.commands[-2] == ['set_property', 'volume', 100]
+    ipc.close()
+    mpv.close()
@@ -0,0 +1,80 @@
+import curses
+
+import pytest
+
+from radio import RadioCLI, StationStore
+
+
+class Keyboard:
+    """Pantalla que entrega las teclas encoladas y luego -1, como getch sin bloqueo"""
+
+    def __init__(self):
+        self.keys = []
+
+    def getch(self) -> int:
+        return self.keys.pop(0) if self.keys else -1
+
+
+@pytest.fixture
+def cli(tmp_path, monkeypatch):
+    monkeypatch.setenv('XDG_DATA_HOME', str(tmp_path / 'data'))
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'cache'))
+    cli = RadioCLI()
+    cli.install_catalog(StationStore(StationStore.build(
+        [{'title': f'Radio {number:03d}', 'url': f'http://a/{number}'} for number in range(100)])))
+    cli.screen = Keyboard()
+    cli.max_visible = lambda: 10
+    cli.running = True
+    yield cli
+    cli.background.stop()
+
+
+def test_held_arrow_moves_once_per_batch(cli, monkeypatch):
+    moves = []
+    move_selection = cli.move_selection
+    monkeypatch.setattr(cli, 'move_selection', lambda delta: (moves.append(delta), move_selection(delta)))
+    cli.screen.keys = [curses.KEY_DOWN] * 30 + [curses.KEY_UP] * 5
+    cli.read_keys()
+    assert moves == [25]
+    assert cli.selected == 25 and cli.scroll_offset == 16  # La selección queda a la vista
+
+    cli.screen.keys = [curses.KEY_UP] * 26  # Da la vuelta, como tecla por tecla
+    cli.read_keys()
+    assert cli.selected == 99
+
+
+def test_volume_keys_send_one_command_per_frame(cli, monkeypatch):
+    sent = []
+    monkeypatch.setattr(cli.engine, 'set_volume', lambda volume: sent.append(volume))
+    cli.screen.keys = [curses.KEY_RIGHT] * 8 + [curses.KEY_LEFT]
+    cli.read_keys()
+    assert cli.volume == 90 and sent == []
+    cli.sync_volume()
+    assert sent == [90]
+
+
+def test_typed_burst_runs_one_search(cli, monkeypatch):
+    queries = []
+    search_stations = cli.search_stations
+    monkeypatch.setattr(cli, 'search_stations', lambda query: (queries.append(query), search_stations(query)))
+    cli.activate_search()
+    cli.screen.keys = [ord(char) for char in 'radio 04']
+    cli.read_keys()
+    assert queries == ['radio 04'] and len(cli.filtered_radios) == 10
+
+
+def test_frames_are_capped(cli, monkeypatch):
+    frames = []
+    monkeypatch.setattr(cli, 'show_interface', lambda: frames.append(True))
+    cli.open_loop()
+    try:
+        cli.render_frame()
+        cli.dirty = True
+        cli.render_frame()  # Demasiado pronto: queda para el próximo cuadro
+        assert frames == [True] and 'frame' in cli.timers
+        cli.poll()
+        assert cli.dirty
+        cli.render_frame()
+        assert frames == [True, True]
+    finally:
+        cli.close_loop()
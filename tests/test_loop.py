@@ -0,0 +1,69 @@
+import threading
+import time
+
+import pytest
+
+from radio import EventLoop, NowPlaying
+
+
+@pytest.fixture
+def loop():
+    loop = EventLoop()
+    loop.open_loop()
+    yield loop
+    loop.close_loop()
+
+
+def test_timers_run_in_order_and_rescheduling_replaces(loop):
+    fired = []
+    loop.schedule('b', 0.10, lambda: fired.append('b'))
+    loop.schedule('a', 0.02, lambda: fired.append('a'))
+    loop.schedule('frame', 0.01, lambda: fired.append('viejo'))
+    loop.schedule('frame', 0.06, lambda: fired.append('frame'))  # Mismo nombre: reemplaza
+    loop.schedule('cancelado', 0.01, lambda: fired.append('cancelado'))
+    loop.cancel('cancelado')
+
+    started = time.monotonic()
+    while loop.timers:
+        loop.poll()
+    assert fired == ['a', 'frame', 'b']
+    assert 0.095 <= time.monotonic() - started < 0.5
+
+
+def test_timers_due_together_run_in_one_poll(loop):
+    fired = []
+    loop.schedule('uno', 0.0, lambda: fired.append(1))
+    loop.schedule('dos', 0.0005, lambda: fired.append(2))  # Dentro del margen de 1 ms
+    loop.poll()
+    assert sorted(fired) == [1, 2]
+
+
+def test_post_from_another_thread_wakes_the_loop(loop):
+    done = []
+    threading.Timer(0.05, lambda: loop.post(lambda: done.append(threading.current_thread()))).start()
+    started = time.monotonic()
+    loop.schedule('limite', 2.0, lambda: None)
+    loop.poll()  # Sin el aviso dormiría hasta el temporizador
+    assert done == [threading.current_thread()]
+    assert time.monotonic() - started < 1.0
+
+
+def test_idle_loop_sleeps_until_the_next_timer(loop):
+    assert loop.next_timeout() is None  # Sin temporizadores: esperar sin límite
+    loop.schedule('lejos', 60, lambda: None)
+    assert 59 < loop.next_timeout() <= 60
+
+
+def test_now_playing_follows_property_events():
+    track = NowPlaying()
+    assert track.update({'event': 'property-change', 'name': 'media-title', 'data': 'http://a/radio'})
+    assert track.title('http://a/radio') == ''  # El título es la propia URL
+    track.update({'event': 'property-change', 'name': 'metadata/by-key/icy-title', 'data': 'Artista - Tema'})
+    track.update({'event': 'property-change', 'name': 'paused-for-cache', 'data': True})
+    track.update({'event': 'property-change', 'name': 'core-idle', 'data': False})
+    assert track.title('http://a/radio') == 'Artista - Tema'
+    assert track.buffering and not track.core_idle
+    assert not track.update({'event': 'property-change', 'name': 'volume', 'data': 50})
+
+    assert track.update({'event': 'start-file'})  # Otra estación: se olvida lo anterior
+    assert track.title() == '' and not track.buffering and track.core_idle
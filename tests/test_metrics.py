@@ -0,0 +1,107 @@
+import json
+
+import pytest
+
+from radio import Metrics, NowPlaying
+
+
+def event(name, value=None):
+    if value is None:
+        return {'event': name}
+    return {'event': 'property-change', 'name': name, 'data': value}
+
+
+def play(metrics, track, *events):
+    for item in events:
+        track.update(item)
+        metrics.playback(item, track)
+
+
+def test_key_latency_is_measured_from_the_first_unpainted_key():
+    metrics = Metrics()
+    metrics.frame_end(metrics.frame_begin())
+    assert metrics.frames == 1 and metrics.keys == 0
+
+    metrics.key()
+    first = metrics.key_time
+    metrics.key()  # Una ráfaga: cuenta desde la primera
+    assert metrics.key_time == first
+    metrics.frame_end(metrics.frame_begin())
+    assert metrics.frames == 2 and metrics.keys == 1 and metrics.key_time is None
+    assert len(metrics.paint_ms) == 1 and metrics.paint_ms[0] >= metrics.frame_ms[-1]
+    metrics.close()
+
+
+def test_first_audio_waits_for_the_new_stream():
+    metrics, track = Metrics(), NowPlaying()
+    metrics.play_started('http://a/radio', 'Radio', warm=False)
+    # Eventos del stream anterior: no cuentan hasta start-file
+    play(metrics, track, event('core-idle', False))
+    assert metrics.plays_heard == 0
+
+    play(metrics, track, event('start-file'), event('core-idle', False))
+    assert metrics.plays_heard == 1
+    stats = metrics.stations['http://a/radio']
+    assert stats.plays == 1 and len(stats.first_audio_ms) == 1
+
+    # Un corte y su recuperación
+    play(metrics, track, event('paused-for-cache', True), event('paused-for-cache', False))
+    assert stats.rebuffers == 1 and stats.rebuffer_ms > 0
+    metrics.close()
+
+
+def test_warm_start_counts_without_start_file():
+    metrics, track = Metrics(), NowPlaying()
+    metrics.play_started('http://a/radio', 'Radio', warm=True)
+    play(metrics, track, event('core-idle', False))
+    assert metrics.plays_heard == 1
+    metrics.close()
+
+
+def test_summary_lines():
+    metrics = Metrics()
+    assert metrics.summary()[0].startswith('Cuadros 0  p50 -')
+    metrics.frame_ms.extend([1.0, 2.0, 3.0])
+    metrics.frames = 3
+    metrics.play_started('http://a/radio', 'Radio', warm=True)
+    lines = metrics.summary('http://a/radio')
+    assert lines[0] == 'Cuadros 3  p50 2.0  p99 3.0 ms'
+    assert lines[-2:] == ['Esta estación: audio -', 'Cortes 0 (0.0 s)']
+    metrics.close()
+
+
+def test_jsonl_export(tmp_path):
+    path = tmp_path / 'metrics.jsonl'
+    metrics, track = Metrics(str(path)), NowPlaying()
+    metrics.play_started('http://a/radio', 'Radio', warm=True)
+    play(metrics, track, event('core-idle', False))
+    metrics.frame_end(metrics.frame_begin())
+    metrics.flush()
+    metrics.flush()  # Sin cuadros nuevos no repite el registro
+
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [record['event'] for record in records] == ['first-audio', 'frames']
+    assert records[0]['station'] == 'Radio' and records[0]['url'] == 'http://a/radio'
+    assert records[1]['frames'] == 1 and set(records[1]['frame_ms']) == {'p50', 'p99'}
+    metrics.close()
+
+
+def test_prometheus_textfile(tmp_path):
+    path = tmp_path / 'radio.prom'
+    metrics = Metrics(str(path))
+    metrics.play_started('http://a/radio', 'Radio "La" \\ 1', warm=True)
+    metrics.frame_end(metrics.frame_begin())
+    metrics.close()
+
+    text = path.read_text()
+    assert '# TYPE radio_cli_frame_seconds summary' in text
+    assert 'radio_cli_frame_seconds_count 1' in text
+    assert 'radio_cli_first_audio_seconds_count 0' in text
+    assert 'radio_cli_plays_total{station="Radio \\"La\\" \\\\ 1",url="http://a/radio"} 1' in text
+    assert not list(tmp_path.glob('*.tmp'))
+
+
+@pytest.mark.parametrize('samples, fraction, expected', [
+    ([], 0.5, None), ([5.0], 0.99, 5.0), ([3.0, 1.0, 2.0], 0.5, 2.0), (list(range(100)), 0.99, 99)])
+def test_percentile(samples, fraction, expected):
+    assert Metrics.percentile(samples, fraction) == expected
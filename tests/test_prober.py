@@ -0,0 +1,76 @@
+import time
+
+from conftest import audio, icy_stream, respond, stall
+from radio import HealthCache, ProbeResult, StreamProber
+
+
+def probe(urls, tmp_path, **options):
+    return StreamProber(HealthCache(str(tmp_path / 'health.json')), **options).run(urls)
+
+
+def test_live_stream_reads_icy_headers(icecast, tmp_path):
+    icecast.routes['/stream'] = icy_stream(['Uno'] * 3)
+    [result] = probe([icecast.url('/stream')], tmp_path)
+    assert result.ok and result.status == 200
+    assert (result.codec, result.bitrate, result.name) == ('mp3', 128, 'Prueba')
+    assert result.ttfb_ms is not None and result.title is None
+
+
+def test_redirect_is_followed(icecast, tmp_path):
+    icecast.routes['/redir'] = respond(b'HTTP/1.0 302 Found\r\nLocation: /stream\r\n\r\n')
+    icecast.routes['/stream'] = icy_stream(['Uno'])
+    [result] = probe([icecast.url('/redir')], tmp_path)
+    assert result.ok
+    assert icecast.requests == ['/redir', '/stream']
+
+
+def test_http_error_and_refused_connection(icecast, tmp_path):
+    results = probe([icecast.url('/missing'), 'http://127.0.0.1:1/'], tmp_path)
+    assert [result.ok for result in results] == [False, False]
+    assert results[0].error == 'HTTP 404'
+
+
+def test_timeout(icecast, tmp_path):
+    icecast.routes['/stall'] = stall
+    started = time.monotonic()
+    [result] = probe([icecast.url('/stall')], tmp_path, timeout=0.3)
+    assert not result.ok and result.error == 'timeout'
+    assert time.monotonic() - started < 2
+
+
+def test_icy_title(icecast, tmp_path):
+    icecast.routes['/stream'] = icy_stream(['Artista - Canción', 'Otra'], metaint=8000)
+    [result] = probe([icecast.url('/stream')], tmp_path, titles=True)
+    assert result.ok and result.title == 'Artista - Canción'
+
+
+def test_icy_title_cut_short_keeps_station_alive(icecast, tmp_path):
+    # Responde pero se queda callado antes del primer bloque de metadatos
+    def route(conn, request, events):
+        conn.sendall(b'ICY 200 OK\r\nContent-Type: audio/mpeg\r\nicy-metaint: 8000\r\n\r\n' + audio(1000))
+        events.wait(10)
+
+    icecast.routes['/stream'] = route
+    [result] = probe([icecast.url('/stream')], tmp_path, titles=True, timeout=0.5)
+    assert result.ok and result.title is None
+
+
+def test_health_cache_roundtrip(icecast, tmp_path):
+    icecast.routes['/stream'] = icy_stream(['Uno'])
+    path = str(tmp_path / 'health.json')
+    cache = HealthCache(path)
+    StreamProber(cache).run([icecast.url('/stream')])
+    cache.save()
+
+    again = HealthCache(path)
+    result = again.get(icecast.url('/stream'))
+    assert result.ok and result.codec == 'mp3'
+    assert again.is_fresh(result)
+    result.checked -= HealthCache.TTL + 1
+    assert not again.is_fresh(result)
+    assert again.get('http://otra/') is None
+
+
+def test_probe_result_tolerates_missing_fields():
+    result = ProbeResult.from_dict('http://a/', {'ok': True, 'ttfb_ms': 12.5})
+    assert result.ok and result.ttfb_ms == 12.5 and result.title is None
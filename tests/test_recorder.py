@@ -0,0 +1,154 @@
+import json
+import os
+import time
+
+import pytest
+
+from conftest import audio, icy_block, icy_stream, respond, stall
+from radio import CronWindow, EventLoop, Recorder, RecordingSchedule
+
+
+@pytest.fixture
+def loop():
+    loop = EventLoop()
+    loop.open_loop()
+    yield loop
+    loop.close_loop()
+
+
+@pytest.fixture
+def recorder(loop, tmp_path):
+    recorder = Recorder(loop, directory=str(tmp_path))
+    yield recorder
+    recorder.close()
+
+
+def run_until(loop, condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    loop.schedule('test-timeout', timeout, lambda: None)
+    while not condition():
+        assert time.monotonic() < deadline, 'se agotó el tiempo de espera'
+        loop.poll()
+
+
+def recorded(tmp_path) -> bytes:
+    return b''.join(path.read_bytes() for path in sorted(tmp_path.rglob('*.mp3'), key=os.path.getmtime))
+
+
+def test_playlist_entry_with_query_string(icecast, loop, recorder, tmp_path):
+    icecast.routes['/list.m3u'] = respond(
+        b'HTTP/1.0 200 OK\r\nContent-Type: audio/x-mpegurl\r\n\r\n'
+        + b'#EXTM3U\n' + icecast.url('/listen?sid=1').encode() + b'\n')
+    icecast.routes['/listen?sid=1'] = icy_stream([None] * 4, hold=True)
+    recording = recorder.start(icecast.url('/list.m3u'), 'Lista')
+    run_until(loop, lambda: recording.state == 'audio' and recording.total + recording.pending >= 4000
+              or recording.state == 'error')
+    assert recording.state == 'audio', recording.error
+    assert '/listen?sid=1' in icecast.requests
+
+
+def test_title_change_splits_files(icecast, loop, recorder, tmp_path):
+    icecast.routes['/stream'] = icy_stream(['A', 'A', 'B', 'B'], hold=True)
+    recording = recorder.start(icecast.url('/stream'), 'Radio')
+    run_until(loop, lambda: recording.stream_title == 'B' and recording.total + recording.pending >= 4000)
+    recorder.stop(icecast.url('/stream'))
+
+    files = {path.name.split(' - ', 1)[1]: path.read_bytes() for path in (tmp_path / 'Radio').iterdir()}
+    assert files == {'A.mp3': audio(3000), 'B.mp3': audio(1000, 3000)}
+
+
+@pytest.mark.parametrize('splice', [True, False])
+def test_audio_sent_with_the_headers_is_kept(icecast, loop, recorder, tmp_path, splice):
+    recorder.splice = splice and recorder.splice  # Sin splice: el camino de HTTPS
+    # Cabeceras, audio y metadatos en un solo envío: todo llega en la primera lectura
+    icecast.routes['/stream'] = respond(
+        b'ICY 200 OK\r\nContent-Type: audio/mpeg\r\nicy-metaint: 100\r\n\r\n'
+        + audio(100) + icy_block('A') + audio(100, 100) + icy_block(None) + audio(50, 200))
+    recording = recorder.start(icecast.url('/stream'), 'Radio')
+    run_until(loop, lambda: recording.state == 'waiting')
+    recorder.stop(icecast.url('/stream'))
+
+    [path] = (tmp_path / 'Radio').iterdir()
+    assert path.name.endswith(' - A.mp3')
+    assert path.read_bytes() == audio(250)
+
+
+def test_reconnects_into_the_same_file(icecast, loop, recorder, tmp_path):
+    icecast.routes['/stream'] = icy_stream([None, None])
+    recorder.RETRY_MIN = 0.05
+    recording = recorder.start(icecast.url('/stream'), 'Radio')
+    run_until(loop, lambda: len(icecast.requests) >= 3 and recording.total + recording.pending >= 6000)
+    assert recording.error  # Se cortó y volvió a conectar
+    recorder.stop(icecast.url('/stream'))
+
+    [path] = (tmp_path / 'Radio').iterdir()
+    assert path.read_bytes()[:4000] == audio(2000) * 2
+
+
+def test_stalled_stream_does_not_block_the_loop(icecast, loop, recorder):
+    icecast.routes['/stall'] = stall
+    icecast.routes['/stream'] = icy_stream([None], hold=True)
+    stalled = recorder.start(icecast.url('/stall'), 'Callada')
+    live = recorder.start(icecast.url('/stream'), 'Viva')
+    run_until(loop, lambda: live.total + live.pending >= 1000)
+
+    fired = []
+    loop.schedule('tick', 0.1, lambda: fired.append(True))
+    run_until(loop, lambda: fired, timeout=1.0)
+    assert stalled.state == 'head'
+    assert not stalled.sock.getblocking() and not live.sock.getblocking()
+
+
+def local(*fields) -> float:
+    return time.mktime((*fields, 0, 0, -1))
+
+
+def test_cron_window():
+    weekdays = CronWindow('0 8 * * 1-5', 120)
+    assert weekdays.end(local(2026, 10, 19, 8, 30, 0)) == local(2026, 10, 19, 10, 0, 0)  # Lunes
+    assert weekdays.end(local(2026, 10, 19, 10, 0, 0)) is None
+    assert weekdays.end(local(2026, 10, 18, 8, 30, 0)) is None  # Domingo
+
+    # Día del mes y de la semana restringidos: alcanza con uno
+    either = CronWindow('0 8 1 * 0', 60)
+    assert either.end(local(2026, 10, 1, 8, 10, 0)) is not None  # Jueves 1
+    assert either.end(local(2026, 10, 18, 8, 10, 0)) is not None  # Domingo 18
+    assert either.end(local(2026, 10, 19, 8, 10, 0)) is None
+
+    quarters = CronWindow('*/15 * * * *', 5)
+    assert quarters.end(local(2026, 10, 19, 3, 47, 0)) == local(2026, 10, 19, 3, 50, 0)
+    assert quarters.end(local(2026, 10, 19, 3, 50, 0)) is None
+
+    for expression in ('0 8 * *', '60 * * * *', '0 8 * * 1-9'):
+        with pytest.raises(ValueError):
+            CronWindow(expression, 60)
+
+
+def test_recording_schedule(tmp_path):
+    path = tmp_path / 'recordings.json'
+    schedule = RecordingSchedule(str(path))
+    assert schedule.refresh() is None and schedule.due(time.time()) == []
+
+    path.write_text(json.dumps({'directory': '~/radio', 'schedule': [
+        {'station': 'Mitre', 'cron': '0 8 * * *', 'minutes': 90},
+        {'url': 'http://a/jazz', 'cron': '0 22 * * 6'}]}))
+    assert schedule.refresh() is None
+    assert schedule.directory == os.path.expanduser('~/radio')
+    assert schedule.due(local(2026, 10, 19, 9, 0, 0)) == [('Mitre', None, local(2026, 10, 19, 9, 30, 0))]
+
+    path.write_text('{"schedule": [{"cron": "mal"}]}')
+    assert 'recordings.json' in schedule.refresh()
+
+
+def test_data_dir_is_created_on_first_write(icecast, loop, tmp_path, monkeypatch):
+    monkeypatch.setenv('XDG_DATA_HOME', str(tmp_path / 'data'))
+    recorder = Recorder(loop)
+    schedule = RecordingSchedule()
+    assert not (tmp_path / 'data').exists()
+    assert schedule.refresh() is None and schedule.entries == []
+
+    icecast.routes['/stream'] = icy_stream([None], hold=True)
+    recording = recorder.start(icecast.url('/stream'), 'Radio')
+    run_until(loop, lambda: recording.total + recording.pending >= 1000)
+    recorder.close()
+    assert recording.path.startswith(str(tmp_path / 'data' / 'radio-cli' / 'recordings' / 'Radio'))
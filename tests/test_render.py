@@ -0,0 +1,89 @@
+import pytest
+
+import benchmark
+import radio
+from radio import RadioCLI, StationStore
+
+
+class Window:
+    """Ventana curses que anota las filas que se escriben"""
+
+    def __init__(self, height: int, width: int):
+        self.height = height
+        self.width = width
+        self.writes = []
+        self.texts = {}  # Fila -> textos escritos en ella
+
+    def getmaxyx(self):
+        return self.height, self.width
+
+    def addstr(self, *args):
+        row = args[0] if isinstance(args[0], int) else None
+        self.writes.append(row)
+        self.texts.setdefault(row, []).append(args[2] if row is not None else args[0])
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: 0
+
+
+@pytest.fixture
+def counter():
+    return benchmark.DrawCounter()
+
+
+@pytest.fixture
+def cli(tmp_path, monkeypatch, counter):
+    monkeypatch.setenv('XDG_DATA_HOME', str(tmp_path / 'data'))
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'cache'))
+    module = benchmark.fake_curses(counter)
+    module.newwin = lambda height, width, y, x: Window(height, width)
+    monkeypatch.setattr(radio, 'curses', module)
+
+    cli = RadioCLI()
+    cli.install_catalog(StationStore(StationStore.build(
+        [{'title': f'Radio {number:03d}', 'url': f'http://a/{number}'} for number in range(100)])))
+    cli.screen = Window(30, 100)
+    cli.show_interface()
+    yield cli
+    cli.background.stop()
+
+
+def rows(cli) -> dict:
+    """Filas escritas por ventana desde la última llamada"""
+    written = {name: sorted(set(window.writes)) for name, window in cli.windows.items() if window.writes}
+    for window in cli.windows.values():
+        window.writes = []
+    return written
+
+
+def test_unchanged_frame_writes_nothing(cli, counter):
+    rows(cli)
+    counter.reset()
+    cli.show_interface()
+    assert rows(cli) == {} and counter.flushes == 0  # Ni siquiera doupdate
+
+
+def test_moving_the_selection_rewrites_two_rows(cli):
+    rows(cli)
+    cli.move_selection(1)
+    cli.show_interface()
+    height, _ = cli.windows['list'].getmaxyx()
+    # Las dos filas de la selección, la URL seleccionada y "Estación 2 de 100"
+    assert rows(cli) == {'list': [1, 2, height - 2], 'status': [9]}
+
+
+def test_volume_rewrites_only_the_bar(cli, counter):
+    rows(cli)
+    counter.reset()
+    cli.adjust_volume(10)
+    cli.show_interface()
+    assert rows(cli) == {'status': [8]}
+    assert counter.flushes == 1
+
+
+def test_help_rows_list_every_key(cli):
+    status = cli.windows['status']
+    help_text = ' '.join(text for row in (1, 2, 3, 4) for text in status.texts[row])
+    for key in ('↑/↓', '←/→', 'Enter', '/', 'ESC', 'o:', 'f:', 'i:', 'r:', 'a/v:', 'e:'):
+        assert key in help_text
+    assert 'q: Salir' in status.texts[9]
@@ -0,0 +1,39 @@
+import pytest
+
+from radio import RadioCLI, StreamResolver
+
+
+def test_m3u_entry_with_query_string():
+    playlist = "#EXTM3U\n#EXTINF:-1,Radio\nhttp://host/listen?sid=1\n"
+    assert StreamResolver.first_entry('http://a/list.m3u', playlist) == 'http://host/listen?sid=1'
+
+
+def test_m3u_relative_entry_with_query_string():
+    assert StreamResolver.first_entry('http://a/x/list.m3u', "stream?type=.mp3\n") == 'http://a/x/stream?type=.mp3'
+
+
+def test_pls_skips_keys():
+    playlist = "[playlist]\nNumberOfEntries=1\nTitle1=Radio\nFile1=http://host/listen?sid=2\nLength1=-1\n"
+    assert StreamResolver.first_entry('http://a/list.pls', playlist) == 'http://host/listen?sid=2'
+
+
+def test_pls_without_files():
+    assert StreamResolver.first_entry('http://a/list.pls', "[playlist]\nNumberOfEntries=0\n") is None
+
+
+@pytest.mark.parametrize('playing, failures', [('http://resuelto/stream', ['http://a/radio']),
+                                               ('http://127.0.0.1:9/anillo', [])])
+def test_only_a_failed_resolved_endpoint_counts(tmp_path, monkeypatch, playing, failures):
+    monkeypatch.setenv('XDG_DATA_HOME', str(tmp_path / 'data'))
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'cache'))
+    cli = RadioCLI()
+    reported, played = [], []
+    monkeypatch.setattr(cli.resolver, 'lookup', lambda url: 'http://resuelto/stream')
+    monkeypatch.setattr(cli.resolver, 'report_failure', reported.append)
+    monkeypatch.setattr(cli.engine, 'play', lambda url, options=None: played.append(url))
+    cli.playing, cli.playing_source, cli.engine.current_url = True, 'http://a/radio', playing
+
+    cli.handle_mpv_event(cli.engine, {'event': 'end-file', 'reason': 'error'})
+    assert reported == failures  # El anillo de la pausa no es culpa del resolver
+    assert played == ['http://a/radio']
+    cli.background.stop()
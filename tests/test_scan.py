@@ -0,0 +1,52 @@
+from conftest import icy_stream, stall
+from radio import HealthCache, ProbeResult, Station, StationScan
+
+
+def scan_of(tmp_path, count):
+    stations = [(10 + number, Station(f'Radio {number}', f'http://a/{number}')) for number in range(count)]
+    return StationScan(HealthCache(str(tmp_path / 'health.json')), stations)
+
+
+def arrive(scan, number, ok=True):
+    url = f'http://a/{number}'
+    scan.results[url] = ProbeResult.from_dict(url, {'ok': ok})
+
+
+def test_live_stations_play_in_list_order(tmp_path):
+    scan = scan_of(tmp_path, 4)
+    # Los sondeos terminan en cualquier orden: la tercera responde primero
+    arrive(scan, 2)
+    assert scan.next_live() is None and scan.upcoming() is None
+    arrive(scan, 0, ok=False)
+    arrive(scan, 1)
+    position, radio = scan.next_live()
+    assert (position, radio.title) == (11, 'Radio 1')  # La primera estaba caída
+    assert scan.upcoming().title == 'Radio 2' and scan.progress == (2, 4)
+
+    assert scan.next_live()[0] == 12
+    assert scan.next_live() is None and not scan.done  # Falta la última
+    arrive(scan, 3, ok=False)
+    assert scan.next_live() is None and scan.done
+
+
+def test_upcoming_does_not_advance(tmp_path):
+    scan = scan_of(tmp_path, 3)
+    arrive(scan, 0, ok=False)
+    arrive(scan, 1, ok=False)
+    arrive(scan, 2)
+    assert scan.upcoming().title == 'Radio 2'
+    assert scan.progress == (0, 3)
+    assert scan.next_live()[1].title == 'Radio 2' and scan.upcoming() is None
+
+
+def test_scan_probes_skip_silent_stations(icecast, tmp_path):
+    icecast.routes['/viva'] = icy_stream(['Tema'] * 3)
+    icecast.routes['/callada'] = stall
+    stations = [(0, Station('Callada', icecast.url('/callada'))), (1, Station('Viva', icecast.url('/viva')))]
+    scan = StationScan(HealthCache(str(tmp_path / 'health.json')), stations)
+    scan.prober.timeout = 0.3
+    for result in scan.prober.run([radio.url for _, radio in stations]):
+        scan.results[result.url] = result
+
+    assert scan.next_live() == stations[1] and scan.done
+    assert scan.results[icecast.url('/viva')].title == 'Tema'
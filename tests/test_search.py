@@ -0,0 +1,63 @@
+import pytest
+
+from radio import SearchResults, StationIndex, StationStore
+
+
+@pytest.fixture(scope='module')
+def index():
+    words = ['Radio', 'Mitre', 'Jazz', 'Tango', 'Córdoba', 'Noticias', 'Rock', 'Cumbia']
+    records = [{'title': f'{words[n % 8]} {words[n * 3 % 7]} {n}', 'url': f'http://s{n % 13}.example/{n}',
+                'tags': ['rock' if n % 2 else 'jazz']} for n in range(5000)]
+    index = StationIndex(StationStore(StationStore.build(records)))
+    index.wait()
+    return index
+
+
+def matches(index, query):
+    return [entry for entry in range(len(index.store)) if query in index.hay(entry)]
+
+
+def test_bounded_scan_finishes_on_later_calls(index, monkeypatch):
+    monkeypatch.setattr(SearchResults, 'CHUNK', 1024)
+    results = index.search('zzq')
+    results.ensure(20, budget=0.0)  # Sin tiempo: un solo tramo
+    assert not results.complete and len(results) == 0
+    while results.extend(0.0) is False:
+        pass
+    assert results.complete and len(results) == 0
+
+
+def test_chunk_boundaries_do_not_lose_matches(index, monkeypatch):
+    monkeypatch.setattr(SearchResults, 'CHUNK', 7)
+    for query in ('mitre jazz', 'cordoba', 's7.example'):
+        results = index.search(query)
+        results.finish()
+        assert sorted(results.ids) == matches(index, query)
+
+
+def test_typing_narrows_the_previous_results(index):
+    previous = index.search('m')
+    previous.finish()
+    results = index.search('mit', previous)
+    assert results._source is not None  # Solo se revisan los resultados de 'm'
+    results.finish()
+    assert sorted(results.ids) == matches(index, 'mit')
+
+    # Una consulta que no amplía la anterior vuelve a recorrer todo el catálogo
+    other = index.search('jazz', results)
+    assert other._source is None
+
+
+def test_ranking_accents_and_preferred(index):
+    results = index.search('Cordoba')
+    results.ensure(StationIndex.TOP_K + 1)
+    titles = [results[position].title for position in range(StationIndex.TOP_K + 1)]
+    # Primero los títulos que empiezan por la consulta, sin importar los acentos
+    assert all(title.startswith('Córdoba') for title in titles[:StationIndex.TOP_K])
+
+    # Favoritas y recientes que coinciden van antes; las que no coinciden no aparecen
+    preferred = matches(index, 'mitre cordoba')[-1]
+    unrelated = next(entry for entry in range(len(index.store)) if 'cordoba' not in index.hay(entry))
+    results = index.search('cordoba', preferred=[unrelated, preferred])
+    results.finish()
+    assert results.ids[0] == preferred and unrelated not in results.ids
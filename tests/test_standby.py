@@ -0,0 +1,49 @@
+import time
+
+import pytest
+
+from radio import MpvEngine, StandbyPool
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'se agotó el tiempo de espera'
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def pool(fake_mpv):
+    pool = StandbyPool(size=1)
+    yield pool
+    pool.shutdown()
+
+
+def test_promoted_engine_comes_back_unmuted(fake_mpv, pool):
+    main = MpvEngine(name='main')
+    main.start()
+    pool.warm('http://a/uno')
+    wait_for(lambda: pool.is_warm('http://a/uno'))
+    warm = pool.take('http://a/uno')
+    assert warm.ipc.get_property('mute') is True
+    pool.promote(warm, main)
+    assert warm.ipc.get_property('mute') is False
+
+    # El proceso promovido muere: se relanza con el perfil del principal
+    warm.process.kill()
+    warm.process.wait()
+    warm.play('http://a/uno')
+    args = fake_mpv.args(warm.pid)
+    assert '--mute=no' in args
+    assert not any(arg.startswith('--demuxer-max-bytes=') for arg in args)
+    assert warm.ipc.get_property('mute') is False
+    warm.shutdown()
+
+    # El principal quedó en la reserva: silenciado aunque se relance
+    main.process.kill()
+    main.process.wait()
+    pool.warm('http://a/dos')
+    wait_for(lambda: pool.is_warm('http://a/dos'))
+    assert main.ipc.get_property('mute') is True
+    assert '--mute=yes' in fake_mpv.args(main.pid)
+    assert any(arg.startswith('--demuxer-max-bytes=') for arg in fake_mpv.args(main.pid))
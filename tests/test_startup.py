@@ -0,0 +1,78 @@
+import json
+import os
+import subprocess
+import time
+
+import pytest
+
+import radio
+from radio import RadioCLI, StartupProfile, find_mpv
+
+
+@pytest.fixture
+def probes(monkeypatch):
+    """Ejecuciones de `mpv --version`"""
+    calls = []
+    run = subprocess.run
+
+    def counted(args, **kwargs):
+        calls.append(args)
+        return run(args, **kwargs)
+
+    monkeypatch.setattr(radio.subprocess, 'run', counted)
+    return calls
+
+
+def test_mpv_probe_is_cached_until_the_binary_changes(fake_mpv, tmp_path, probes):
+    binary = str(tmp_path / 'bin' / 'mpv')
+    assert find_mpv() == binary and len(probes) == 1
+    assert find_mpv() == binary and len(probes) == 1  # De la caché
+
+    os.utime(binary, ns=(1, 1))
+    assert find_mpv() == binary and len(probes) == 2
+
+
+def test_broken_mpv_is_remembered(tmp_path, monkeypatch, probes):
+    (tmp_path / 'mpv').write_text('#!/bin/sh\nexit 1\n')
+    (tmp_path / 'mpv').chmod(0o755)
+    monkeypatch.setenv('PATH', str(tmp_path))
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'cache'))
+    assert find_mpv() is None and find_mpv() is None
+    assert len(probes) == 1
+
+
+def test_first_frame_does_not_wait_for_the_catalog(tmp_path, monkeypatch):
+    monkeypatch.setenv('XDG_DATA_HOME', str(tmp_path / 'data'))
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'cache'))
+    source = tmp_path / 'radios.json'
+    source.write_text(json.dumps([{'title': f'Radio {n}', 'url': f'http://a/{n}'} for n in range(2000)]))
+
+    cli = RadioCLI()
+    cli.open_loop()
+    try:
+        # Sin caché: se reconstruye en otro hilo y la interfaz ya puede pintar
+        cli.open_catalog(str(source))
+        assert cli.loading
+        cli.schedule('limite', 5.0, lambda: None)
+        while cli.loading:
+            cli.poll()
+        assert len(cli.radios) == 2000
+
+        # Con la caché al día se mapea en el acto
+        again = RadioCLI()
+        again.open_catalog(str(source))
+        assert not again.loading and len(again.radios) == 2000
+        again.background.stop()
+    finally:
+        cli.close_loop()
+        cli.background.stop()
+
+
+def test_startup_profile_reports_each_phase():
+    profile = StartupProfile()
+    profile.mark('curses')
+    time.sleep(0.01)
+    profile.mark('primer cuadro')
+    lines = profile.report().splitlines()
+    assert [line.split()[0] for line in lines[-2:]] == ['curses', 'primer']
+    assert float(lines[-1].split()[-2]) >= 10  # Acumulado desde main()
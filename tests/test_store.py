@@ -0,0 +1,64 @@
+import json
+import mmap
+import os
+
+import pytest
+
+from radio import StationStore
+
+
+@pytest.fixture
+def source(tmp_path, monkeypatch):
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'cache'))
+    path = tmp_path / 'radios.json'
+    path.write_text(json.dumps([
+        {'title': 'Radio Mitre', 'url': 'http://a/mitre'},
+        {'title': 'Ñandú FM', 'url': 'http://a/nandu', 'tags': ['folk']},
+        {'title': 'Córdoba', 'url': 'http://a/cordoba'},
+        {'title': 'córdoba', 'url': 'http://a/cordoba2'}]))
+    return path
+
+
+def stations(store) -> list:
+    return [(station.title, station.url) for station in store]
+
+
+def test_round_trip_sorted_and_searchable(source):
+    store = StationStore.open(str(source))
+    # Orden por título normalizado (sin acentos ni mayúsculas), luego título y URL
+    assert stations(store) == [('Córdoba', 'http://a/cordoba'), ('córdoba', 'http://a/cordoba2'),
+                               ('Ñandú FM', 'http://a/nandu'), ('Radio Mitre', 'http://a/mitre')]
+    assert store.find('Radio Mitre', 'http://a/mitre') == 3
+    assert store.find('Radio Mitre', 'http://otra/') is None
+    assert store[-1].title == 'Radio Mitre'
+    text, offsets = store.search_text()
+    assert 'folk' in text[offsets[2]:offsets[3]]
+    with pytest.raises(IndexError):
+        store[4]
+
+
+def test_second_open_maps_the_cache(source):
+    first = stations(StationStore.open(str(source)))
+    cache = StationStore.cache_path(str(source))
+    assert os.path.exists(cache)
+
+    store = StationStore.open(str(source))
+    assert isinstance(store._buffer, mmap.mmap)
+    assert stations(store) == first
+    store.close()
+
+
+def test_cache_follows_the_source(source):
+    StationStore.open(str(source))
+    cache = StationStore.cache_path(str(source))
+    written = os.stat(cache).st_mtime_ns
+
+    # Mismo contenido con otro mtime: solo se actualiza la cabecera
+    os.utime(source, ns=(1, 1))
+    assert len(StationStore.open(str(source))) == 4
+    assert StationStore.open(str(source)).source_info[0] == 1
+
+    # Otro contenido: se reconstruye
+    source.write_text(json.dumps([{'title': 'Nueva', 'url': 'http://a/nueva'}]))
+    assert stations(StationStore.open(str(source))) == [('Nueva', 'http://a/nueva')]
+    assert os.stat(cache).st_mtime_ns >= written